@@ -0,0 +1,310 @@
+"""
+    对比同步与异步服务模式下请求校验及数据清洗的I/O路径，并校验两者结果一致，全部使用本地替代服务：
+    MySQL以SQLite内存数据库代替（%s占位符转换为?），每次查询以--query-latency-ms模拟网络往返耗时，同步与异步连接池大小相同；
+    Redis以fakeredis代替，数据集、列式存储、聚合存储、水位线及日期清单均写入临时目录
+    1. 请求校验：同步版本在--threads个线程中执行（对应gunicorn每个worker的线程数），异步版本在单个事件循环中同时校验--concurrency个请求；
+    2. 异步服务：以aiohttp启动异步服务，并发请求预测接口（模型类型无效，仅执行日期查询与校验）；
+    3. 数据清洗：同步版本依次清洗各气象站，异步版本在事件循环中同时清洗全部气象站，转换与加载交由线程池执行
+    运行方式：python benchmark/async_io.py [--requests 2000] [--threads 4] [--concurrency 64] [--query-latency-ms 5] [--stations 4] [--days 7]
+    依赖：pip install aiohttp fakeredis
+"""
+import argparse
+import asyncio
+import filecmp
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+import aiohttp  # noqa: E402
+import fakeredis  # noqa: E402
+from aiohttp import web  # noqa: E402
+from config import MYSQL_POOL_MAX_SIZE  # noqa: E402
+from server_code import application, async_application, async_server  # noqa: E402
+from cleaned import meteo_data_cleaned  # noqa: E402
+from server_code.utils import req_utils  # noqa: E402
+from storage import column_store, aggregate_store, etl_watermark, date_manifest  # noqa: E402
+import entity.req_entity as server_req  # noqa: E402
+
+_DB_PATH = 'file:meteo_async_benchmark?mode=memory&cache=shared'
+_STATIONS = ['1', '2', '3']
+_START_DATE = date(2023, 1, 1)
+_DAYS = 365
+
+
+class _SQLiteCursor:
+    def __init__(self, connection: sqlite3.Connection, latency: float):
+        self._cursor = connection.cursor()
+        self._latency = latency
+
+    def execute(self, sql: str, args: tuple = ()):
+        time.sleep(self._latency)
+        return self._cursor.execute(sql.replace('%s', '?'), args)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, latency: float):
+        self._connection = sqlite3.connect(_DB_PATH, uri=True, check_same_thread=False)
+        self._latency = latency
+
+    def cursor(self) -> _SQLiteCursor:
+        return _SQLiteCursor(self._connection, self._latency)
+
+    def close(self):
+        self._connection.close()
+
+
+class _AsyncSQLiteCursor:
+    """
+    与aiomysql.Cursor接口兼容的SQLite游标，等待模拟的网络往返期间让出事件循环
+    """
+
+    def __init__(self, connection: sqlite3.Connection, latency: float):
+        self._cursor = connection.cursor()
+        self._latency = latency
+
+    async def execute(self, sql: str, args: tuple = ()):
+        await asyncio.sleep(self._latency)
+        self._cursor.execute(sql.replace('%s', '?'), args)
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    async def close(self):
+        self._cursor.close()
+
+
+class _AsyncSQLiteConnection:
+    def __init__(self, latency: float):
+        self._connection = sqlite3.connect(_DB_PATH, uri=True, check_same_thread=False)
+        self._latency = latency
+
+    async def cursor(self) -> _AsyncSQLiteCursor:
+        return _AsyncSQLiteCursor(self._connection, self._latency)
+
+    def close(self):
+        self._connection.close()
+
+
+class _AsyncSQLitePool:
+    """
+    与aiomysql.Pool接口兼容的有界连接池，连接数不超过maxsize
+    """
+
+    def __init__(self, latency: float, maxsize: int):
+        self._latency = latency
+        self._slots = asyncio.Semaphore(maxsize)
+        self._idle = []
+
+    async def acquire(self) -> _AsyncSQLiteConnection:
+        await self._slots.acquire()
+        return self._idle.pop() if self._idle else _AsyncSQLiteConnection(self._latency)
+
+    def release(self, connection: _AsyncSQLiteConnection) -> None:
+        self._idle.append(connection)
+        self._slots.release()
+
+    def close(self) -> None:
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+    async def wait_closed(self) -> None:
+        pass
+
+
+def _create_database() -> sqlite3.Connection:
+    """
+    创建station_date表并写入每个气象站连续_DAYS日中的奇数日记录，返回的连接需保持打开以保留内存数据库
+    """
+    connection = sqlite3.connect(_DB_PATH, uri=True, check_same_thread=False)
+    connection.execute("create table station_date (id integer primary key, station text, date text)")
+    connection.execute("create index idx_station_date on station_date (station, date)")
+    rows = [(station, (_START_DATE + timedelta(days=i)).strftime('%Y-%m-%d'))
+            for station in _STATIONS for i in range(0, _DAYS, 2)]
+    connection.executemany("insert into station_date (station, date) values (?, ?)", rows)
+    connection.commit()
+    return connection
+
+
+def _make_request(i: int) -> dict:
+    start_date = (_START_DATE + timedelta(days=i % _DAYS)).strftime('%Y-%m-%d')
+    return {'station': _STATIONS[i % len(_STATIONS)], 'start_date': start_date,
+            'model_type': 'SHORTTERM_LSTM' if i % 2 else 'LONGTERM_LSTM'}
+
+
+def _print(name: str, count: int, cost: float) -> None:
+    print(f"{name}：{count}次耗时{cost * 1000:.1f}ms（{count / cost:.0f}次/秒）")
+
+
+def _run_sync_validation(requests: list, threads: int) -> list:
+    def validate(req: dict):
+        return req_utils.validate_json_user_req('/anapredict/model/prediction', req, server_req.PREDICTION)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(validate, requests))
+    _print(f'同步校验（{threads}个线程）', len(requests), time.perf_counter() - start_time)
+    return results
+
+
+async def _run_async_validation(requests: list, concurrency: int) -> list:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def validate(req: dict):
+        async with slots:
+            return await req_utils.validate_json_user_req_async('/anapredict/model/prediction', req,
+                                                                server_req.PREDICTION)
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(validate(req) for req in requests))
+    _print(f'异步校验（单线程，同时{concurrency}个请求）', len(requests), time.perf_counter() - start_time)
+    return list(results)
+
+
+async def _run_async_server(requests: list, concurrency: int) -> list:
+    """
+    启动异步服务并请求预测接口，模型类型替换为无效值，使接口在日期校验后直接返回错误消息而不执行预测
+    """
+    runner = web.AppRunner(async_server.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    slots = asyncio.Semaphore(concurrency)
+    try:
+        async with aiohttp.ClientSession() as session:
+            async def post(req: dict):
+                async with slots:
+                    async with session.post(f'http://127.0.0.1:{port}/anapredict/model/prediction',
+                                            json=dict(req, model_type='INVALID')) as response:
+                        return (await response.json())['msg']
+
+            start_time = time.perf_counter()
+            results = await asyncio.gather(*(post(req) for req in requests))
+            _print(f'异步服务预测接口（同时{concurrency}个请求）', len(requests), time.perf_counter() - start_time)
+    finally:
+        await runner.cleanup()
+    return list(results)
+
+
+def _populate(client, stations: list, dates: list) -> None:
+    import numpy as np
+    rng = np.random.default_rng(0)
+    for station in stations:
+        for date_str in dates:
+            values = np.round(rng.normal([20, 60, 3, 180, 0.2, 300, 35, 60], [5, 10, 1, 90, 0.5, 100, 10, 15],
+                                         size=(1440, 8)), 1)
+            client.zadd(f"{station}_data_{date_str}", {
+                str([f"{minute // 60:02d}:{minute % 60:02d}:00"] + values[minute].tolist()): minute
+                for minute in range(1440)
+            })
+
+
+def _use_folder(folder: str, stations: list) -> None:
+    meteo_data_cleaned.FILE_PATH = os.path.join(folder, 'csv') + '/'
+    column_store.COLUMN_STORE_PATH = os.path.join(folder, 'column') + '/'
+    aggregate_store.AGGREGATE_STORE_PATH = os.path.join(folder, 'aggregate') + '/'
+    etl_watermark.ETL_WATERMARK_PATH = os.path.join(folder, 'watermark') + '/'
+    etl_watermark._watermarks.clear()
+    date_manifest.FILE_PATH = meteo_data_cleaned.FILE_PATH
+    date_manifest.DATE_MANIFEST_PATH = os.path.join(folder, 'manifest') + '/'
+    for station in stations:
+        os.makedirs(f"{meteo_data_cleaned.FILE_PATH}{station}", exist_ok=True)
+
+
+async def _run_async_etl(stations: list, dates: list) -> None:
+    executor = async_application.get_executor()
+    await asyncio.gather(*(meteo_data_cleaned.etl_days_async([(station, date_str) for date_str in dates], executor)
+                           for station in stations))
+
+
+def _compare_folders(left: str, right: str) -> bool:
+    for root, _, files in os.walk(left):
+        for file_name in files:
+            path = os.path.join(root, file_name)
+            if not filecmp.cmp(path, os.path.join(right, os.path.relpath(path, left)), shallow=False):
+                print(f"文件不一致：{os.path.relpath(path, left)}")
+                return False
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--query-latency-ms', type=float, default=5.0)
+    parser.add_argument('--stations', type=int, default=4)
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args()
+    keeper = _create_database()
+    latency = args.query_latency_ms / 1000
+    application.set_mysql_creator(lambda: _SQLiteConnection(latency))
+    async_application.set_async_mysql_factory(lambda: _async_pool(latency))
+    requests = [_make_request(i) for i in range(args.requests)]
+    print(f"连接池大小：{MYSQL_POOL_MAX_SIZE}，每次查询模拟耗时{args.query_latency_ms}ms")
+
+    sync_results = _run_sync_validation(requests, args.threads)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    async_results = loop.run_until_complete(_run_async_validation(requests, args.concurrency))
+    if sync_results != async_results:
+        print("同步与异步校验结果不一致")
+        return 1
+    server_results = loop.run_until_complete(_run_async_server(requests, args.concurrency))
+    expected = [req_utils.validate_json_user_req('/anapredict/model/prediction', dict(req, model_type='INVALID'),
+                                                 server_req.PREDICTION) for req in requests[:20]]
+    if server_results[:20] != expected:
+        print("异步服务返回的校验结果与同步校验不一致")
+        return 1
+    async_application.set_async_mysql_factory(lambda: _async_pool(latency))
+
+    stations = [str(i + 1) for i in range(args.stations)]
+    dates = meteo_data_cleaned.get_date_range('2023-01-01', f"2023-01-{min(args.days, 31):02d}")
+    server = fakeredis.FakeServer()
+    application.set_redis_factory(lambda: fakeredis.FakeRedis(server=server))
+    async_application.set_async_redis_factory(lambda: fakeredis.FakeAsyncRedis(server=server))
+    _populate(application.get_redis_client(), stations, dates)
+    sync_folder, async_folder = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        _use_folder(sync_folder, stations)
+        start_time = time.perf_counter()
+        for station in stations:
+            meteo_data_cleaned.etl_stations([station], dates[0], dates[-1], max_workers=0)
+        _print('同步清洗（依次清洗各气象站）', len(stations) * len(dates), time.perf_counter() - start_time)
+        _use_folder(async_folder, stations)
+        start_time = time.perf_counter()
+        loop.run_until_complete(_run_async_etl(stations, dates))
+        _print('异步清洗（同时清洗各气象站）', len(stations) * len(dates), time.perf_counter() - start_time)
+        loop.run_until_complete(async_application.close())
+        if not _compare_folders(os.path.join(sync_folder, 'csv'), os.path.join(async_folder, 'csv')):
+            return 1
+    finally:
+        shutil.rmtree(sync_folder)
+        shutil.rmtree(async_folder)
+        loop.close()
+        keeper.close()
+    print("同步与异步模式的校验结果及清洗输出一致")
+    return 0
+
+
+async def _async_pool(latency: float) -> _AsyncSQLitePool:
+    return _AsyncSQLitePool(latency, MYSQL_POOL_MAX_SIZE)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+    对比多气象站、多日期数据清洗在当前进程中依次转换与进程池并行转换的耗时，并校验两者输出的CSV文件一致；
+    进程池在首次清洗时创建，另测量此后的清洗复用已有进程池时的耗时
+    以fakeredis代替Redis服务，写入合成的每分钟一条记录的日数据；数据集、列式存储及聚合存储均写入临时目录
+    运行方式：python benchmark/etl_parallel.py [--stations 8] [--days 31] [--workers 4]
+    依赖：pip install fakeredis
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+import fakeredis  # noqa: E402
+from server_code import application  # noqa: E402
+from cleaned import meteo_data_cleaned  # noqa: E402
+from storage import column_store, aggregate_store, etl_watermark, date_manifest  # noqa: E402
+
+_START_DATE = '2023-01-01'
+
+
+def _populate(client, stations: list, dates: list) -> None:
+    rng = np.random.default_rng(0)
+    for station in stations:
+        for date_str in dates:
+            values = np.round(rng.normal([20, 60, 3, 180, 0.2, 300, 35, 60], [5, 10, 1, 90, 0.5, 100, 10, 15],
+                                         size=(1440, 8)), 1)
+            client.zadd(f"{station}_data_{date_str}", {
+                str([f"{minute // 60:02d}:{minute % 60:02d}:00"] + values[minute].tolist()): minute
+                for minute in range(1440)
+            })
+
+
+def _use_folder(folder: str, stations: list) -> None:
+    """
+    将数据集、列式存储、聚合存储、水位线及日期清单的根路径指向临时目录
+    """
+    meteo_data_cleaned.FILE_PATH = os.path.join(folder, 'csv') + '/'
+    column_store.COLUMN_STORE_PATH = os.path.join(folder, 'column') + '/'
+    aggregate_store.AGGREGATE_STORE_PATH = os.path.join(folder, 'aggregate') + '/'
+    etl_watermark.ETL_WATERMARK_PATH = os.path.join(folder, 'watermark') + '/'
+    etl_watermark._watermarks.clear()
+    date_manifest.FILE_PATH = meteo_data_cleaned.FILE_PATH
+    date_manifest.DATE_MANIFEST_PATH = os.path.join(folder, 'manifest') + '/'
+    for station in stations:
+        os.makedirs(f"{meteo_data_cleaned.FILE_PATH}{station}", exist_ok=True)
+
+
+def _run(name: str, folder: str, stations: list, end_date: str, workers: int) -> float:
+    _use_folder(folder, stations)
+    start_time = time.perf_counter()
+    count, _ = meteo_data_cleaned.etl_stations(stations, _START_DATE, end_date, max_workers=workers)
+    cost = time.perf_counter() - start_time
+    print(f"{name}：{count}个日数据耗时{cost * 1000:.1f}ms（每日{cost * 1000 / count:.2f}ms）")
+    return cost
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stations', type=int, default=8)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    stations = [str(i + 1) for i in range(args.stations)]
+    dates = meteo_data_cleaned.get_date_range(_START_DATE, f"2023-01-{min(args.days, 31):02d}")
+    server = fakeredis.FakeServer()
+    application.set_redis_factory(lambda: fakeredis.FakeRedis(server=server))
+    _populate(application.get_redis_client(), stations, dates)
+    serial_folder, parallel_folder, reuse_folder = tempfile.mkdtemp(), tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        serial_cost = _run('当前进程依次转换', serial_folder, stations, dates[-1], 0)
+        _run(f'{args.workers}个进程并行转换（创建进程池）', reuse_folder, stations, dates[-1], args.workers)
+        parallel_cost = _run(f'{args.workers}个进程并行转换（复用进程池）', parallel_folder, stations, dates[-1],
+                             args.workers)
+        print(f"加速比：{serial_cost / parallel_cost:.1f}x")
+        start_time = time.perf_counter()
+        count, skipped = meteo_data_cleaned.etl_stations(stations, _START_DATE, dates[-1], max_workers=args.workers)
+        print(f"源数据未变化时再次清洗：重新清洗{count}个日数据，跳过{skipped}个，"
+              f"耗时{(time.perf_counter() - start_time) * 1000:.1f}ms")
+        for station in stations:
+            for date_str in dates:
+                name = f"{station}/{station}_data_{date_str}.csv"
+                if not filecmp.cmp(os.path.join(serial_folder, 'csv', name),
+                                   os.path.join(parallel_folder, 'csv', name), shallow=False):
+                    print(f"{name}的输出不一致")
+                    return 1
+    finally:
+        shutil.rmtree(serial_folder)
+        shutil.rmtree(parallel_folder)
+        shutil.rmtree(reuse_folder)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+    对比原有逐日三次读写CSV文件的清洗流程与单次内存处理、原子写入的清洗流程的耗时
+    以合成的每分钟一条记录（1440行）的日数据代替Redis有序集合成员，其中部分日期随机缺失若干小时以触发前向填充
+    运行方式：python benchmark/etl_pipeline.py [--days 30] [--missing-hours 3]
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+from cleaned import meteo_data_cleaned  # noqa: E402
+
+_COLUMNS = ['Time', 'Temperature', 'Humidity', 'Speed', 'Direction', 'Rain', 'Sunlight', 'PM2.5', 'PM10']
+
+
+def _make_day(rng: np.random.Generator, missing_hours: int) -> list:
+    """
+    生成一日的Redis有序集合成员，每个成员为一条记录列表的字符串形式
+    """
+    minutes = np.arange(1440)
+    hours = minutes // 60
+    if missing_hours:
+        # 保留0时的数据，保证前向填充总有可用的前一行
+        dropped = rng.choice(np.arange(1, 24), size=missing_hours, replace=False)
+        minutes = minutes[~np.isin(hours, dropped)]
+    members = []
+    for minute in minutes:
+        values = [round(float(v), 1) for v in rng.normal([20, 60, 3, 180, 0.2, 300, 35, 60], [5, 10, 1, 90, 0.5, 100, 10, 15])]
+        members.append(str([f"{minute // 60:02d}:{minute % 60:02d}:00"] + values).encode())
+    return members
+
+
+def _legacy_etl(path: str, members: list) -> None:
+    """
+    原有的清洗流程：逐行写入原始CSV，清洗时读取后逐行重写，前向填充时再次读取并可能再次写入
+    """
+    with open(path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(_COLUMNS)
+        for item in members:
+            writer.writerow(eval(item))
+    data = pd.read_csv(path).dropna()
+    for col in _COLUMNS[1:]:
+        data = data[data[col] <= data[col].mean() + 3 * data[col].std()]
+    with open(path, 'w') as file:
+        file.write('')
+    with open(path, 'a') as file:
+        file.write(','.join(data.columns) + '\n')
+        for index, row in data.iterrows():
+            if index != 0:
+                file.write('\n')
+            file.write(','.join(map(str, row)))
+    df = pd.read_csv(path, index_col='Time')
+    df.index = pd.to_datetime(df.index)
+    if len(df.index.hour.unique()) != 24:
+        new_df = pd.DataFrame()
+        for hour in range(24):
+            hour_df = df[df.index.hour == hour]
+            if hour_df.empty:
+                last_row = new_df.iloc[-1]
+                last_row.name = last_row.name.replace(hour=hour, minute=59)
+                # DataFrame.append已在新版pandas中移除，以concat保持逐行追加的行为
+                new_df = pd.concat([new_df, last_row.to_frame().T])
+            else:
+                new_df = pd.concat([new_df, hour_df])
+        new_df.index.name = 'Time'
+        new_df = new_df.reset_index()
+        new_df['Time'] = pd.to_datetime(new_df['Time']).dt.strftime('%H:%M:%S')
+        new_df.to_csv(path, index=False)
+
+
+def _pipeline_etl(path: str, members: list) -> None:
+    meteo_data_cleaned.write_day_csv(path, meteo_data_cleaned.transform_day(members))
+
+
+def _run(name: str, func, folder: str, days: list) -> float:
+    start_time = time.perf_counter()
+    for i, members in enumerate(days):
+        func(os.path.join(folder, f"1_data_{i}.csv"), members)
+    cost = time.perf_counter() - start_time
+    print(f"{name}：{len(days)}日耗时{cost * 1000:.1f}ms（每日{cost * 1000 / len(days):.2f}ms）")
+    return cost
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--missing-hours', type=int, default=3)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    # 奇数日缺失若干小时，偶数日为完整的1440行
+    days = [_make_day(rng, args.missing_hours if i % 2 else 0) for i in range(args.days)]
+    legacy_folder, pipeline_folder = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        legacy_cost = _run('原有三次读写流程', _legacy_etl, legacy_folder, days)
+        pipeline_cost = _run('单次内存处理流程', _pipeline_etl, pipeline_folder, days)
+        print(f"加速比：{legacy_cost / pipeline_cost:.1f}x")
+        # 校验两种流程输出的行数一致
+        for i in range(args.days):
+            legacy = pd.read_csv(os.path.join(legacy_folder, f"1_data_{i}.csv"))
+            pipeline = pd.read_csv(os.path.join(pipeline_folder, f"1_data_{i}.csv"))
+            if len(legacy) != len(pipeline):
+                print(f"第{i}日输出行数不一致：{len(legacy)} != {len(pipeline)}")
+                return 1
+    finally:
+        shutil.rmtree(legacy_folder)
+        shutil.rmtree(pipeline_folder)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+    对比原有逐小时追加的前向填充与按小时直方图一次生成填充记录的前向填充的耗时，并校验两者结果一致
+    以合成的每分钟一条记录（1440行）的日数据为输入，每日随机缺失若干小时（0时始终保留，原有实现无法处理0时缺失）
+    运行方式：python benchmark/gap_fill.py [--days 200] [--max-missing-hours 6]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+from cleaned import meteo_data_cleaned  # noqa: E402
+
+_COLUMNS = ['Time', 'Temperature', 'Humidity', 'Speed', 'Direction', 'Rain', 'Sunlight', 'PM2.5', 'PM10']
+
+
+def _make_day(rng: np.random.Generator, missing_hours: int) -> pd.DataFrame:
+    minutes = np.arange(1440)
+    hours = minutes // 60
+    dropped = rng.choice(np.arange(1, 24), size=missing_hours, replace=False)
+    minutes = minutes[~np.isin(hours, dropped)]
+    data = pd.DataFrame(np.round(rng.normal(size=(len(minutes), 8)), 1), columns=_COLUMNS[1:])
+    data.insert(0, 'Time', [f"{minute // 60:02d}:{minute % 60:02d}:00" for minute in minutes])
+    return data
+
+
+def _legacy_fill(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    原有的前向填充：逐小时筛选并追加到新的数据窗中
+    """
+    df = data.set_index('Time')
+    df.index = pd.to_datetime(df.index, format='%H:%M:%S')
+    if len(df.index.hour.unique()) == 24:
+        return data
+    new_df = pd.DataFrame()
+    for hour in range(24):
+        hour_df = df[df.index.hour == hour]
+        if hour_df.empty:
+            last_row = new_df.iloc[-1]
+            last_row.name = last_row.name.replace(hour=hour, minute=59)
+            # DataFrame.append已在新版pandas中移除，以concat保持逐行追加的行为
+            new_df = pd.concat([new_df, last_row.to_frame().T])
+        else:
+            new_df = pd.concat([new_df, hour_df])
+    new_df.index.name = 'Time'
+    new_df = new_df.reset_index()
+    new_df['Time'] = pd.to_datetime(new_df['Time']).dt.strftime('%H:%M:%S')
+    return new_df.astype(dict(data.dtypes))
+
+
+def _run(name: str, func, days: list) -> tuple:
+    start_time = time.perf_counter()
+    results = [func(data) for data in days]
+    cost = time.perf_counter() - start_time
+    print(f"{name}：{len(days)}日耗时{cost * 1000:.1f}ms（每日{cost * 1000 / len(days):.2f}ms）")
+    return results, cost
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=200)
+    parser.add_argument('--max-missing-hours', type=int, default=6)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    days = [_make_day(rng, int(rng.integers(1, args.max_missing_hours + 1))) for _ in range(args.days)]
+    legacy_results, legacy_cost = _run('原有逐小时追加', _legacy_fill, days)
+    results, cost = _run('按小时直方图一次填充', meteo_data_cleaned._missing_data_fill, days)
+    print(f"加速比：{legacy_cost / cost:.1f}x")
+    for i, (legacy, result) in enumerate(zip(legacy_results, results)):
+        if not legacy.reset_index(drop=True).equals(result):
+            print(f"第{i}日的填充结果不一致")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
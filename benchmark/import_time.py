@@ -0,0 +1,85 @@
+"""
+    统计服务各模块的导入耗时，并检查服务启动时是否导入了应按需导入的重量级依赖
+    每个模块在独立的子进程中导入，结果不受导入顺序与缓存影响
+    运行方式：python benchmark/import_time.py [--json 结果文件路径]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SERVER_PATH = os.path.join(_ROOT_PATH, 'server_code')
+
+# 需要统计导入耗时的模块
+_MODULE_LIST = [
+    'numpy',
+    'pandas',
+    'pymysql',
+    'flask',
+    'redis',
+    'sklearn.preprocessing',
+    'tensorflow',
+    'data_utils',
+    'repository',
+    'server_code.prediction.model_lstm',
+    'cleaned.meteo_data_cleaned',
+    'api_server',
+]
+# 服务启动时不应导入的重量级依赖，应由使用它们的子系统在首次使用时导入
+_LAZY_MODULE_LIST = ['tensorflow', 'keras', 'sklearn', 'redis', 'h5py', 'nacos']
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+sys.path[:0] = {paths!r}
+start_time = time.perf_counter()
+import {module}
+cost = time.perf_counter() - start_time
+loaded = sorted(name for name in {lazy!r} if name in sys.modules)
+print(json.dumps({{'cost_ms': round(cost * 1000, 2), 'module_count': len(sys.modules), 'lazy_loaded': loaded}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """
+    在独立子进程中导入模块并统计耗时
+    :param module: 模块名称
+    :return:
+        dict: 导入耗时、导入后已加载的模块数，以及被一同导入的重量级依赖；导入失败时包含错误消息
+    """
+    script = _IMPORT_SCRIPT.format(paths=[_ROOT_PATH, _SERVER_PATH], module=module, lazy=_LAZY_MODULE_LIST)
+    process = subprocess.run([sys.executable, '-c', script], cwd=_ROOT_PATH,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0:
+        return {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else '导入失败'}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='统计服务各模块的导入耗时')
+    parser.add_argument('--json', help='将结果写入指定的JSON文件')
+    args = parser.parse_args()
+
+    results = {}
+    for module in _MODULE_LIST:
+        results[module] = measure(module)
+        item = results[module]
+        if 'error' in item:
+            print(f"{module:<42}导入失败：{item['error']}")
+        else:
+            print(f"{module:<42}{item['cost_ms']:>10.2f}ms{item['module_count']:>8}个模块  "
+                  f"重量级依赖：{','.join(item['lazy_loaded']) or '无'}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    # 服务入口导入了重量级依赖时视为回归
+    server_result = results.get('api_server', {})
+    if server_result.get('lazy_loaded'):
+        print(f"api_server启动时导入了{','.join(server_result['lazy_loaded'])}，应改为首次使用时导入")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
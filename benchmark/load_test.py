@@ -0,0 +1,93 @@
+"""
+    以不同的worker数启动生产模式的gunicorn服务，并发请求同一接口，对比吞吐量与延迟（gunicorn仅支持Linux）
+    启动时不注册到nacos；默认请求不依赖MySQL与模型文件的 /anapredict/model/stats 接口
+    运行方式：python benchmark/load_test.py [--workers 1 2 4] [--threads 4] [--clients 16] [--requests 2000] [--path /anapredict/model/stats]
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SERVER_PATH = os.path.join(_ROOT_PATH, 'server_code')
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(port: int, path: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', path)
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"服务在{timeout}秒内未就绪")
+
+
+def _client(port: int, path: str, count: int) -> list:
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    for _ in range(count):
+        start_time = time.perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"请求失败：HTTP {response.status}")
+        latencies.append(time.perf_counter() - start_time)
+    connection.close()
+    return latencies
+
+
+def _run(workers: int, args: argparse.Namespace) -> None:
+    port = _free_port()
+    env = dict(os.environ, METEO_NACOS_REGISTER='0')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(_SERVER_PATH, 'gunicorn_config.py'),
+         '-b', f'127.0.0.1:{port}', '-w', str(workers), '--threads', str(args.threads), 'wsgi:app'],
+        cwd=_ROOT_PATH, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port, args.path, 60)
+        # 预热，使每个worker都完成首次请求的初始化
+        _client(port, args.path, workers * 10)
+        per_client = args.requests // args.clients
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as executor:
+            results = list(executor.map(lambda _: _client(port, args.path, per_client), range(args.clients)))
+        cost = time.perf_counter() - start_time
+    finally:
+        process.terminate()
+        process.wait()
+    latencies = sorted(latency for latencies in results for latency in latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{workers}个worker：{len(latencies)}次请求耗时{cost:.2f}s，吞吐量{len(latencies) / cost:.0f}次/秒，"
+          f"p50 {p50:.2f}ms，p99 {p99:.2f}ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--path', default='/anapredict/model/stats')
+    args = parser.parse_args()
+    for workers in args.workers:
+        _run(workers, args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
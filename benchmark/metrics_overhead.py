@@ -0,0 +1,62 @@
+"""
+    测量运行指标的记录开销：单线程及多线程并发时每次metrics.stage与metrics.observe_request的耗时，
+    并与不记录指标的空循环对比，输出每次记录增加的耗时
+    运行方式：python benchmark/metrics_overhead.py [--iterations 200000] [--threads 8]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+from server_code.utils import metrics  # noqa: E402
+
+
+def _empty(iterations: int) -> None:
+    for _ in range(iterations):
+        pass
+
+
+def _stage(iterations: int) -> None:
+    for _ in range(iterations):
+        with metrics.stage('csv_read'):
+            pass
+
+
+def _request(iterations: int) -> None:
+    for _ in range(iterations):
+        metrics.observe_request('/anapredict/model/prediction', 'POST', 0.003)
+
+
+def _run(func, iterations: int, threads: int) -> float:
+    """
+    返回每次调用的平均耗时（纳秒），多线程时为全部线程完成的总耗时除以总调用次数
+    """
+    start_time = time.perf_counter()
+    if threads == 1:
+        func(iterations)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(func, [iterations // threads] * threads))
+    return (time.perf_counter() - start_time) / iterations * 1e9
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    for threads in (1, args.threads):
+        baseline = _run(_empty, args.iterations, threads)
+        for name, func in (('metrics.stage', _stage), ('metrics.observe_request', _request)):
+            cost = _run(func, args.iterations, threads) - baseline
+            print(f"{threads}个线程，{name}：每次记录{cost:.0f}ns")
+    print(f"共记录{sum(len(line) > 0 for line in metrics.render().splitlines())}行指标")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
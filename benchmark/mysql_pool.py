@@ -0,0 +1,146 @@
+"""
+    对比请求校验时每次查询新建连接、使用连接池合并日期查询以及使用内存日期索引的耗时及连接数
+    以SQLite内存数据库代替MySQL，%s占位符转换为?，并以--connect-latency-ms模拟建立TCP连接及认证的耗时
+    运行方式：python benchmark/mysql_pool.py [--requests 2000] [--threads 8] [--connect-latency-ms 3]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+from server_code import application  # noqa: E402
+from server_code.utils import req_utils  # noqa: E402
+import repository  # noqa: E402
+
+_STATIONS = ['1', '2', '3']
+_START_DATE = date(2023, 1, 1)
+_DAYS = 365
+
+
+class _Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.queries = 0
+
+    def add(self, connections: int = 0, queries: int = 0) -> None:
+        with self.lock:
+            self.connections += connections
+            self.queries += queries
+
+
+class _SQLiteCursor:
+    """
+    将pymysql风格的%s占位符转换为SQLite的?占位符
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, counter: _Counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, sql: str, args: tuple = ()):
+        self._counter.add(queries=1)
+        return self._cursor.execute(sql.replace('%s', '?'), args)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, path: str, counter: _Counter, connect_latency: float):
+        time.sleep(connect_latency)
+        self._connection = sqlite3.connect(path, uri=True, check_same_thread=False)
+        self._counter = counter
+        counter.add(connections=1)
+
+    def cursor(self) -> _SQLiteCursor:
+        return _SQLiteCursor(self._connection.cursor(), self._counter)
+
+    def close(self):
+        self._connection.close()
+
+
+def _create_database(path: str) -> sqlite3.Connection:
+    """
+    创建station_date表并写入每个气象站连续_DAYS日的记录，返回的连接需保持打开以保留内存数据库
+    """
+    connection = sqlite3.connect(path, uri=True, check_same_thread=False)
+    connection.execute("create table station_date (id integer primary key, station text, date text)")
+    connection.execute("create index idx_station_date on station_date (station, date)")
+    rows = [(station, (_START_DATE + timedelta(days=i)).strftime('%Y-%m-%d'))
+            for station in _STATIONS for i in range(_DAYS)]
+    connection.executemany("insert into station_date (station, date) values (?, ?)", rows)
+    connection.commit()
+    return connection
+
+
+def _make_request(i: int) -> dict:
+    start_date = (_START_DATE + timedelta(days=10 + i % (_DAYS - 10))).strftime('%Y-%m-%d')
+    return {'station': _STATIONS[i % len(_STATIONS)], 'start_date': start_date, 'model_type': 'LONGTERM_LSTM'}
+
+
+def _legacy_validate(req: dict, path: str, counter: _Counter, connect_latency: float) -> bool:
+    """
+    原有的校验方式：起始日期与七日范围各查询一次，每次查询新建一个连接且不关闭
+    """
+    cursor = _SQLiteConnection(path, counter, connect_latency).cursor()
+    cursor.execute("select count(id) from station_date where station = %s and date = %s",
+                   (req['station'], req['start_date']))
+    exists = int(cursor.fetchall()[0][0]) > 0
+    start = (datetime.strptime(req['start_date'], '%Y-%m-%d') - timedelta(days=6)).strftime('%Y-%m-%d')
+    cursor = _SQLiteConnection(path, counter, connect_latency).cursor()
+    cursor.execute("select count(*) from station_date where station = %s and date >= %s and date <= %s",
+                   (req['station'], start, req['start_date']))
+    return exists and int(cursor.fetchall()[0][0]) >= 7
+
+
+def _run(name: str, func, n_requests: int, n_threads: int, counter: _Counter) -> None:
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        results = list(executor.map(func, range(n_requests)))
+    cost = time.perf_counter() - start_time
+    print(f"{name}：{n_requests}次请求耗时{cost * 1000:.1f}ms（{n_requests / cost:.0f} req/s），"
+          f"新建连接{counter.connections}个，执行查询{counter.queries}次，校验通过{sum(results)}次")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--connect-latency-ms', type=float, default=3.0)
+    args = parser.parse_args()
+    path = 'file:meteo_benchmark?mode=memory&cache=shared'
+    keeper = _create_database(path)
+    connect_latency = args.connect_latency_ms / 1000
+
+    legacy_counter = _Counter()
+    _run('每次查询新建连接', lambda i: _legacy_validate(_make_request(i), path, legacy_counter, connect_latency),
+         args.requests, args.threads, legacy_counter)
+
+    pool_counter = _Counter()
+    application.set_mysql_creator(lambda: _SQLiteConnection(path, pool_counter, connect_latency))
+    _run('连接池及合并日期查询', lambda i: req_utils._validate_api_prediction(_make_request(i)) is None,
+         args.requests, args.threads, pool_counter)
+    print(f"连接池统计：{dict(application.get_mysql_pool().get_stats())}")
+
+    index_counter = _Counter()
+    application.set_mysql_creator(lambda: _SQLiteConnection(path, index_counter, connect_latency))
+    repository.init_station_date_index()
+    _run('内存日期索引', lambda i: req_utils._validate_api_prediction(_make_request(i)) is None,
+         args.requests, args.threads, index_counter)
+    keeper.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
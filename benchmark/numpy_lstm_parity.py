@@ -0,0 +1,121 @@
+"""
+    校验NumPy推理后端与Keras推理结果的一致性，并对比两者的推理耗时
+    默认读取MODEL_PATH下的长短期模型；模型文件不存在时，按train_lstm中的结构构建随机权重的模型进行校验
+    运行方式：python benchmark/numpy_lstm_parity.py
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MODEL_PATH, MODEL_FILE_DICT  # noqa: E402
+from server_code.prediction import numpy_lstm  # noqa: E402
+
+_TOLERANCE = 1e-4  # 允许的最大绝对误差
+_BATCH_SIZE_LIST = [1, 8, 32]  # 校验及计时使用的批次大小
+# tests中使用的小型模型：(文件名, 时间步长, 两个LSTM层的单元数, 是否包含Dropout层)
+FIXTURE_MODELS = [('short_term', 24, (16, 8), True), ('long_term', 7, (12, 12), False)]
+
+
+def _build_random_model(path: str, time_step: int, units: tuple, dropout: bool) -> None:
+    """
+    按train_lstm中的模型结构构建随机权重模型并保存为h5文件
+    :param path: 模型文件保存路径
+    :param time_step: 时间步长
+    :param units: 两个LSTM层的单元数
+    :param dropout: 是否包含Dropout层
+    :return: None
+    """
+    from keras.models import Sequential
+    from keras.layers import LSTM, Dense, RepeatVector, TimeDistributed, Dropout
+    model = Sequential()
+    model.add(LSTM(units[0], activation='relu', input_shape=(time_step, 8)))
+    if dropout:
+        model.add(Dropout(0.5))
+    model.add(RepeatVector(time_step))
+    model.add(LSTM(units[1], activation='relu', return_sequences=True))
+    model.add(TimeDistributed(Dense(8)))
+    model.compile(optimizer='adam', loss='mse')
+    model.save(path)
+
+
+def _get_model_files() -> list:
+    """
+    获取需要校验的模型文件及其时间步长
+    :return:
+        list: (模型类型, 模型文件路径, 时间步长)列表
+    """
+    time_step_dict = {'SHORTTERM_LSTM': 24, 'LONGTERM_LSTM': 7}
+    model_files = []
+    temp_dir = tempfile.mkdtemp()
+    for model_type, file_name in MODEL_FILE_DICT.items():
+        path = os.path.join(MODEL_PATH, file_name)
+        if not os.path.exists(path):
+            path = os.path.join(temp_dir, file_name)
+            if model_type == 'SHORTTERM_LSTM':
+                _build_random_model(path, 24, (500, 200), True)
+            else:
+                _build_random_model(path, 7, (500, 500), False)
+        model_files.append((model_type, path, time_step_dict[model_type]))
+    return model_files
+
+
+def _timeit(func, repeat: int = 5) -> float:
+    """
+    获取函数多次运行的最短耗时（毫秒）
+    """
+    costs = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        costs.append(time.perf_counter() - start_time)
+    return min(costs) * 1000
+
+
+def write_fixture(folder: str) -> None:
+    """
+    按FIXTURE_MODELS构建随机权重的小型模型，并保存模型文件、输入及Keras推理结果，
+    使未安装tensorflow的环境中也能校验NumPy推理后端
+    :param folder: 保存目录，每个模型生成{文件名}.h5及{文件名}.npz（包含x_input及keras_output）
+    :return: None
+    """
+    from tensorflow.keras.models import load_model
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(0)
+    for name, time_step, units, dropout in FIXTURE_MODELS:
+        path = os.path.join(folder, name + '.h5')
+        _build_random_model(path, time_step, units, dropout)
+        x_input = rng.random((8, time_step, 8), dtype=np.float32)
+        keras_output = load_model(path, compile=False).predict(x_input, verbose=0)
+        np.savez(os.path.join(folder, name + '.npz'), x_input=x_input, keras_output=keras_output)
+
+
+def main() -> int:
+    from tensorflow.keras.models import load_model
+    failed = False
+    rng = np.random.default_rng(0)
+    for model_type, path, time_step in _get_model_files():
+        keras_model = load_model(path, compile=False)
+        numpy_model = numpy_lstm.load_model(path)
+        for batch_size in _BATCH_SIZE_LIST:
+            x_input = rng.random((batch_size, time_step, 8), dtype=np.float32)
+            keras_output = keras_model.predict(x_input, verbose=0)
+            numpy_output = numpy_model.predict(x_input)
+            max_error = float(np.max(np.abs(keras_output - numpy_output)))
+            failed = failed or max_error > _TOLERANCE or keras_output.shape != numpy_output.shape
+            keras_cost = _timeit(lambda: keras_model.predict(x_input, verbose=0))
+            numpy_cost = _timeit(lambda: numpy_model.predict(x_input))
+            print(f"{model_type} batch={batch_size}: 最大绝对误差{max_error:.2e}，"
+                  f"keras {keras_cost:.2f}ms，numpy {numpy_cost:.2f}ms")
+    print("一致性校验未通过" if failed else "一致性校验通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--fixture':
+        write_fixture(sys.argv[2])
+        sys.exit(0)
+    sys.exit(main())
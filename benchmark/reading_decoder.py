@@ -0,0 +1,62 @@
+"""
+    对比逐条eval解析、按日整体解析字符串成员以及解析二进制成员的吞吐量，并校验解析结果一致
+    以合成的每分钟一条记录（1440条）的日数据为输入
+    运行方式：python benchmark/reading_decoder.py [--days 100]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+from server_code.cleaned import reading_codec  # noqa: E402
+
+
+def _make_day(rng: np.random.Generator) -> tuple:
+    """
+    生成一日的字符串成员与二进制成员，特征值取float32可精确表示的值，便于比较两种编码的解析结果
+    """
+    values = np.round(rng.normal([20, 60, 3, 180, 0.2, 300, 35, 60], [5, 10, 1, 90, 0.5, 100, 10, 15],
+                                 size=(1440, 8)) * 4) / 4
+    times = [f"{minute // 60:02d}:{minute % 60:02d}:00" for minute in range(1440)]
+    text = [str([time] + row.tolist()).encode() for time, row in zip(times, values)]
+    binary = [reading_codec.encode_reading(time, row) for time, row in zip(times, values)]
+    return text, binary
+
+
+def _eval_day(members: list) -> tuple:
+    rows = [eval(member) for member in members]
+    return np.array([row[0] for row in rows]), np.array([row[1:] for row in rows], dtype=np.float64)
+
+
+def _run(name: str, func, days: list) -> list:
+    start_time = time.perf_counter()
+    results = [func(members) for members in days]
+    cost = time.perf_counter() - start_time
+    rows = sum(len(members) for members in days)
+    print(f"{name}：{len(days)}日{rows}条耗时{cost * 1000:.1f}ms（{rows / cost:,.0f}条/秒）")
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=100)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    days = [_make_day(rng) for _ in range(args.days)]
+    expected = _run('逐条eval', _eval_day, [text for text, _ in days])
+    text_results = _run('按日解析字符串成员', reading_codec.decode_day, [text for text, _ in days])
+    binary_results = _run('解析二进制成员', reading_codec.decode_day, [binary for _, binary in days])
+    for i, (times, values) in enumerate(expected):
+        for result in (text_results[i], binary_results[i]):
+            if not (np.array_equal(times, result[0]) and np.array_equal(values, result[1])):
+                print(f"第{i}日的解析结果不一致")
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+    对比原有先转换为Python列表再以json.dumps编码与各响应编码器编码批量预测结果的耗时及响应体大小
+    以批量预测接口的响应体为例，每个预测项为形如(24, 8)的预测结果
+    运行方式：python benchmark/response_encoding.py [--items 200] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+import numpy as np
+from flask import Flask
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+from server_code.utils import result, response_encoder  # noqa: E402
+
+
+def _make_payload(rng: np.random.Generator, n_items: int) -> list:
+    return [OrderedDict([('station', str(i % 10 + 1)), ('start_date', '2023-01-01'), ('model_type', 'SHORTTERM_LSTM'),
+                         ('data', np.round(rng.normal(50, 20, size=(24, 8)))), ('msg', None)])
+            for i in range(n_items)]
+
+
+def _legacy_encode(items: list) -> bytes:
+    """
+    原有的编码方式：预测结果先以tolist转换为嵌套列表，再以json.dumps编码
+    """
+    items = [OrderedDict(item, data=item['data'].tolist()) for item in items]
+    return json.dumps(OrderedDict([('code', 200), ('msg', '成功获取批量预测数据'), ('data', items)])).encode()
+
+
+def _run(name: str, func, repeat: int) -> None:
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    cost = (time.perf_counter() - start_time) / repeat
+    print(f"{name}：每次编码耗时{cost * 1000:.2f}ms，响应体{len(body) / 1024:.1f}KB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    items = _make_payload(np.random.default_rng(0), args.items)
+    app = Flask(__name__)
+    _run('tolist后json.dumps', lambda: _legacy_encode(items), args.repeat)
+    for mimetype in response_encoder.get_mimetypes():
+        with app.test_request_context(headers={'Accept': mimetype}):
+            response = result.success('成功获取批量预测数据', items)
+            if response.mimetype != mimetype:
+                print(f"{mimetype}：该响应体无法以此格式编码，使用{response.mimetype}")
+                continue
+            _run(mimetype, lambda: result.success('成功获取批量预测数据', items).get_data(), args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
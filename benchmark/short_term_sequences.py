@@ -0,0 +1,110 @@
+"""
+    对比原有逐日读取两次并分别拟合MinMaxScaler的短期模型序列划分与一次读取、整体归一化并缓存的序列划分的耗时，并校验两者结果一致
+    以合成的气象站数据集为输入（见synthetic_data），分别在仅有CSV数据集及已转换出列式存储与聚合存储两种情况下测量，
+    新的序列划分分别测量无缓存时与读取缓存时的耗时
+    运行方式：python benchmark/short_term_sequences.py [--days 60] [--repeat 3]
+    依赖：pip install fakeredis h5py scikit-learn
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+import stand_ins  # noqa: E402
+import synthetic_data  # noqa: E402
+import repository  # noqa: E402
+import data_utils as dtools  # noqa: E402
+from storage import column_store, aggregate_store  # noqa: E402
+from train_code.train_model import pre_process  # noqa: E402
+
+_STATION = '1'
+
+
+def _legacy_split(station: str, start_date: str, end_date: str) -> tuple:
+    """
+    原有实现：每一日作为输入序列与输出序列各读取一次，逐日拟合MinMaxScaler后以列表拼接
+    """
+    existing_dates = repository.get_csv_dates(station, start_date, end_date)
+    x, y = list(), list()
+    scaler = None
+    for i in range(len(existing_dates) - 1):
+        avg_df_current = repository.get_hour_avg_data(station, existing_dates[i])
+        avg_df_next = repository.get_hour_avg_data(station, existing_dates[i + 1])
+        df_data_current, scaler = dtools.get_scaler_result(avg_df_current)
+        df_data_next, _ = dtools.get_scaler_result(avg_df_next)
+        x.append(df_data_current)
+        y.append(df_data_next)
+    return np.array(x), np.array(y), scaler
+
+
+def _run(name: str, func, repeat: int, setup=None) -> tuple:
+    costs = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        result = func()
+        costs.append(time.perf_counter() - start_time)
+    print(f"{name}：{min(costs) * 1000:.1f}ms")
+    return result
+
+
+def _check(expected: tuple, actual: tuple) -> bool:
+    x, y, scaler = expected
+    new_x, new_y, new_scaler = actual
+    return x.shape == new_x.shape and y.shape == new_y.shape and np.allclose(x, new_x) and np.allclose(y, new_y) \
+        and np.allclose(scaler.data_min_, new_scaler.data_min_) and np.allclose(scaler.data_max_, new_scaler.data_max_)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    # pandas对逐元素解析时间及'H'频率的警告每次调用都会输出，不影响测量
+    warnings.simplefilter('ignore', category=UserWarning)
+    warnings.simplefilter('ignore', category=FutureWarning)
+    # 数据集中缺失的日期由前向填充，原有实现与新的实现均需一致处理
+    dates = synthetic_data.get_dates('2023-01-01', args.days)
+    kept_dates = [date for i, date in enumerate(dates) if i == 0 or i % 10 != 5]
+    folder = tempfile.mkdtemp()
+    try:
+        file_path = stand_ins.use_folder(os.path.join(folder, 'data'))
+        synthetic_data.write_dataset(file_path, [_STATION], kept_dates)
+        cache_path = os.path.join(folder, 'cache') + '/'
+        pre_process.TRAIN_CACHE_PATH = cache_path
+
+        def clear_cache():
+            shutil.rmtree(cache_path, ignore_errors=True)
+
+        def split():
+            return pre_process.split_short_term_sequences(_STATION, dates[0], dates[-1])
+
+        print(f"{args.days}日（缺失{args.days - len(kept_dates)}日），结果为{args.repeat}次中的最小耗时")
+        for storage in ('csv', 'store'):
+            if storage == 'store':
+                column_store.convert_all(file_path)
+                aggregate_store.convert_all(file_path)
+                stand_ins.use_folder(os.path.join(folder, 'data'))
+            expected = _run(f'{storage} 原有逐日划分', lambda: _legacy_split(_STATION, dates[0], dates[-1]), args.repeat)
+            cold = _run(f'{storage} 一次读取并整体划分（无缓存）', split, args.repeat, setup=clear_cache)
+            warm = _run(f'{storage} 一次读取并整体划分（读取缓存）', split, args.repeat)
+            if not (_check(expected, cold) and _check(expected, warm)):
+                print(f"{storage}：序列划分结果不一致")
+                return 1
+    finally:
+        shutil.rmtree(folder)
+    print("原有实现与新的实现划分结果一致")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
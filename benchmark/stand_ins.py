@@ -0,0 +1,213 @@
+"""
+    定义基准测试使用的本地替代服务，使服务代码无需MySQL、Redis及训练好的模型文件即可运行：
+    station_date表以SQLite数据库文件代替MySQL（%s占位符转换为?），同步与异步连接均连接到同一文件；Redis以fakeredis代替；
+    长短期模型以按train_lstm中的结构构建、随机权重的小型NumPy LSTM模型代替；
+    数据集、列式存储、聚合存储、水位线、日期清单及清洗任务状态的根路径均指向给定的临时目录
+    依赖：pip install fakeredis h5py
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+from typing import Any, List, Tuple
+import numpy as np
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+import fakeredis  # noqa: E402
+import repository  # noqa: E402
+from config import SHORT_TERM_MODEL_LIST, LONG_TERM_MODEL_LIST  # noqa: E402
+from server_code import application, async_application  # noqa: E402
+from server_code.cleaned import etl_jobs  # noqa: E402
+from cleaned import meteo_data_cleaned  # noqa: E402
+from server_code.prediction import model_registry, numpy_lstm  # noqa: E402
+from storage import column_store, aggregate_store, etl_watermark, date_manifest  # noqa: E402
+
+SHORT_TERM_TIME_STEP = 24
+LONG_TERM_TIME_STEP = 7
+N_FEATURES = 8
+
+
+class _SQLiteCursor:
+    def __init__(self, connection: sqlite3.Connection):
+        self._cursor = connection.cursor()
+
+    def execute(self, sql: str, args: tuple = ()):
+        return self._cursor.execute(sql.replace('%s', '?'), args)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    与pymysql连接接口兼容的SQLite连接，供连接池创建连接使用
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self) -> _SQLiteCursor:
+        return _SQLiteCursor(self._connection)
+
+    def close(self):
+        self._connection.close()
+
+
+class _AsyncSQLiteCursor:
+    def __init__(self, connection: sqlite3.Connection):
+        self._cursor = connection.cursor()
+
+    async def execute(self, sql: str, args: tuple = ()):
+        self._cursor.execute(sql.replace('%s', '?'), args)
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    async def close(self):
+        self._cursor.close()
+
+
+class _AsyncSQLiteConnection:
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+    async def cursor(self) -> _AsyncSQLiteCursor:
+        return _AsyncSQLiteCursor(self._connection)
+
+    def close(self):
+        self._connection.close()
+
+
+class AsyncSQLitePool:
+    """
+    与aiomysql.Pool接口兼容的SQLite连接池，供异步MySQL访问使用
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._idle = []
+
+    async def acquire(self) -> _AsyncSQLiteConnection:
+        return self._idle.pop() if self._idle else _AsyncSQLiteConnection(self._path)
+
+    def release(self, connection: _AsyncSQLiteConnection) -> None:
+        self._idle.append(connection)
+
+    def close(self) -> None:
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+    async def wait_closed(self) -> None:
+        await asyncio.sleep(0)
+
+
+def use_sqlite_station_date(path: str, station_dates: List[Tuple[str, str]]) -> None:
+    """
+    创建station_date表并写入记录，此后服务的同步与异步MySQL连接均连接到该SQLite数据库
+    :param path: SQLite数据库文件路径
+    :param station_dates: (气象站编号, 日期)列表
+    :return:
+        None: 直到写入完成为止
+    """
+    connection = sqlite3.connect(path)
+    connection.execute("create table if not exists station_date (id integer primary key, station text, date text)")
+    connection.execute("create index if not exists idx_station_date on station_date (station, date)")
+    connection.execute("delete from station_date")
+    connection.executemany("insert into station_date (station, date) values (?, ?)", station_dates)
+    connection.commit()
+    connection.close()
+    application.set_mysql_creator(lambda: SQLiteConnection(path))
+
+    async def create_pool() -> AsyncSQLitePool:
+        return AsyncSQLitePool(path)
+
+    async_application.set_async_mysql_factory(create_pool)
+
+
+def use_fake_redis() -> Any:
+    """
+    以同一个fakeredis服务代替同步与异步的Redis客户端
+    :return:
+        Any: 同步的fakeredis客户端，用于写入源数据
+    """
+    server = fakeredis.FakeServer()
+    application.set_redis_factory(lambda: fakeredis.FakeRedis(server=server))
+    async_application.set_async_redis_factory(lambda: fakeredis.FakeAsyncRedis(server=server))
+    return application.get_redis_client()
+
+
+def make_tiny_model(time_step: int, units: Tuple[int, int] = (16, 16),
+                    seed: int = 0) -> numpy_lstm.NumpyLSTMModel:
+    """
+    按train_lstm中的 LSTM -> RepeatVector -> LSTM -> TimeDistributed(Dense) 结构构建随机权重的NumPy推理模型
+    :param time_step: 时间步长，短期模型为24，长期模型为7
+    :param units: 两个LSTM层的单元数
+    :param seed: 随机数种子
+    :return:
+        NumpyLSTMModel: 输入输出均形如(n_samples, time_step, 8)的模型
+    """
+    rng = np.random.default_rng(seed)
+
+    def lstm_weights(n_inputs: int, n_units: int) -> List[np.ndarray]:
+        return [rng.normal(0, 0.2, (n_inputs, 4 * n_units)).astype(np.float32),
+                rng.normal(0, 0.2, (n_units, 4 * n_units)).astype(np.float32),
+                np.zeros(4 * n_units, dtype=np.float32)]
+
+    model_config = {'config': {'layers': [
+        {'class_name': 'LSTM', 'config': {'name': 'lstm', 'units': units[0], 'activation': 'relu'}},
+        {'class_name': 'RepeatVector', 'config': {'name': 'repeat_vector', 'n': time_step}},
+        {'class_name': 'LSTM', 'config': {'name': 'lstm_1', 'units': units[1], 'activation': 'relu',
+                                          'return_sequences': True}},
+        {'class_name': 'TimeDistributed', 'config': {'name': 'time_distributed',
+                                                     'layer': {'class_name': 'Dense', 'config': {'name': 'dense'}}}},
+    ]}}
+    layer_weights = {
+        'lstm': lstm_weights(N_FEATURES, units[0]),
+        'lstm_1': lstm_weights(units[0], units[1]),
+        'time_distributed': [rng.normal(0, 0.2, (units[1], N_FEATURES)).astype(np.float32),
+                             np.full(N_FEATURES, 0.5, dtype=np.float32)],
+    }
+    return numpy_lstm.NumpyLSTMModel(numpy_lstm._build_layers(model_config, layer_weights,
+                                                              dict(numpy_lstm._ACTIVATIONS)))
+
+
+def use_tiny_models() -> None:
+    """
+    以随机权重的小型模型代替模型注册表中的长短期模型，不读取模型文件，也不开启模型文件监听线程
+    :return:
+        None: 直到替换完成为止
+    """
+    for model_type in SHORT_TERM_MODEL_LIST:
+        model_registry._models[model_type] = (make_tiny_model(SHORT_TERM_TIME_STEP), 0.0)
+    for model_type in LONG_TERM_MODEL_LIST:
+        model_registry._models[model_type] = (make_tiny_model(LONG_TERM_TIME_STEP), 0.0)
+
+
+def use_folder(folder: str, stations: List[str] = ()) -> str:
+    """
+    将数据集、列式存储、聚合存储、水位线、日期清单及清洗任务状态的根路径指向folder下的子目录，并清空各自的进程内缓存
+    :param folder: 根目录
+    :param stations: 需创建数据集目录的气象站编号列表，数据清洗时各气象站的目录需已存在
+    :return:
+        str: 数据集根路径，以/结尾
+    """
+    file_path = os.path.join(folder, 'csv') + '/'
+    repository.FILE_PATH = meteo_data_cleaned.FILE_PATH = date_manifest.FILE_PATH = file_path
+    column_store.COLUMN_STORE_PATH = os.path.join(folder, 'column') + '/'
+    aggregate_store.AGGREGATE_STORE_PATH = os.path.join(folder, 'aggregate') + '/'
+    etl_watermark.ETL_WATERMARK_PATH = os.path.join(folder, 'watermark') + '/'
+    date_manifest.DATE_MANIFEST_PATH = os.path.join(folder, 'manifest') + '/'
+    etl_jobs.ETL_JOB_PATH = os.path.join(folder, 'job') + '/'
+    for cache in (column_store._station_cache, aggregate_store._station_cache, date_manifest._station_cache,
+                  etl_watermark._watermarks, repository._stats_cache):
+        cache.clear()
+    os.makedirs(file_path, exist_ok=True)
+    for station in stations:
+        os.makedirs(f"{file_path}{station}", exist_ok=True)
+    return file_path
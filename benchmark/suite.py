@@ -0,0 +1,229 @@
+"""
+    基准测试套件：生成合成的气象站数据集并接入本地替代服务（见synthetic_data与stand_ins），逐一测量各热点方法的耗时，
+    结果写入JSON文件，可通过--compare与此前的结果逐项对比中位数耗时
+    读取类方法分别在两种存储下测量：csv 仅有CSV数据集；store 由CSV数据集转换出列式存储与聚合存储后，即ETL写入后的状态
+    1. 数据读取：get_merged_csv_data（单个气象站的全部日期）、get_one_csv_data、get_seven_csv_data；
+    2. 计算：calculate_hour_avg、calculate_correlation_matrix（单个气象站全部日期的合并数据），以及服务中计算协相关矩阵的get_correlation_list；
+    3. 模型预测：predict_by_model及predict_batch_by_model的长短期模型，使用随机权重的小型NumPy模型，关闭预测结果缓存；
+    4. 请求校验：validate_station_date_range，以SQLite代替MySQL的station_date表；
+    5. 数据清洗：etl_data，以fakeredis代替Redis，每次清洗前切换至新的空目录；另测量源数据未变化时再次清洗的耗时
+    除预测结果缓存外，各进程内缓存与服务运行时一致；每项先执行一次预热，不计入结果
+    运行方式：python benchmark/suite.py [--stations 3] [--days 30] [--repeat 5] [--missing-hours 2] [--seed 0]
+                                       [--json 结果文件路径] [--compare 此前的结果文件路径] [--only 名称 ...]
+    依赖：pip install fakeredis h5py scikit-learn
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from collections import OrderedDict
+from typing import Callable, List, Optional
+import numpy as np
+import pandas as pd
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server_code')]
+
+import stand_ins  # noqa: E402
+import synthetic_data  # noqa: E402
+import repository  # noqa: E402
+import data_utils as dtools  # noqa: E402
+from server_code.analyze import meteo_data_analyze  # noqa: E402
+from cleaned import meteo_data_cleaned  # noqa: E402
+from server_code.prediction import result_cache  # noqa: E402
+from service import analyze_service  # noqa: E402
+from service.prediction_service import predict_by_model, predict_batch_by_model  # noqa: E402
+from storage import column_store, aggregate_store  # noqa: E402
+
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ALL_ELEMENTS = '1,2,3,4,5,6,7,8'
+_MIN_DAYS = 7
+
+
+class _Suite:
+    """
+    按顺序执行各项测量并收集结果
+    """
+
+    def __init__(self, repeat: int, only: Optional[List[str]]):
+        self.repeat = repeat
+        self.only = only
+        self.results = OrderedDict()
+
+    def measure(self, name: str, func: Callable, params: dict, setup: Optional[Callable] = None,
+                warmup: bool = True) -> None:
+        """
+        测量一项方法的耗时
+        :param name: 结果名称，形如 存储/方法名
+        :param func: 无参数的被测方法
+        :param params: 记录在结果中的测量参数
+        :param setup: 每次测量前执行、不计入耗时的准备方法
+        :param warmup: 是否先执行一次不计入结果的预热
+        :return:
+            None: 直到repeat次测量完成为止
+        """
+        if self.only and not any(keyword in name for keyword in self.only):
+            return
+        if warmup:
+            if setup is not None:
+                setup()
+            func()
+        costs = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start_time = time.perf_counter()
+            func()
+            costs.append((time.perf_counter() - start_time) * 1000)
+        self.results[name] = OrderedDict([
+            ('params', params),
+            ('repeat', self.repeat),
+            ('min_ms', round(min(costs), 3)),
+            ('median_ms', round(statistics.median(costs), 3)),
+            ('mean_ms', round(statistics.mean(costs), 3)),
+            ('max_ms', round(max(costs), 3)),
+        ])
+        print(f"{name:<52}{statistics.median(costs):>10.2f}ms（最小{min(costs):.2f}ms，最大{max(costs):.2f}ms）")
+
+
+def _measure_reads(suite: _Suite, storage: str, stations: List[str], dates: List[str]) -> None:
+    """
+    测量数据读取、协相关矩阵及模型预测的耗时，结果名称以存储名为前缀
+    """
+    station, date = stations[0], dates[-1]
+    suite.measure(f'{storage}/get_merged_csv_data', lambda: repository.get_merged_csv_data(station, dates[0], date),
+                  {'station': station, 'days': len(dates)})
+    suite.measure(f'{storage}/get_one_csv_data', lambda: repository.get_one_csv_data(station, date),
+                  {'station': station})
+    suite.measure(f'{storage}/get_seven_csv_data', lambda: repository.get_seven_csv_data(station, date),
+                  {'station': station})
+    suite.measure(f'{storage}/get_correlation_list',
+                  lambda: analyze_service.get_correlation_list(station, dates[0], date, _ALL_ELEMENTS),
+                  {'station': station, 'days': len(dates), 'elements': _ALL_ELEMENTS})
+    for model_type in ('SHORTTERM_LSTM', 'LONGTERM_LSTM'):
+        suite.measure(f'{storage}/predict_by_model/{model_type}', lambda: predict_by_model(station, date, model_type),
+                      {'station': station})
+    # 长期模型需要此前七日的数据，批量预测项使用最后七日
+    items = [{'station': item_station, 'start_date': item_date, 'model_type': model_type}
+             for item_station in stations for item_date in dates[-_MIN_DAYS:]
+             for model_type in ('SHORTTERM_LSTM', 'LONGTERM_LSTM')]
+    suite.measure(f'{storage}/predict_batch_by_model', lambda: predict_batch_by_model(items, [None] * len(items)),
+                  {'items': len(items)})
+
+
+def _get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=_ROOT_PATH, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results: OrderedDict, path: str) -> None:
+    """
+    与此前的结果逐项对比中位数耗时，比值小于1表示本次更快
+    """
+    with open(path, encoding='utf-8') as file:
+        previous = json.load(file)
+    print(f"\n与{path}（{previous['meta'].get('git_commit')}，{previous['meta'].get('time')}）对比中位数耗时：")
+    for name, item in results.items():
+        previous_item = previous['results'].get(name)
+        if previous_item is None:
+            print(f"{name:<52}{'此前无结果':>10}")
+            continue
+        ratio = item['median_ms'] / previous_item['median_ms'] if previous_item['median_ms'] else float('inf')
+        print(f"{name:<52}{previous_item['median_ms']:>10.2f}ms -> {item['median_ms']:>10.2f}ms  {ratio:.2f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='测量各热点方法的耗时')
+    parser.add_argument('--stations', type=int, default=3)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--missing-hours', type=int, default=2, help='清洗的源数据中每日随机缺失的小时数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=f"suite_{time.strftime('%Y%m%d_%H%M%S')}.json", help='结果文件路径')
+    parser.add_argument('--compare', help='此前的结果文件路径')
+    parser.add_argument('--only', nargs='*', help='仅测量名称包含任一关键字的项')
+    args = parser.parse_args()
+    # pandas对逐元素解析时间及'H'频率的警告每次调用都会输出，不影响测量
+    warnings.simplefilter('ignore', category=UserWarning)
+    warnings.simplefilter('ignore', category=FutureWarning)
+    if args.days < _MIN_DAYS:
+        parser.error(f'--days不能小于{_MIN_DAYS}，长期模型需要连续七日的数据')
+    stations = [str(i + 1) for i in range(args.stations)]
+    dates = synthetic_data.get_dates('2023-01-01', args.days)
+    suite = _Suite(args.repeat, args.only)
+    folder = tempfile.mkdtemp()
+    try:
+        file_path = stand_ins.use_folder(os.path.join(folder, 'data'))
+        synthetic_data.write_dataset(file_path, stations, dates, args.seed)
+        stand_ins.use_sqlite_station_date(os.path.join(folder, 'station_date.sqlite'),
+                                          synthetic_data.get_station_dates(stations, dates))
+        stand_ins.use_tiny_models()
+        result_cache.PREDICTION_CACHE_MAX_BYTES = 0
+        print(f"合成数据集：{len(stations)}个气象站 x {len(dates)}日，每项测量{args.repeat}次，结果为中位数耗时")
+
+        _measure_reads(suite, 'csv', stations, dates)
+        day_data = pd.read_csv(repository.get_csv_path(stations[0], dates[-1]))
+        suite.measure('compute/calculate_hour_avg', lambda: dtools.calculate_hour_avg(day_data.copy()), {'rows': 1440})
+        merged_data = repository.get_merged_csv_data(stations[0], dates[0], dates[-1])
+        suite.measure('compute/calculate_correlation_matrix',
+                      lambda: meteo_data_analyze.calculate_correlation_matrix(_ALL_ELEMENTS, merged_data),
+                      {'rows': len(merged_data), 'elements': _ALL_ELEMENTS})
+        suite.measure('sqlite/validate_station_date_range',
+                      lambda: repository.validate_station_date_range(stations[0], dates[0], dates[-1]),
+                      {'station': stations[0], 'days': len(dates)})
+
+        column_store.convert_all(file_path)
+        aggregate_store.convert_all(file_path)
+        stand_ins.use_folder(os.path.join(folder, 'data'))
+        _measure_reads(suite, 'store', stations, dates)
+
+        synthetic_data.populate_redis(stand_ins.use_fake_redis(), stations, dates, args.seed, args.missing_hours)
+        etl_folder = os.path.join(folder, 'etl')
+
+        def use_empty_folder():
+            shutil.rmtree(etl_folder, ignore_errors=True)
+            stand_ins.use_folder(etl_folder, stations)
+
+        def etl():
+            meteo_data_cleaned.etl_data(stations[0], dates[0], dates[-1])
+
+        etl_params = {'station': stations[0], 'days': len(dates), 'missing_hours': args.missing_hours}
+        suite.measure('redis/etl_data', etl, etl_params, setup=use_empty_folder)
+        suite.measure('redis/etl_data/unchanged', etl, etl_params)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    meta = OrderedDict([
+        ('time', time.strftime('%Y-%m-%d %H:%M:%S')),
+        ('git_commit', _get_git_commit()),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('cpu_count', os.cpu_count()),
+        ('numpy', np.__version__),
+        ('pandas', pd.__version__),
+        ('stations', args.stations),
+        ('days', args.days),
+        ('repeat', args.repeat),
+        ('missing_hours', args.missing_hours),
+        ('seed', args.seed),
+    ])
+    with open(args.json, 'w', encoding='utf-8') as file:
+        json.dump(OrderedDict([('meta', meta), ('results', suite.results)]), file, ensure_ascii=False, indent=2)
+    print(f"结果已写入{args.json}")
+    if args.compare:
+        _compare(suite.results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
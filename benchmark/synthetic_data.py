@@ -0,0 +1,153 @@
+"""
+    生成合成的气象站数据集，供基准测试使用：每日1440条每分钟记录、八个特征，按 {station}/{station}_data_{date}.csv 写入，
+    与ETL清洗后写出的数据集格式一致；也可将同样的数据以有序集合成员的形式写入Redis，作为数据清洗的源数据
+    各特征按日周期变化并叠加噪声：气温与日照在午后达到峰值，湿度与气温反相，降雨大部分时间为0，PM10与PM2.5正相关
+    运行方式：python benchmark/synthetic_data.py --output 输出目录 [--stations 3] [--days 30] [--start-date 2023-01-01] [--seed 0]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['Temperature', 'Humidity', 'Speed', 'Direction', 'Rain', 'Sunlight', 'PM2.5', 'PM10']
+MINUTES_PER_DAY = 1440
+
+_TIMES = np.array([f"{minute // 60:02d}:{minute % 60:02d}:00" for minute in range(MINUTES_PER_DAY)], dtype=object)
+
+
+def get_dates(start_date: str, days: int) -> List[str]:
+    """
+    获取从起始日期开始的连续日期
+    :param start_date: 起始日期
+    :param days: 天数
+    :return:
+        List[str]: YYYY-MM-DD格式的日期列表
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+
+
+def make_day(rng: np.random.Generator, day_of_year: int) -> np.ndarray:
+    """
+    生成一日每分钟的八个特征值
+    :param rng: 随机数生成器
+    :param day_of_year: 一年中的第几日，用于生成季节变化
+    :return:
+        np.ndarray: 形如(1440, 8)、保留一位小数的特征值
+    """
+    hours = np.arange(MINUTES_PER_DAY) / 60
+    # 日周期在14时达到峰值
+    diurnal = np.cos((hours - 14) / 24 * 2 * np.pi)
+    season = np.cos((day_of_year - 200) / 365 * 2 * np.pi)
+    temperature = 18 + 10 * season + 5 * diurnal + rng.normal(0, 0.3, MINUTES_PER_DAY).cumsum() * 0.05
+    humidity = np.clip(65 - 15 * diurnal + rng.normal(0, 2, MINUTES_PER_DAY), 5, 100)
+    speed = np.abs(3 + 1.5 * diurnal + rng.normal(0, 0.8, MINUTES_PER_DAY))
+    direction = (rng.uniform(0, 360) + rng.normal(0, 2, MINUTES_PER_DAY).cumsum()) % 360
+    rain = np.zeros(MINUTES_PER_DAY)
+    if rng.random() < 0.3:
+        start = rng.integers(0, MINUTES_PER_DAY - 180)
+        rain[start:start + 180] = np.abs(rng.normal(0.5, 0.4, 180))
+    sunlight = np.clip(900 * np.sin((hours - 6) / 12 * np.pi), 0, None) * (1 - 0.6 * (rain > 0))
+    sunlight = np.where(sunlight > 0, sunlight + rng.normal(0, 20, MINUTES_PER_DAY), 0).clip(0)
+    pm25 = np.abs(35 - 10 * diurnal + rng.normal(0, 3, MINUTES_PER_DAY).cumsum() * 0.1)
+    pm10 = pm25 * 1.6 + np.abs(rng.normal(0, 4, MINUTES_PER_DAY))
+    return np.round(np.column_stack([temperature, humidity, speed, direction, rain, sunlight, pm25, pm10]), 1)
+
+
+def to_dataframe(values: np.ndarray) -> pd.DataFrame:
+    """
+    将一日的特征值转换为包含Time列及八个特征列的数据窗
+    :param values: 形如(1440, 8)的特征值
+    :return:
+        DataFrame: 与ETL清洗后写出的CSV文件列一致的数据窗
+    """
+    data = pd.DataFrame(values, columns=FEATURE_COLUMNS)
+    data.insert(0, 'Time', _TIMES)
+    return data
+
+
+def iter_days(stations: List[str], dates: List[str], seed: int = 0):
+    """
+    按气象站、日期的顺序生成各日数据，相同的参数总是生成相同的数据
+    :param stations: 气象站编号列表
+    :param dates: 日期列表
+    :param seed: 随机数种子
+    :return:
+        Iterator[Tuple[str, str, np.ndarray]]: (气象站编号, 日期, 形如(1440, 8)的特征值)
+    """
+    for station in stations:
+        rng = np.random.default_rng([seed, int(station) if station.isdigit() else len(station)])
+        for date in dates:
+            yield station, date, make_day(rng, datetime.strptime(date, '%Y-%m-%d').timetuple().tm_yday)
+
+
+def write_dataset(file_path: str, stations: List[str], dates: List[str], seed: int = 0) -> int:
+    """
+    写入 {file_path}{station}/{station}_data_{date}.csv 数据集目录
+    :param file_path: 数据集根路径，以/结尾
+    :param stations: 气象站编号列表
+    :param dates: 日期列表
+    :param seed: 随机数种子
+    :return:
+        int: 写入的文件数
+    """
+    count = 0
+    for station, date, values in iter_days(stations, dates, seed):
+        os.makedirs(f"{file_path}{station}", exist_ok=True)
+        to_dataframe(values).to_csv(f"{file_path}{station}/{station}_data_{date}.csv", index=False)
+        count += 1
+    return count
+
+
+def populate_redis(client, stations: List[str], dates: List[str], seed: int = 0, missing_hours: int = 0) -> int:
+    """
+    将各日数据以 {station}_data_{date} 有序集合写入Redis，成员为记录列表的字符串形式，分值为一日中的分钟数
+    :param client: Redis客户端
+    :param stations: 气象站编号列表
+    :param dates: 日期列表
+    :param seed: 随机数种子
+    :param missing_hours: 每日随机缺失的小时数（0时始终保留），用于触发清洗时的前向填充
+    :return:
+        int: 写入的记录数
+    """
+    count = 0
+    rng = np.random.default_rng(seed)
+    for station, date, values in iter_days(stations, dates, seed):
+        missing = set(rng.choice(np.arange(1, 24), size=missing_hours, replace=False).tolist()) if missing_hours else ()
+        members = {str([_TIMES[minute]] + values[minute].tolist()): minute
+                   for minute in range(MINUTES_PER_DAY) if minute // 60 not in missing}
+        client.zadd(f"{station}_data_{date}", members)
+        count += len(members)
+    return count
+
+
+def get_station_dates(stations: List[str], dates: List[str]) -> List[Tuple[str, str]]:
+    """
+    获取全部(气象站编号, 日期)组合，用于写入station_date表
+    :param stations: 气象站编号列表
+    :param dates: 日期列表
+    :return:
+        List[Tuple[str, str]]: (气象站编号, 日期)列表
+    """
+    return [(station, date) for station in stations for date in dates]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='生成合成的气象站数据集')
+    parser.add_argument('--output', required=True, help='数据集根路径')
+    parser.add_argument('--stations', type=int, default=3)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--start-date', default='2023-01-01')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    stations = [str(i + 1) for i in range(args.stations)]
+    count = write_dataset(os.path.join(args.output, ''), stations, get_dates(args.start_date, args.days), args.seed)
+    print(f"已写入{count}个日数据集文件至{args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
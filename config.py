@@ -5,6 +5,7 @@
 FILE_PATH = "C:/Users/haruki/PycharmProjects/meteo_data_csv/"  # 数据集文件路径
 MODEL_PATH = "C:/Users/haruki/PycharmProjects/meteo-anapredict-server/meteo_model/"  # 模型文件路径
 TRAIN_LOG_PATH = "C:/Users/haruki/PycharmProjects/meteo-anapredict-server/train_log/"  # 模型训练日志路径
+TRAIN_CACHE_PATH = "C:/Users/haruki/PycharmProjects/meteo_train_cache/"  # 按气象站及日期范围缓存的训练数据集路径
 
 SHORT_TERM_MODEL_LIST = [
     'SHORTTERM_LSTM',
@@ -13,3 +14,48 @@ SHORT_TERM_MODEL_LIST = [
 LONG_TERM_MODEL_LIST = [
     'LONGTERM_LSTM',
 ]  # 长期（七日）模型列表
+
+MODEL_FILE_DICT = {
+    'SHORTTERM_LSTM': 'short_lstm.h5',
+    'LONGTERM_LSTM': 'long_lstm.h5',
+}  # 模型类型与模型文件名的对应关系
+MODEL_RELOAD_INTERVAL = 10  # 检查模型文件是否更新的时间间隔（秒）
+INFERENCE_BACKEND = 'keras'  # 模型推理后端：keras 使用TensorFlow加载模型；numpy 仅读取模型权重，使用纯NumPy进行前向计算
+
+BATCH_MAX_SIZE = 32  # 微批推理时单批次最多合并的样本数
+BATCH_MAX_WAIT_MS = 5  # 微批推理时等待后续请求合并的最长时间（毫秒）
+
+BATCH_PREDICTION_MAX_ITEMS = 200  # 批量预测接口单次请求最多包含的预测项数
+
+PREDICTION_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 预测结果缓存占用的最大字节数
+
+COLUMN_STORE_PATH = "C:/Users/haruki/PycharmProjects/meteo_data_column/"  # 按气象站存放的列式数据文件路径
+AGGREGATE_STORE_PATH = "C:/Users/haruki/PycharmProjects/meteo_data_aggregate/"  # 按气象站存放的每小时及每日平均值文件路径
+COLUMN_STORE_COMPACT_RATIO = 0.2  # 列式存储中被替换的旧数据行数超过总行数的该比例时重写气象站的列文件
+
+MYSQL_POOL_MAX_SIZE = 8  # MySQL连接池最多持有的连接数（含使用中与空闲）
+MYSQL_POOL_ACQUIRE_TIMEOUT = 10  # 连接池已满时等待归还连接的最长时间（秒）
+MYSQL_POOL_IDLE_TIMEOUT = 300  # 空闲连接超过该时间（秒）后关闭
+MYSQL_POOL_HEALTH_CHECK_INTERVAL = 30  # 空闲超过该时间（秒）的连接在取出前执行select 1检查是否可用
+
+STATION_DATE_INDEX_RESYNC_INTERVAL = 300  # 气象站日期索引与station_date表重新同步的时间间隔（秒）
+
+ETL_MAX_WORKERS = 4  # 数据清洗时并行处理各日数据的进程数，为0时在当前进程中依次处理
+ETL_PIPELINE_DAYS = 31  # 数据清洗时单次Redis管道中合并读取的日数据个数
+DATE_MANIFEST_PATH = "C:/Users/haruki/PycharmProjects/meteo_data_manifest/"  # 按气象站存放的已清洗日期清单文件路径
+ETL_WATERMARK_PATH = "C:/Users/haruki/PycharmProjects/meteo_data_watermark/"  # 按气象站存放的数据清洗水位线文件路径
+ETL_JOB_MAX_WORKERS = 2  # 同时执行的数据清洗任务数，同一气象站的任务始终依次执行
+ETL_JOB_HISTORY_SIZE = 200  # 保留以供查询状态的已结束数据清洗任务数
+ETL_JOB_PATH = "C:/Users/haruki/PycharmProjects/meteo_etl_job/"  # 数据清洗任务状态文件路径，多个worker进程均可查询任意任务的状态
+
+SERVER_BIND = '0.0.0.0:9594'  # 生产模式下服务监听的地址
+SERVER_WORKERS = 4  # 生产模式下的worker进程数
+SERVER_THREADS = 4  # 生产模式下每个worker进程处理请求的线程数
+ASYNC_EXECUTOR_MAX_WORKERS = 8  # 异步服务模式下执行pandas计算、模型推理等阻塞操作的线程数
+
+PROFILE_ENABLED = False  # 是否为各接口安装性能剖析钩子，为False时不产生任何开销
+PROFILE_SAMPLE_RATE = 0.0  # 随机剖析的请求比例，请求头X-Profile存在时总是剖析
+PROFILE_FORMAT = 'pstats'  # 剖析结果格式：pstats 为cProfile统计结果；collapsed 为采样得到的折叠栈，用于生成火焰图
+PROFILE_SAMPLE_INTERVAL_MS = 1  # collapsed格式采样调用栈的时间间隔（毫秒）
+PROFILE_MAX_FILES = 200  # 保留的剖析结果个数，超过时删除最早的结果
+PROFILE_PATH = "C:/Users/haruki/PycharmProjects/meteo_profile/"  # 剖析结果的存放路径
@@ -2,8 +2,16 @@
     定义数据处理使用的一些通用工具函数
     by organwalk 2023-09-19
 """
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
+from collections import namedtuple
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sklearn.preprocessing import MinMaxScaler
+
+# 计算相关系数所需的充分统计量：样本数、均值、离差平方和与离差积和矩阵、最小值、最大值
+SufficientStats = namedtuple('SufficientStats', ['count', 'mean', 'm2', 'min', 'max'])
 
 
 def calculate_hour_avg(df_data: pd.DataFrame) -> pd.DataFrame:
@@ -38,7 +46,7 @@ def calculate_day_avg(df_data: pd.DataFrame) -> pd.DataFrame:
     return df_dayly
 
 
-def get_scaler_result(df_data: pd.DataFrame) -> (pd.DataFrame, MinMaxScaler):
+def get_scaler_result(df_data: pd.DataFrame) -> (pd.DataFrame, 'MinMaxScaler'):
     """
     获取数据窗归一化后的结果
     :param df_data: pandas数据窗
@@ -47,6 +55,76 @@ def get_scaler_result(df_data: pd.DataFrame) -> (pd.DataFrame, MinMaxScaler):
 
     by organwalk 2023-09-19
     """
+    # sklearn导入耗时较长，仅在首次归一化时导入
+    from sklearn.preprocessing import MinMaxScaler
     scaler = MinMaxScaler()
     scaler.fit(df_data)
     return scaler.transform(df_data), scaler
+
+
+def get_batch_scaler_result(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    对一批数据按样本分别进行归一化，结果与逐个样本使用MinMaxScaler一致
+    :param data: 形如(..., n_rows, n_features)的数组，沿倒数第二个维度分别归一化
+    :return:
+        np.ndarray: 归一化后的数据及每个样本解归一化使用的最小值与极差
+    """
+    data_min = np.nanmin(data, axis=-2, keepdims=True)
+    data_range = np.nanmax(data, axis=-2, keepdims=True) - data_min
+    # 与MinMaxScaler一致，极差为0的特征不进行缩放
+    data_range[data_range == 0.0] = 1.0
+    return (data - data_min) / data_range, data_min, data_range
+
+
+def inverse_batch_scaler(data: np.ndarray, data_min: np.ndarray, data_range: np.ndarray) -> np.ndarray:
+    """
+    使用get_batch_scaler_result得到的最小值与极差对一批数据解归一化
+    :param data: 形如(..., n_rows, n_features)的归一化数据
+    :param data_min: 每个样本的最小值
+    :param data_range: 每个样本的极差
+    :return:
+        np.ndarray: 解归一化后的数据
+    """
+    return data * data_range + data_min
+
+
+def calculate_sufficient_stats(values: np.ndarray) -> SufficientStats:
+    """
+    计算一批数据的充分统计量，含缺失值的行不参与计算
+    :param values: 形如(n_rows, n_features)的数组
+    :return:
+        SufficientStats: 充分统计量
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values).any(axis=1)]
+    n_features = values.shape[1]
+    if len(values) == 0:
+        empty = np.full(n_features, np.nan)
+        return SufficientStats(0.0, np.zeros(n_features), np.zeros((n_features, n_features)), empty, empty)
+    mean = values.mean(axis=0)
+    centered = values - mean
+    return SufficientStats(float(len(values)), mean, centered.T @ centered, values.min(axis=0), values.max(axis=0))
+
+
+def merge_sufficient_stats(stats_list: List[SufficientStats]) -> Optional[SufficientStats]:
+    """
+    合并多批数据的充分统计量，结果与对合并后的数据直接计算一致
+    :param stats_list: 充分统计量列表
+    :return:
+        SufficientStats or None: 合并后的充分统计量，列表为空时返回None
+    """
+    merged = None
+    for stats in stats_list:
+        if stats.count == 0:
+            continue
+        if merged is None:
+            merged = SufficientStats(stats.count, np.array(stats.mean), np.array(stats.m2),
+                                     np.array(stats.min), np.array(stats.max))
+            continue
+        # 两批数据的均值之差修正离差积和，避免直接使用原始平方和相减带来的精度损失
+        count = merged.count + stats.count
+        delta = stats.mean - merged.mean
+        mean = merged.mean + delta * (stats.count / count)
+        m2 = merged.m2 + stats.m2 + np.outer(delta, delta) * (merged.count * stats.count / count)
+        merged = SufficientStats(count, mean, m2, np.fmin(merged.min, stats.min), np.fmax(merged.max, stats.max))
+    return merged
@@ -10,10 +10,25 @@ import numpy as np
 import data_utils as dtools
 from server_code.entity import res_entity
 from config import FILE_PATH, MODEL_PATH
-from server_code.application import get_mysql_obj
-from typing import Union, List, Dict, Tuple
-from sklearn.preprocessing import MinMaxScaler
+from server_code.application import mysql_cursor
+from server_code.async_application import async_mysql_cursor
+from server_code.utils import metrics
+from storage import column_store, aggregate_store, station_date_index, date_manifest
+from typing import Union, List, Dict, Tuple, Set, Optional, TYPE_CHECKING
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import threading
+
+if TYPE_CHECKING:
+    from sklearn.preprocessing import MinMaxScaler
+
+_STATS_CACHE_SIZE = 4096  # 由原始数据计算的每日充分统计量最多缓存的日期数
+_stats_cache = OrderedDict()
+_stats_cache_lock = threading.Lock()
+_stats_cache_hits = 0
+_stats_cache_misses = 0
+metrics.register_cache('day_stats', lambda: (_stats_cache_hits, _stats_cache_misses))
+_model_info_cache = None  # type: Optional[Tuple[float, Union[Dict, List]]]
 
 
 def get_model_info() -> Union[Dict, List]:
@@ -24,10 +39,18 @@ def get_model_info() -> Union[Dict, List]:
 
     by organwalk 2023-08-15
     """
-    with open(MODEL_PATH + 'model_info.json', 'r', encoding='utf-8') as file:
+    global _model_info_cache
+    path = MODEL_PATH + 'model_info.json'
+    # 模型信息文件未变化时直接返回缓存的结果，服务以多进程运行时在fork前载入，由各进程共享
+    mtime = os.path.getmtime(path)
+    if _model_info_cache is not None and _model_info_cache[0] == mtime:
+        return _model_info_cache[1]
+    with open(path, 'r', encoding='utf-8') as file:
         json_data = file.read()
     model_info = json.loads(json_data)
-    return res_entity.set_model_info(**model_info) if model_info else []
+    info = res_entity.set_model_info(**model_info) if model_info else []
+    _model_info_cache = (mtime, info)
+    return info
 
 
 def get_model_report(model_type: str) -> Union[Dict, List]:
@@ -51,7 +74,6 @@ def get_model_report(model_type: str) -> Union[Dict, List]:
     i = len(lines) - 2
     while i >= 0:
         line = lines[i].strip()
-        print(line)
         if line == "-----":
             break
         else:
@@ -71,9 +93,12 @@ def validate_station_date(station: str, date: str) -> int:
 
     by organwalk 2023-08-15
     """
-    mysql = get_mysql_obj()
-    mysql.execute("select count(id) from station_date where station = %s and date = %s", (station, date))
-    return int(mysql.fetchall()[0][0])
+    with metrics.stage('mysql_validation'):
+        if station_date_index.is_loaded():
+            return int(station_date_index.contains(station, date))
+        with mysql_cursor() as mysql:
+            mysql.execute("select count(id) from station_date where station = %s and date = %s", (station, date))
+            return int(mysql.fetchall()[0][0])
 
 
 def validate_station_date_range(station: str, start_date: str, end_date: str) -> int:
@@ -87,10 +112,142 @@ def validate_station_date_range(station: str, start_date: str, end_date: str) ->
 
     by organwalk 2023-10-14
     """
-    mysql = get_mysql_obj()
-    str_sql = "select count(*) from station_date where station = %s and date >= %s and date <= %s"
-    mysql.execute(str_sql, (station, start_date, end_date))
-    return int(mysql.fetchall()[0][0])
+    with metrics.stage('mysql_validation'):
+        if station_date_index.is_loaded():
+            return station_date_index.count_range(station, start_date, end_date)
+        str_sql = "select count(*) from station_date where station = %s and date >= %s and date <= %s"
+        with mysql_cursor() as mysql:
+            mysql.execute(str_sql, (station, start_date, end_date))
+            return int(mysql.fetchall()[0][0])
+
+
+def get_existing_dates(station: str, dates: List[str]) -> Set[str]:
+    """
+    一次查询获取指定气象站下给定日期中存在记录的日期
+    :param station: 气象站编号
+    :param dates: 需要校验的日期列表
+    :return:
+        Set[str]: 存在记录的日期集合
+    """
+    with metrics.stage('mysql_validation'):
+        if station_date_index.is_loaded():
+            return station_date_index.get_existing_dates(station, dates)
+        dates = sorted(set(dates))
+        placeholders = ', '.join(['%s'] * len(dates))
+        str_sql = f"select date from station_date where station = %s and date in ({placeholders})"
+        with mysql_cursor() as mysql:
+            mysql.execute(str_sql, (station, *dates))
+            return {_format_date(row[0]) for row in mysql.fetchall()}
+
+
+def get_station_date_set(station_dates: List[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """
+    一次查询获取多个(气象站编号, 日期)组合中存在记录的组合，仅查询给定的日期，不查询各气象站的整个日期范围
+    :param station_dates: (气象站编号, 日期)列表
+    :return:
+        Set[Tuple[str, str]]: 存在记录的(气象站编号, 日期)集合
+    """
+    with metrics.stage('mysql_validation'):
+        if station_date_index.is_loaded():
+            return station_date_index.get_station_date_set(station_dates)
+        str_sql, args = _get_station_date_set_sql(station_dates)
+        with mysql_cursor() as mysql:
+            mysql.execute(str_sql, args)
+            return {(str(station), _format_date(date)) for station, date in mysql.fetchall()}
+
+
+def _get_station_date_set_sql(station_dates: List[Tuple[str, str]]) -> Tuple[str, tuple]:
+    """
+    按气象站分组生成 (station = %s and date in (...)) or ... 形式的查询，每组均可使用(station, date)索引
+    """
+    dates_by_station = OrderedDict()  # type: OrderedDict
+    for station, date in sorted(set(station_dates)):
+        dates_by_station.setdefault(station, []).append(date)
+    conditions, args = [], []
+    for station, dates in dates_by_station.items():
+        conditions.append(f"(station = %s and date in ({', '.join(['%s'] * len(dates))}))")
+        args.extend([station, *dates])
+    return f"select station, date from station_date where {' or '.join(conditions)}", tuple(args)
+
+
+async def get_existing_dates_async(station: str, dates: List[str]) -> Set[str]:
+    """
+    get_existing_dates的异步版本，气象站日期索引未载入时通过异步MySQL连接池查询，等待查询结果期间不占用线程
+    :param station: 气象站编号
+    :param dates: 需要校验的日期列表
+    :return:
+        Set[str]: 存在记录的日期集合
+    """
+    with metrics.stage('mysql_validation'):
+        if station_date_index.is_loaded():
+            return station_date_index.get_existing_dates(station, dates)
+        dates = sorted(set(dates))
+        placeholders = ', '.join(['%s'] * len(dates))
+        str_sql = f"select date from station_date where station = %s and date in ({placeholders})"
+        async with async_mysql_cursor() as mysql:
+            await mysql.execute(str_sql, (station, *dates))
+            return {_format_date(row[0]) for row in await mysql.fetchall()}
+
+
+async def get_station_date_set_async(station_dates: List[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """
+    get_station_date_set的异步版本，气象站日期索引未载入时通过异步MySQL连接池查询
+    :param station_dates: (气象站编号, 日期)列表
+    :return:
+        Set[Tuple[str, str]]: 存在记录的(气象站编号, 日期)集合
+    """
+    with metrics.stage('mysql_validation'):
+        if station_date_index.is_loaded():
+            return station_date_index.get_station_date_set(station_dates)
+        str_sql, args = _get_station_date_set_sql(station_dates)
+        async with async_mysql_cursor() as mysql:
+            await mysql.execute(str_sql, args)
+            return {(str(station), _format_date(date)) for station, date in await mysql.fetchall()}
+
+
+def get_all_station_dates() -> List[Tuple[str, str]]:
+    """
+    获取station_date表的全部记录，用于载入气象站日期索引
+    :return:
+        List[Tuple[str, str]]: (气象站编号, YYYY-MM-DD格式日期)记录
+    """
+    with mysql_cursor() as mysql:
+        mysql.execute("select station, date from station_date")
+        return [(str(station), _format_date(date)) for station, date in mysql.fetchall()]
+
+
+def init_station_date_index(resync: bool = True) -> None:
+    """
+    载入气象站日期索引并开启周期性重新同步，此后日期校验不再访问数据库；载入失败时仍直接查询数据库
+    :param resync: 是否开启周期性重新同步，在fork前载入时应为False，由fork出的各进程调用start_station_date_resync开启
+    :return:
+        None: 直到索引载入完成为止
+    """
+    try:
+        station_date_index.load(get_all_station_dates)
+    except Exception as e:
+        print(f"气象站日期索引载入失败，日期校验将直接查询数据库：{e}")
+    if resync:
+        start_station_date_resync()
+
+
+def start_station_date_resync() -> None:
+    """
+    开启气象站日期索引的周期性重新同步
+    :return:
+        None: 同一进程中重复调用时不会开启多个线程
+    """
+    station_date_index.start_resync(get_all_station_dates)
+
+
+def _format_date(date) -> str:
+    """
+    将数据库返回的日期统一为YYYY-MM-DD格式字符串
+    :param date: date对象或日期字符串
+    :return:
+        str: YYYY-MM-DD格式字符串
+    """
+    return date.strftime('%Y-%m-%d') if hasattr(date, 'strftime') else str(date)[:10]
 
 
 def get_merged_csv_data(station: str, start_date: str, end_date: str) -> pd.DataFrame:
@@ -104,26 +261,96 @@ def get_merged_csv_data(station: str, start_date: str, end_date: str) -> pd.Data
 
     by organwalk 2023-08-20
     """
-    file_prefix = f"{FILE_PATH}{station}/{station}_data_"
-    file_extension = ".csv"
     data_frames = []
     date_range = pd.date_range(start_date, end_date)
+    dates = [date.strftime("%Y-%m-%d") for date in date_range]
+    plan = date_manifest.plan_forward_fill(station, dates)
+    # 全部日期均存在且列式存储中存在全部日期时，直接读取内存映射的连续切片
+    column_data = column_store.read_dates(station, dates) if dates and plan == dates else None
+    if column_data is not None:
+        return column_store.to_dataframe(column_data)
 
     # 在合并过程中，如果某一日期文件不存在，则采取前向填充手段
-    previous_data = None
-    for date in date_range:
-        file_name = file_prefix + date.strftime("%Y-%m-%d") + file_extension
-        try:
-            data = pd.read_csv(file_name)
-            data_frames.append(data)
-            previous_data = data
-        except FileNotFoundError:
-            if previous_data is not None:
-                data_frames.append(previous_data.copy())
+    previous_source, previous_data = None, None
+    for source in plan:
+        if source is None:
+            continue
+        if source != previous_source:
+            previous_source = source
+            try:
+                previous_data = _read_day_data(station, source)
+                data_frames.append(previous_data)
+                continue
+            except FileNotFoundError:
+                # 规划后文件被删除，从清单中移除并使用前一日的数据
+                date_manifest.discard(station, [source])
+        if previous_data is not None:
+            data_frames.append(previous_data.copy())
     return pd.concat(data_frames) if not date_range.empty else None
 
 
-def get_one_csv_data(station: str, date: str) -> Tuple[pd.DataFrame, MinMaxScaler]:
+def get_merged_stats(station: str, start_date: str, end_date: str) -> Optional[dtools.SufficientStats]:
+    """
+    获取指定气象站点下起止日期连续时间段内合并的充分统计量，缺失日期的前向填充方式与get_merged_csv_data一致
+    :param station: 气象站编号
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :return:
+        SufficientStats or None: 合并后的充分统计量，时间段内没有任何数据时返回None
+    """
+    dates = [date.strftime("%Y-%m-%d") for date in pd.date_range(start_date, end_date)]
+    stats_list = []
+    previous_source, previous_stats = None, None
+    for source in date_manifest.plan_forward_fill(station, dates):
+        if source is None:
+            continue
+        if source != previous_source:
+            previous_source = source
+            try:
+                previous_stats = get_day_stats(station, source)
+            except FileNotFoundError:
+                # 规划后文件被删除，从清单中移除并使用前一日的统计量
+                date_manifest.discard(station, [source])
+        if previous_stats is not None:
+            stats_list.append(previous_stats)
+    return dtools.merge_sufficient_stats(stats_list)
+
+
+def get_day_stats(station: str, date: str) -> dtools.SufficientStats:
+    """
+    获取一日八个特征的充分统计量，优先读取ETL时预先计算的结果，否则由原始数据计算并缓存
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        SufficientStats: 充分统计量
+    """
+    global _stats_cache_hits, _stats_cache_misses
+    with metrics.stage('aggregate_read'):
+        stats = aggregate_store.read_stats(station, date)
+    if stats is not None:
+        return stats
+    try:
+        file_stat = os.stat(get_csv_path(station, date))
+        cache_key = (station, date, file_stat.st_mtime_ns, file_stat.st_size)
+    except OSError:
+        cache_key = None
+    with _stats_cache_lock:
+        stats = _stats_cache.get(cache_key) if cache_key is not None else None
+        if stats is not None:
+            _stats_cache_hits += 1
+            _stats_cache.move_to_end(cache_key)
+            return stats
+        _stats_cache_misses += 1
+    stats = dtools.calculate_sufficient_stats(_read_day_data(station, date)[column_store.FEATURE_COLUMNS].values)
+    if cache_key is not None:
+        with _stats_cache_lock:
+            _stats_cache[cache_key] = stats
+            while len(_stats_cache) > _STATS_CACHE_SIZE:
+                _stats_cache.popitem(last=False)
+    return stats
+
+
+def get_one_csv_data(station: str, date: str) -> Tuple[pd.DataFrame, 'MinMaxScaler']:
     """
     获取一份CSV数据集经过归一化处理后的数据窗
     :param station: 气象站编号
@@ -133,16 +360,74 @@ def get_one_csv_data(station: str, date: str) -> Tuple[pd.DataFrame, MinMaxScale
 
     by organwalk 2023-09-17
     """
-    file_path = f"{FILE_PATH}{station}/{station}_data_{date}.csv"
-    # 0.将指定数据集读取为pandas数据窗
-    df_file_data = pd.read_csv(file_path)
-    # 1.将数据窗的每个特征处理为保留小数点后两位的24小时平均值
-    df_avg_data = dtools.calculate_hour_avg(df_file_data)
-    # 2.将上一步数据进行归一化处理，获得最终的数据窗
-    df_scaler_data, scaler = dtools.get_scaler_result(df_avg_data)
+    # 0.读取指定数据集，并将每个特征处理为保留小数点后两位的24小时平均值
+    df_avg_data = get_hour_avg_data(station, date)
+    # 1.将上一步数据进行归一化处理，获得最终的数据窗
+    with metrics.stage('scaler_fit'):
+        df_scaler_data, scaler = dtools.get_scaler_result(df_avg_data)
     return df_scaler_data, scaler
 
 
+def get_csv_path(station: str, date: str) -> str:
+    """
+    获取指定气象站某一日的CSV数据集文件路径
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        str: CSV数据集文件路径
+    """
+    return f"{FILE_PATH}{station}/{station}_data_{date}.csv"
+
+
+def _read_day_data(station: str, date: str) -> pd.DataFrame:
+    """
+    读取指定气象站某一日的数据，优先读取列式存储，不存在时读取CSV数据集
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        DataFrame: 包含Time列及八个特征列的数据窗
+    """
+    with metrics.stage('csv_read'):
+        column_data = column_store.read_dates(station, [date])
+        if column_data is not None:
+            return column_store.to_dataframe(column_data)
+        return pd.read_csv(get_csv_path(station, date))
+
+
+def get_hour_avg_data(station: str, date: str) -> pd.DataFrame:
+    """
+    获取一份数据集每个特征24小时内每小时的平均值，优先读取ETL时预先计算的聚合结果
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        DataFrame: 24小时内每小时平均结果数据窗
+    """
+    with metrics.stage('aggregate_read'):
+        hour_avg = aggregate_store.read_hour_avg(station, date)
+    if hour_avg is not None:
+        return pd.DataFrame(np.array(hour_avg), columns=column_store.FEATURE_COLUMNS)
+    df_data = _read_day_data(station, date)
+    with metrics.stage('resample'):
+        return dtools.calculate_hour_avg(df_data)
+
+
+def get_day_avg_data(station: str, date: str) -> pd.DataFrame:
+    """
+    获取一份数据集每个特征一日的平均值，优先读取ETL时预先计算的聚合结果
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        DataFrame: 一日平均结果数据窗
+    """
+    with metrics.stage('aggregate_read'):
+        day_avg = aggregate_store.read_day_avg(station, date)
+    if day_avg is not None:
+        return pd.DataFrame(np.array(day_avg), columns=column_store.FEATURE_COLUMNS)
+    df_data = _read_day_data(station, date)
+    with metrics.stage('resample'):
+        return dtools.calculate_day_avg(df_data)
+
+
 def get_one_csv_data_tolist(station: str, date: str) -> List[List[float]]:
     """
     将一份csv文件数据list化
@@ -151,12 +436,9 @@ def get_one_csv_data_tolist(station: str, date: str) -> List[List[float]]:
     :return:
         List[List[float]]: 浮点数二维数组
     """
-    file_path = f"{FILE_PATH}{station}/{station}_data_{date}.csv"
-    # 0. 将指定数据集读取为pandas数据窗
-    df_file_data = pd.read_csv(file_path)
-    # 1. 将数据窗的每个特征处理为保留小数点后两位的24小时平均值
-    df_avg_data = dtools.calculate_hour_avg(df_file_data)
-    # 2. 返回二维数组
+    # 0. 读取指定数据集，并将每个特征处理为保留小数点后两位的24小时平均值
+    df_avg_data = get_hour_avg_data(station, date)
+    # 1. 返回二维数组
     np_avg_data = np.round(df_avg_data.values).astype(float)
     return np_avg_data.tolist()
 
@@ -172,32 +454,29 @@ def get_csv(station: str, start_date: str, end_date: str) -> Union[List[str], st
 
     by organwalk 2023-09-17
     """
-    start_date = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date, "%Y-%m-%d")
-    existing_files = []
-    existing_path = ''
-    current_date = start_date
-    consecutive_missing_count = 0
-    while current_date <= end_date:
-        # 构建文件名
-        file_path = f"{FILE_PATH}{station}/{station}_data_{current_date.strftime('%Y-%m-%d')}.csv"
-        if os.path.exists(file_path):
-            existing_files.append(file_path)
-            consecutive_missing_count = 0
-            existing_path = file_path
-        else:
-            if consecutive_missing_count < 5:
-                existing_files.append(existing_path)
-                consecutive_missing_count += 1
-            else:
-                return "连续时间段内缺失文件过多，无法进行前向填充"
+    existing_dates = get_csv_dates(station, start_date, end_date)
+    if isinstance(existing_dates, str):
+        return existing_dates
+    return [get_csv_path(station, date) if date else '' for date in existing_dates]
 
-        current_date += timedelta(days=1)
 
-    return existing_files
+def get_csv_dates(station: str, start_date: str, end_date: str) -> Union[List[str], str]:
+    """
+    获取日期范围内每一日实际使用的数据集日期，缺失的日期使用前一个存在数据的日期进行前向填充
+    :param station: 气象站编号
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :return:
+        List[str] or AnyStr: 返回数据集日期列表，范围开头缺失的日期为空字符串，无法前向填充时返回错误消息
+    """
+    dates = [date.strftime('%Y-%m-%d') for date in pd.date_range(start_date, end_date)]
+    existing_dates = date_manifest.plan_forward_fill(station, dates, max_missing=5)
+    if existing_dates is None:
+        return "连续时间段内缺失文件过多，无法进行前向填充"
+    return [date or '' for date in existing_dates]
 
 
-def get_seven_csv_data(station: str, date: str) -> Tuple[list, MinMaxScaler]:
+def get_seven_csv_data(station: str, date: str) -> Tuple[list, 'MinMaxScaler']:
     """
     获取连续七日csv数据，从date往前计算
     :param station: 气象站编号
@@ -208,12 +487,12 @@ def get_seven_csv_data(station: str, date: str) -> Tuple[list, MinMaxScaler]:
     by organwalk 2023-10-12
     """
     start_date = (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=-6)).strftime('%Y-%m-%d')
-    existing_files = get_csv(station, start_date, date)
+    existing_dates = get_csv_dates(station, start_date, date)
     all_data = list()
     scaler = None
-    for file in existing_files:
-        df = pd.read_csv(file)
-        avg_df_data = dtools.calculate_day_avg(df)
-        df_data, scaler = dtools.get_scaler_result(avg_df_data)
+    for existing_date in existing_dates:
+        avg_df_data = get_day_avg_data(station, existing_date)
+        with metrics.stage('scaler_fit'):
+            df_data, scaler = dtools.get_scaler_result(avg_df_data)
         all_data.append(df_data)
     return all_data, scaler
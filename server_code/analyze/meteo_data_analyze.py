@@ -2,9 +2,22 @@
     定义数据分析的各类方法
     by organwalk 2023-08-20
 """
+import numpy as np
 import pandas as pd
+from data_utils import SufficientStats
 from typing import List, Optional
 
+_ELEMENTS_MAP = {
+    '1': 'Temperature',
+    '2': 'Humidity',
+    '3': 'Speed',
+    '4': 'Direction',
+    '5': 'Rain',
+    '6': 'Sunlight',
+    '7': 'PM2.5',
+    '8': 'PM10'
+}  # 气象要素编号与特征列的对应关系，编号顺序即充分统计量中的特征顺序
+
 
 def calculate_correlation_matrix(elements: str, merged_data: pd.DataFrame) -> Optional[List]:
     """
@@ -16,19 +29,33 @@ def calculate_correlation_matrix(elements: str, merged_data: pd.DataFrame) -> Op
 
     by organwalk 2023-08-20
     """
-    elements_map = {
-        '1': 'Temperature',
-        '2': 'Humidity',
-        '3': 'Speed',
-        '4': 'Direction',
-        '5': 'Rain',
-        '6': 'Sunlight',
-        '7': 'PM2.5',
-        '8': 'PM10'
-    }
-    selected_columns = [elements_map[element] for element in elements.split(',')]
+    selected_columns = [_ELEMENTS_MAP[element] for element in elements.split(',')]
     selected_data = merged_data[selected_columns]
     correlation_matrix = selected_data.corr()
 
     # 替换NaN值为0，保留两位小数，将相关系数矩阵转换为二维数组
     return list(correlation_matrix.fillna(0).round(2).values.tolist()) if not correlation_matrix.empty else None
+
+
+def calculate_correlation_matrix_by_stats(elements: str, stats: SufficientStats) -> Optional[np.ndarray]:
+    """
+    由连续时间段合并后的充分统计量计算协相关矩阵，不再读取分钟级原始数据，结果与calculate_correlation_matrix一致
+    :param elements: 需要进行计算的气象要素
+    :param stats: 连续时间段合并后的充分统计量
+    :return:
+        np.ndarray or None: 协相关矩阵的二维数组, 计算结果为空时返回None
+    """
+    indexes = [int(element) - 1 for element in elements.split(',')]
+    if not indexes:
+        return None
+    m2 = stats.m2[np.ix_(indexes, indexes)]
+    variance = np.diag(m2).copy()
+    # 取值恒定或样本数不足的特征相关系数为NaN，与DataFrame.corr()一致
+    variance[(stats.min[indexes] == stats.max[indexes]) | (variance <= 0)] = np.nan
+    if stats.count < 2:
+        variance[:] = np.nan
+    std = np.sqrt(variance)
+    with np.errstate(invalid='ignore'):
+        correlation_matrix = np.clip(m2 / np.outer(std, std), -1.0, 1.0)
+    # 替换NaN值为0，保留两位小数，数组由响应编码器直接写出
+    return np.nan_to_num(correlation_matrix).round(2)
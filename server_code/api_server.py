@@ -2,15 +2,20 @@
     Flask应用接口服务，同时将服务注册到nacos中
     by organwalk 2023-08-15
 """
-from flask import Flask, request, Response
-from server_code.utils import result
+import time
+from collections import OrderedDict
+from flask import Flask, g, request, Response
+from server_code.utils import result, metrics
+from config import PROFILE_ENABLED
 from server_code.application import register_to_nacos
+from server_code.prediction import model_registry, batch_predictor, result_cache
 import repository
 import entity.req_entity as server_req
 from utils import req_utils
 from service import analyze_service
-from service.prediction_service import predict_by_model
-from cleaned.meteo_data_cleaned import etl_data, get_latest_date
+from service.prediction_service import predict_by_model, predict_batch_by_model
+from cleaned.meteo_data_cleaned import get_latest_date
+from server_code.cleaned import etl_jobs
 
 app = Flask(__name__)
 
@@ -59,9 +64,9 @@ def _api_cleaned_latest_date() -> Response:
 @app.route('/anapredict/cleaned', methods=['POST'])
 def _api_data_cleaned() -> Response:
     """
-    供内部服务调用的数据清洗服务
+    供内部服务调用的数据清洗服务，提交清洗任务后立即返回任务编号，通过/anapredict/cleaned/job/<job_id>查询进度
     :return:
-        Response: 根据获取状态返回相应的消息
+        Response: 根据获取状态返回相应的消息以及任务编号
 
     by organwalk 2023-10-14
     """
@@ -69,12 +74,24 @@ def _api_data_cleaned() -> Response:
                                                 request.get_json(),
                                                 server_req.CLEANED)
     if validate is None:
-        etl_data(**request.get_json())
-        return result.success('已成功清洗此时间范围内数据数据', None)
+        job_id = etl_jobs.submit_job(**request.get_json())
+        return result.success('已提交此时间范围内数据的清洗任务', {'job_id': job_id})
     else:
         return result.fail_entity(validate)
 
 
+@app.route('/anapredict/cleaned/job/<job_id>', methods=['GET'])
+def _api_data_cleaned_job(job_id: str) -> Response:
+    """
+    查询数据清洗任务的状态
+    :param job_id: 任务编号
+    :return:
+        Response: 任务状态以及逐日的进度、耗时与错误信息
+    """
+    job = etl_jobs.get_job(job_id)
+    return result.success('成功获取清洗任务状态', job) if job else result.not_found('该清洗任务不存在或已过期')
+
+
 @app.route('/anapredict/analyze/correlation', methods=['POST'])
 def _api_data_correlation() -> Response:
     """
@@ -114,6 +131,63 @@ def _api_model_prediction() -> Response:
         return result.fail_entity(validate)
 
 
+@app.route('/anapredict/model/prediction/batch', methods=['POST'])
+def _api_model_prediction_batch() -> Response:
+    """
+    对多个气象站、多个日期进行批量模型预测
+    :return:
+        Response: 与请求预测项一一对应的预测结果，单个预测项的错误消息在其msg字段中返回
+    """
+    validate = req_utils.validate_json_user_req('/anapredict/model/prediction/batch',
+                                                request.get_json(),
+                                                server_req.PREDICTION_BATCH)
+    if validate is None:
+        items = request.get_json()['items']
+        item_errors = req_utils.validate_prediction_items(items)
+        prediction_list = predict_batch_by_model(items, item_errors)
+        return result.success('成功获取批量预测数据', prediction_list)
+    else:
+        return result.fail_entity(validate)
+
+
+@app.route('/anapredict/model/stats', methods=['GET'])
+def _api_model_stats() -> Response:
+    """
+    获取并返回模型推理的运行统计
+    :return:
+        Response: 各模型微批推理的批次大小与排队等待时间统计，以及预测结果缓存的命中统计
+    """
+    stats = OrderedDict([
+        ('batch', batch_predictor.get_batch_metrics()),
+        ('cache', result_cache.get_cache_stats())
+    ])
+    return result.success('成功获取模型推理统计', stats)
+
+
+@app.route('/anapredict/metrics', methods=['GET'])
+def _api_metrics() -> Response:
+    """
+    以Prometheus文本格式返回运行指标
+    :return:
+        Response: 各接口的请求数与延迟直方图、各处理阶段的耗时直方图、缓存命中率及数据清洗逐日耗时
+    """
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start_time = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response: Response) -> Response:
+    start_time = g.get('request_start_time')
+    if start_time is not None:
+        metrics.observe_request(request.url_rule.rule if request.url_rule is not None else 'unmatched',
+                                request.method, time.perf_counter() - start_time)
+    return response
+
+
 @app.errorhandler(404)
 def _server_api_notfound(e):
     return result.not_found(f'{e.name},该接口不存在，请修改后重试')
@@ -129,6 +203,14 @@ def _server_error(e):
     return result.error(f'{e.name},内部服务处理错误')
 
 
+if PROFILE_ENABLED:
+    # 需在全部接口注册后安装
+    from server_code.utils import profiler
+    profiler.install(app)
+
+
 if __name__ == '__main__':
+    model_registry.preload_models()
+    repository.init_station_date_index()
     register_to_nacos()
     app.run(host='0.0.0.0', port=9594)
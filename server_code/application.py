@@ -2,11 +2,18 @@
     定义配置信息
     by organwalk 2023-08-15
 """
+import os
 import pymysql
-from collections import OrderedDict
-from nacos import NacosClient
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 import threading
 import time
+from typing import Any, Callable, Deque, Optional, Tuple, TYPE_CHECKING
+from config import MYSQL_POOL_MAX_SIZE, MYSQL_POOL_ACQUIRE_TIMEOUT, MYSQL_POOL_IDLE_TIMEOUT, \
+    MYSQL_POOL_HEALTH_CHECK_INTERVAL
+
+if TYPE_CHECKING:
+    from nacos import NacosClient
 
 _MYSQL_CONFIG = {
     'host': 'localhost',
@@ -24,17 +31,220 @@ REDIS_CONFIG = {
 }
 
 
-def get_mysql_obj():
+class ConnectionPool:
+    """
+    有界的线程安全连接池：连接数不超过max_size，空闲连接超过idle_timeout后关闭，
+    空闲超过health_check_interval的连接在取出前执行select 1，不可用时丢弃并重新创建
+    """
+
+    def __init__(self, creator: Callable[[], Any], max_size: int = MYSQL_POOL_MAX_SIZE,
+                 acquire_timeout: float = MYSQL_POOL_ACQUIRE_TIMEOUT, idle_timeout: float = MYSQL_POOL_IDLE_TIMEOUT,
+                 health_check_interval: float = MYSQL_POOL_HEALTH_CHECK_INTERVAL):
+        self.creator = creator
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # 空闲连接及其归还时间，后归还的连接优先取出，长时间未使用的连接留在队首等待淘汰
+        self._idle = deque()  # type: Deque[Tuple[Any, float]]
+        self._created_count = 0
+
+    def acquire(self) -> Any:
+        """
+        取出一个可用连接
+        :return:
+            Any: 数据库连接，使用完毕后需调用release归还
+        """
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"等待{self.acquire_timeout}秒后仍未获取到MySQL连接")
+        try:
+            return self._get_idle_connection() or self._create()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        """
+        归还连接
+        :param connection: acquire取出的连接
+        :param discard: 是否关闭连接而不放回连接池，连接发生异常时使用
+        :return:
+            None: 直到连接归还为止
+        """
+        try:
+            if discard:
+                _close_quietly(connection)
+            else:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """
+        关闭所有空闲连接
+        :return:
+            None: 直到所有空闲连接关闭为止
+        """
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            _close_quietly(connection)
+
+    def get_stats(self) -> OrderedDict:
+        """
+        获取连接池统计
+        :return:
+            OrderedDict: 最大连接数、空闲连接数与累计创建的连接数
+        """
+        with self._lock:
+            return OrderedDict([('max_size', self.max_size), ('idle', len(self._idle)),
+                                ('created', self._created_count)])
+
+    def _get_idle_connection(self) -> Optional[Any]:
+        now = time.monotonic()
+        expired = []
+        connection = None
+        with self._lock:
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                expired.append(self._idle.popleft()[0])
+            if self._idle:
+                connection, released_time = self._idle.pop()
+        for expired_connection in expired:
+            _close_quietly(expired_connection)
+        while connection is not None:
+            if now - released_time <= self.health_check_interval or _is_alive(connection):
+                return connection
+            _close_quietly(connection)
+            with self._lock:
+                connection, released_time = self._idle.pop() if self._idle else (None, 0.0)
+        return None
+
+    def _create(self) -> Any:
+        connection = self.creator()
+        with self._lock:
+            self._created_count += 1
+        return connection
+
+
+def _create_mysql_connection():
+    # 连接会被多次复用，开启自动提交，避免长连接停留在同一个事务的一致性读快照中
+    return pymysql.connect(autocommit=True, **_MYSQL_CONFIG)
+
+
+def _is_alive(connection: Any) -> bool:
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('select 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(connection: Any) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+_mysql_creator = _create_mysql_connection  # type: Callable[[], Any]
+_mysql_pool = None  # type: Optional[ConnectionPool]
+_mysql_pool_pid = None
+_mysql_pool_lock = threading.Lock()
+
+
+def get_mysql_pool() -> ConnectionPool:
+    """
+    获取当前进程的MySQL连接池，首次调用时创建；子进程中不复用父进程的连接
+
+    :return:
+        ConnectionPool: MySQL连接池
+    """
+    global _mysql_pool, _mysql_pool_pid
+    pid = os.getpid()
+    if _mysql_pool is None or _mysql_pool_pid != pid:
+        with _mysql_pool_lock:
+            if _mysql_pool is None or _mysql_pool_pid != pid:
+                _mysql_pool = ConnectionPool(_mysql_creator)
+                _mysql_pool_pid = pid
+    return _mysql_pool
+
+
+def set_mysql_creator(creator: Callable[[], Any]) -> None:
+    """
+    替换创建数据库连接的方法并重建连接池，用于基准测试中接入本地的兼容数据库
+
+    :param creator: 无参数、返回DB-API连接对象的方法
+    :return:
+        None: 直到旧连接池的空闲连接关闭为止
+    """
+    global _mysql_creator, _mysql_pool
+    with _mysql_pool_lock:
+        old_pool, _mysql_creator, _mysql_pool = _mysql_pool, creator, None
+    if old_pool is not None:
+        old_pool.close()
+
+
+@contextmanager
+def mysql_cursor():
     """
-    返回MySQL的游标对象
+    从连接池取出连接并返回游标，退出时关闭游标并归还连接；发生异常时丢弃该连接
 
     :return:
         object: MySQL游标对象
 
     by organwalk 2023-08-15
     """
-    cnx = pymysql.connect(**_MYSQL_CONFIG)
-    return cnx.cursor()
+    pool = get_mysql_pool()
+    connection = pool.acquire()
+    discard = True
+    try:
+        cursor = connection.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+        discard = False
+    finally:
+        pool.release(connection, discard=discard)
+
+
+def _create_redis_client():
+    # redis仅在清洗数据时使用，不在服务启动时导入
+    import redis
+    return redis.Redis(**REDIS_CONFIG)
+
+
+_redis_factory = _create_redis_client  # type: Callable[[], Any]
+
+
+def get_redis_client() -> Any:
+    """
+    创建Redis客户端
+
+    :return:
+        Any: redis.Redis或与其接口兼容的客户端对象
+    """
+    return _redis_factory()
+
+
+def set_redis_factory(factory: Callable[[], Any]) -> None:
+    """
+    替换创建Redis客户端的方法，用于测试及基准测试中接入fakeredis等本地替代服务
+
+    :param factory: 无参数、返回与redis.Redis接口兼容的客户端对象的方法
+    :return:
+        None: 直到替换完成为止
+    """
+    global _redis_factory
+    _redis_factory = factory
 
 
 _NACOS_CONFIG = OrderedDict([
@@ -54,13 +264,15 @@ def register_to_nacos() -> None:
 
     by organwalk 2023-08-15
     """
+    # nacos客户端仅在注册服务时使用，不在模块加载时导入
+    from nacos import NacosClient
     client = NacosClient('localhost:8848')
     client.add_naming_instance(**_NACOS_CONFIG)
     heartbeat_thread = threading.Thread(target=__send_heartbeat_periodically, args=(client,), daemon=True)
     heartbeat_thread.start()
 
 
-def __send_heartbeat_periodically(client: NacosClient):
+def __send_heartbeat_periodically(client: 'NacosClient'):
     """
     每十秒发送一次心跳至nacos
 
@@ -0,0 +1,164 @@
+"""
+    定义异步服务模式使用的MySQL连接池、Redis客户端及执行CPU密集计算的有界线程池
+    aiomysql与redis.asyncio仅在首次使用时导入；连接池与客户端均绑定于创建时的事件循环，每个进程中只运行一个事件循环
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+from config import MYSQL_POOL_MAX_SIZE, MYSQL_POOL_IDLE_TIMEOUT, ASYNC_EXECUTOR_MAX_WORKERS
+from server_code.application import REDIS_CONFIG, _MYSQL_CONFIG
+
+
+async def _create_async_mysql_pool() -> Any:
+    import aiomysql
+    return await aiomysql.create_pool(minsize=0, maxsize=MYSQL_POOL_MAX_SIZE, pool_recycle=MYSQL_POOL_IDLE_TIMEOUT,
+                                      autocommit=True, db=_MYSQL_CONFIG['database'],
+                                      **{key: value for key, value in _MYSQL_CONFIG.items() if key != 'database'})
+
+
+def _create_async_redis_client() -> Any:
+    import redis.asyncio
+    return redis.asyncio.Redis(**REDIS_CONFIG)
+
+
+_mysql_factory = _create_async_mysql_pool  # type: Callable[[], Awaitable[Any]]
+_redis_factory = _create_async_redis_client  # type: Callable[[], Any]
+_mysql_pool = None
+_mysql_pool_lock = None  # type: Optional[asyncio.Lock]
+_redis_client = None
+_executor = None  # type: Optional[ThreadPoolExecutor]
+_executor_pid = None
+
+
+class _AsyncMySQLCursor:
+    """
+    从连接池取出连接并返回游标，退出时关闭游标并归还连接；发生异常时关闭该连接
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._connection = None
+        self._cursor = None
+
+    async def __aenter__(self) -> Any:
+        self._pool = await get_async_mysql_pool()
+        self._connection = await self._pool.acquire()
+        try:
+            self._cursor = await self._connection.cursor()
+        except BaseException:
+            self._connection.close()
+            self._pool.release(self._connection)
+            raise
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        try:
+            await self._cursor.close()
+        finally:
+            if exc_type is not None:
+                self._connection.close()
+            self._pool.release(self._connection)
+
+
+async def get_async_mysql_pool() -> Any:
+    """
+    获取当前事件循环的MySQL连接池，首次调用时创建
+    :return:
+        Any: aiomysql.Pool或与其接口兼容的连接池
+    """
+    global _mysql_pool, _mysql_pool_lock
+    if _mysql_pool is None:
+        if _mysql_pool_lock is None:
+            _mysql_pool_lock = asyncio.Lock()
+        async with _mysql_pool_lock:
+            if _mysql_pool is None:
+                _mysql_pool = await _mysql_factory()
+    return _mysql_pool
+
+
+def async_mysql_cursor() -> _AsyncMySQLCursor:
+    """
+    获取异步MySQL游标，以 async with async_mysql_cursor() as mysql 的方式使用
+    :return:
+        _AsyncMySQLCursor: 异步上下文管理器，进入时返回游标
+    """
+    return _AsyncMySQLCursor()
+
+
+def set_async_mysql_factory(factory: Callable[[], Awaitable[Any]]) -> None:
+    """
+    替换创建MySQL连接池的方法，用于测试及基准测试中接入本地的替代服务
+    :param factory: 无参数、返回与aiomysql.Pool接口兼容的连接池的协程函数
+    :return:
+        None: 直到替换完成为止，已创建的连接池不再使用
+    """
+    global _mysql_factory, _mysql_pool
+    _mysql_factory, _mysql_pool = factory, None
+
+
+def get_async_redis_client() -> Any:
+    """
+    获取异步Redis客户端，首次调用时创建，此后复用其连接池
+    :return:
+        Any: redis.asyncio.Redis或与其接口兼容的客户端对象
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = _redis_factory()
+    return _redis_client
+
+
+def set_async_redis_factory(factory: Callable[[], Any]) -> None:
+    """
+    替换创建异步Redis客户端的方法，用于测试及基准测试中接入fakeredis等本地替代服务
+    :param factory: 无参数、返回与redis.asyncio.Redis接口兼容的客户端对象的方法
+    :return:
+        None: 直到替换完成为止，已创建的客户端不再使用
+    """
+    global _redis_factory, _redis_client
+    _redis_factory, _redis_client = factory, None
+
+
+async def close() -> None:
+    """
+    关闭MySQL连接池、Redis客户端及线程池
+    :return:
+        None: 直到全部连接关闭为止
+    """
+    global _mysql_pool, _redis_client, _executor
+    pool, _mysql_pool = _mysql_pool, None
+    client, _redis_client = _redis_client, None
+    executor, _executor = _executor, None
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+    if client is not None:
+        # redis-py 5起以aclose代替close
+        await (client.aclose() if hasattr(client, 'aclose') else client.close())
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    获取执行pandas读取与计算、模型推理等阻塞操作的有界线程池，子进程中不复用父进程的线程池
+    :return:
+        ThreadPoolExecutor: 最多ASYNC_EXECUTOR_MAX_WORKERS个线程的线程池
+    """
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_MAX_WORKERS)
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def run_blocking(func: Callable, *args: Any) -> Awaitable:
+    """
+    在有界线程池中执行阻塞的方法，不阻塞事件循环
+    :param func: 阻塞的方法
+    :param args: 方法参数
+    :return:
+        Awaitable: 方法的返回值
+    """
+    return asyncio.get_event_loop().run_in_executor(get_executor(), func, *args)
@@ -0,0 +1,234 @@
+"""
+    异步服务模式：以aiohttp提供与api_server相同的接口，单个进程的事件循环中可同时处理大量请求
+    校验请求时的日期查询通过aiomysql异步执行，数据清洗任务通过redis.asyncio异步读取；
+    pandas计算、模型推理等阻塞操作交由async_application中的有界线程池执行，不阻塞事件循环
+    运行方式：python server_code/async_server.py（需安装aiohttp、aiomysql，redis-py 4.2及以上）
+"""
+import asyncio
+import functools
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from aiohttp import web
+from flask import Response
+from server_code.utils import result, response_encoder, metrics
+from server_code.application import register_to_nacos
+from server_code.async_application import run_blocking
+from server_code import async_application
+from server_code.prediction import model_registry, batch_predictor, result_cache
+import repository
+import entity.req_entity as server_req
+from utils import req_utils
+from service import analyze_service
+from service.prediction_service import predict_by_model, predict_batch_by_model
+from cleaned.meteo_data_cleaned import get_latest_date
+from server_code.cleaned import etl_jobs
+
+routes = web.RouteTableDef()
+
+
+async def _get_json(request: web.Request) -> Optional[Any]:
+    """
+    读取请求中的JSON数据，不是合法的JSON时返回None，与Flask的request.get_json(silent=True)一致
+    """
+    try:
+        return await request.json()
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+@routes.get('/anapredict/model/info')
+async def _api_model_info(request: web.Request) -> Response:
+    """
+    获取并返回模型信息
+    :return:
+        Response: 根据获取状态返回相应的消息以及数据
+    """
+    info_data = await run_blocking(repository.get_model_info)
+    return result.success('成功获取模型信息', info_data) if info_data else result.not_found('未能获取模型信息')
+
+
+@routes.post('/anapredict/model/report')
+async def _api_model_report(request: web.Request) -> Response:
+    """
+    获取并返回模型报告
+    :return:
+        Response: 根据获取状态返回想要的消息以及数据
+    """
+    user_req_json = await _get_json(request)
+    validate = await req_utils.validate_json_user_req_async('/anapredict/model/report', user_req_json,
+                                                            server_req.REPORT)
+    if validate is not None:
+        return result.fail_entity(validate)
+    report = await run_blocking(functools.partial(repository.get_model_report, **user_req_json))
+    return result.success('获取模型报告成功', report) if report else result.not_found('暂无报告')
+
+
+@routes.post('/anapredict/latest_date')
+async def _api_cleaned_latest_date(request: web.Request) -> Response:
+    user_req_json = await _get_json(request)
+    latest = await run_blocking(functools.partial(get_latest_date, **user_req_json))
+    if latest:
+        return result.success('已成功获取最近清洗数据日期', latest)
+    else:
+        return result.fail_entity("未能获取最近清洗数据日期")
+
+
+@routes.post('/anapredict/cleaned')
+async def _api_data_cleaned(request: web.Request) -> Response:
+    """
+    供内部服务调用的数据清洗服务，提交清洗任务后立即返回任务编号，任务在事件循环中执行
+    :return:
+        Response: 根据获取状态返回相应的消息以及任务编号
+    """
+    user_req_json = await _get_json(request)
+    validate = await req_utils.validate_json_user_req_async('/anapredict/cleaned', user_req_json, server_req.CLEANED)
+    if validate is not None:
+        return result.fail_entity(validate)
+    # 提交任务时写入状态文件，交由线程池执行
+    job_id = await run_blocking(functools.partial(etl_jobs.submit_job, **user_req_json))
+    return result.success('已提交此时间范围内数据的清洗任务', {'job_id': job_id})
+
+
+@routes.get('/anapredict/cleaned/job/{job_id}')
+async def _api_data_cleaned_job(request: web.Request) -> Response:
+    """
+    查询数据清洗任务的状态
+    :return:
+        Response: 任务状态以及逐日的进度、耗时与错误信息
+    """
+    job = await run_blocking(etl_jobs.get_job, request.match_info['job_id'])
+    return result.success('成功获取清洗任务状态', job) if job else result.not_found('该清洗任务不存在或已过期')
+
+
+@routes.post('/anapredict/analyze/correlation')
+async def _api_data_correlation(request: web.Request) -> Response:
+    """
+    对给定的要求进行气象数据分析
+    :return:
+        Response: 根据获取状态返回相应的消息以及数据
+    """
+    user_req_json = await _get_json(request)
+    validate = await req_utils.validate_json_user_req_async('/anapredict/analyze/correlation', user_req_json,
+                                                            server_req.CORRELATION)
+    if validate is not None:
+        return result.fail_entity(validate)
+    correlation_list = await run_blocking(functools.partial(analyze_service.get_correlation_list, **user_req_json))
+    return result.success('已成功计算出协相关矩阵结果', correlation_list) if correlation_list is not None \
+        else result.error('计算过程中发生了错误，请稍后再试')
+
+
+@routes.post('/anapredict/model/prediction')
+async def _api_model_prediction(request: web.Request) -> Response:
+    """
+    根据用户的配置信息进行模型预测
+    :return:
+        Response: 根据模型预测结果返回相应的消息以及数据
+    """
+    user_req_json = await _get_json(request)
+    validate = await req_utils.validate_json_user_req_async('/anapredict/model/prediction', user_req_json,
+                                                            server_req.PREDICTION)
+    if validate is not None:
+        return result.fail_entity(validate)
+    prediction_list = await run_blocking(functools.partial(predict_by_model, **user_req_json))
+    return result.success('成功获取预测数据', prediction_list)
+
+
+@routes.post('/anapredict/model/prediction/batch')
+async def _api_model_prediction_batch(request: web.Request) -> Response:
+    """
+    对多个气象站、多个日期进行批量模型预测
+    :return:
+        Response: 与请求预测项一一对应的预测结果，单个预测项的错误消息在其msg字段中返回
+    """
+    user_req_json = await _get_json(request)
+    validate = await req_utils.validate_json_user_req_async('/anapredict/model/prediction/batch', user_req_json,
+                                                            server_req.PREDICTION_BATCH)
+    if validate is not None:
+        return result.fail_entity(validate)
+    items = user_req_json['items']
+    item_errors = await req_utils.validate_prediction_items_async(items)
+    prediction_list = await run_blocking(predict_batch_by_model, items, item_errors)
+    return result.success('成功获取批量预测数据', prediction_list)
+
+
+@routes.get('/anapredict/model/stats')
+async def _api_model_stats(request: web.Request) -> Response:
+    """
+    获取并返回模型推理的运行统计
+    :return:
+        Response: 各模型微批推理的批次大小与排队等待时间统计，以及预测结果缓存的命中统计
+    """
+    stats = OrderedDict([
+        ('batch', batch_predictor.get_batch_metrics()),
+        ('cache', result_cache.get_cache_stats())
+    ])
+    return result.success('成功获取模型推理统计', stats)
+
+
+@routes.get('/anapredict/metrics')
+async def _api_metrics(request: web.Request) -> Response:
+    """
+    以Prometheus文本格式返回运行指标
+    :return:
+        Response: 各接口的请求数与延迟直方图、各处理阶段的耗时直方图、缓存命中率及数据清洗逐日耗时
+    """
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@web.middleware
+async def _result_middleware(request: web.Request,
+                             handler: Callable[[web.Request], Awaitable[Response]]) -> web.Response:
+    """
+    按请求的Accept头编码各接口返回的响应，并将404、405及未处理的异常转换为与api_server一致的响应
+    """
+    start_time = time.perf_counter()
+    response_encoder.set_accept_header(request.headers.get('Accept'))
+    try:
+        response = await handler(request)
+    except web.HTTPNotFound as e:
+        response = result.not_found(f'{e.reason},该接口不存在，请修改后重试')
+    except web.HTTPMethodNotAllowed as e:
+        response = result.fail_method(
+            f"该接口仅支持 {', '.join([method for method in sorted(e.allowed_methods) if (method != 'OPTIONS')])} 方法")
+    except web.HTTPException:
+        raise
+    except Exception:
+        # 与api_server一致，包括JSON数据的字段与接口参数不符的情况
+        traceback.print_exc()
+        response = result.error('Internal Server Error,内部服务处理错误')
+    headers = {key: value for key, value in response.headers.items() if key.lower() != 'content-length'}
+    resource = request.match_info.route.resource
+    metrics.observe_request(resource.canonical if resource is not None else 'unmatched', request.method,
+                            time.perf_counter() - start_time)
+    return web.Response(body=response.get_data(), status=response.status_code, headers=headers)
+
+
+async def _on_startup(app: web.Application) -> None:
+    etl_jobs.use_event_loop(asyncio.get_event_loop())
+
+
+async def _on_cleanup(app: web.Application) -> None:
+    etl_jobs.use_event_loop(None)
+    await async_application.close()
+
+
+def create_app() -> web.Application:
+    """
+    创建异步服务模式的应用
+    :return:
+        web.Application: aiohttp应用，启动后数据清洗任务在其事件循环中执行
+    """
+    app = web.Application(middlewares=[_result_middleware])
+    app.add_routes(routes)
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    return app
+
+
+if __name__ == '__main__':
+    model_registry.preload_models()
+    repository.init_station_date_index()
+    register_to_nacos()
+    web.run_app(create_app(), host='0.0.0.0', port=9594)
@@ -0,0 +1,258 @@
+"""
+    定义异步数据清洗任务：提交后立即返回任务编号，由有界的后台线程池执行；调用use_event_loop后改为在事件循环中执行，
+    各任务通过异步Redis客户端读取数据，转换与加载交由异步服务模式的线程池执行。同一气象站的任务依次执行，避免并发改写同一批文件；同一气象站尚未开始执行的任务合并日期，重复提交的日期不再执行
+    多worker进程运行时，任务编号为UUID，任务状态同时写入ETL_JOB_PATH，查询请求由任一worker进程处理均可获取；
+    不同worker进程对同一气象站的任务由清洗时持有的跨进程气象站锁依次执行，先执行的任务已清洗的日期由水位线跳过
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+# 与api_server、async_server使用相同的模块名导入，避免同一文件作为两个模块加载
+from cleaned import meteo_data_cleaned
+from server_code.async_application import get_executor, run_blocking
+from config import ETL_JOB_MAX_WORKERS, ETL_JOB_HISTORY_SIZE, ETL_JOB_PATH
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCESS = meteo_data_cleaned.DAY_SUCCESS
+FAILED = meteo_data_cleaned.DAY_FAILED
+SKIPPED = meteo_data_cleaned.DAY_SKIPPED
+
+
+class _ETLJob:
+    """
+    单个数据清洗任务及其逐日进度
+    """
+    __slots__ = ('job_id', 'station', 'dates', 'status', 'days', 'submit_time', 'start_time', 'finish_time')
+
+    def __init__(self, job_id: str, station: str, dates: List[str]):
+        self.job_id = job_id
+        self.station = station
+        self.dates = dates
+        self.status = PENDING
+        # 日期 -> (处理状态, 耗时毫秒, 错误信息)
+        self.days = OrderedDict()  # type: OrderedDict
+        self.submit_time = time.time()
+        self.start_time = None
+        self.finish_time = None
+
+    def to_dict(self) -> OrderedDict:
+        return OrderedDict([
+            ('job_id', self.job_id),
+            ('station', self.station),
+            ('status', self.status),
+            ('total', len(self.dates)),
+            ('done', len(self.days)),
+            ('failed', sum(1 for day in self.days.values() if day[0] == FAILED)),
+            ('skipped', sum(1 for day in self.days.values() if day[0] == SKIPPED)),
+            ('submit_time', _format_time(self.submit_time)),
+            ('start_time', _format_time(self.start_time)),
+            ('finish_time', _format_time(self.finish_time)),
+            ('days', [OrderedDict([('date', date), ('status', status), ('cost_ms', cost), ('error', error)])
+                      for date, (status, cost, error) in self.days.items()])
+        ])
+
+
+_lock = threading.Lock()
+_executor = None  # type: Optional[ThreadPoolExecutor]
+_loop = None  # type: Optional[asyncio.AbstractEventLoop]
+_jobs = OrderedDict()  # type: OrderedDict
+# 气象站 -> 尚未开始执行的任务，同一气象站最多一个
+_pending_jobs = {}  # type: Dict[str, _ETLJob]
+# 正在执行任务的气象站
+_running_stations = set()  # type: Set[str]
+_JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def submit_job(station: str, start_date: str, end_date: str) -> str:
+    """
+    提交数据清洗任务
+    :param station: 气象站编号
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :return:
+        str: 任务编号；日期均已在执行中或等待执行时返回已有任务的编号，
+             该气象站已有等待执行的任务时将尚未执行的日期合并入该任务并返回其编号，日期范围为空时返回已结束的任务编号
+    """
+    dates = meteo_data_cleaned.get_date_range(start_date, end_date)
+    with _lock:
+        active = [job for job in _jobs.values() if job.station == station and job.status in (PENDING, RUNNING)]
+        covered = set(date for job in active for date in job.dates)
+        new_dates = [date for date in dates if date not in covered]
+        pending = _pending_jobs.get(station)
+        if not new_dates and (pending is not None or active):
+            return (pending or active[-1]).job_id
+        if not new_dates:
+            # 日期范围为空时不执行，直接记为已结束的任务
+            job = _ETLJob(uuid.uuid4().hex, station, [])
+            job.status = SUCCESS
+            job.start_time = job.finish_time = job.submit_time
+            _jobs[job.job_id] = job
+            _save_job(job)
+            _trim_history()
+            return job.job_id
+        if pending is not None:
+            pending.dates = sorted(set(pending.dates) | set(new_dates))
+            _save_job(pending)
+            return pending.job_id
+        job = _ETLJob(uuid.uuid4().hex, station, new_dates)
+        _jobs[job.job_id] = job
+        _save_job(job)
+        _trim_history()
+        _pending_jobs[station] = job
+        if station not in _running_stations:
+            _start_next(station)
+        return job.job_id
+
+
+def get_job(job_id: str) -> Optional[OrderedDict]:
+    """
+    获取任务状态
+    :param job_id: 任务编号
+    :return:
+        Optional[OrderedDict]: 任务状态、逐日进度、耗时及错误信息，任务不存在时返回None；
+                               任务由其他worker进程执行时读取其状态文件
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+    if not _JOB_ID_PATTERN.match(job_id):
+        return None
+    try:
+        with open(f"{ETL_JOB_PATH}{job_id}.json", 'r', encoding='utf-8') as file:
+            return json.load(file, object_pairs_hook=OrderedDict)
+    except (OSError, ValueError):
+        return None
+
+
+def use_event_loop(loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """
+    此后提交的任务在事件循环中执行，不再占用后台线程池，由异步服务模式在启动时调用
+    :param loop: 事件循环，为None时恢复由后台线程池执行
+    :return:
+        None: 直到切换完成为止
+    """
+    global _loop
+    with _lock:
+        _loop = loop
+
+
+def _start_next(station: str) -> None:
+    """
+    开始执行气象站等待中的任务，需在持有_lock时调用
+    """
+    global _executor
+    job = _pending_jobs.pop(station, None)
+    if job is None:
+        return
+    _running_stations.add(station)
+    if _loop is not None:
+        asyncio.run_coroutine_threadsafe(_run_job_async(job), _loop)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ETL_JOB_MAX_WORKERS)
+    _executor.submit(_run_job, job)
+
+
+def _run_job(job: _ETLJob) -> None:
+    """
+    执行任务，完成后开始执行同一气象站的下一个任务
+    """
+    dates = _begin_job(job)
+    try:
+        meteo_data_cleaned.etl_days([(job.station, date) for date in dates],
+                                    on_day=lambda station, date, status, cost, error:
+                                    _record_day(job, date, status, cost, error))
+    except Exception as e:
+        _fail_remaining(job, dates, e)
+    finally:
+        _finish_job(job)
+
+
+async def _run_job_async(job: _ETLJob) -> None:
+    """
+    在事件循环中执行任务，完成后开始执行同一气象站的下一个任务；写入状态文件等阻塞操作交由线程池执行
+    """
+    dates = await run_blocking(_begin_job, job)
+    try:
+        await meteo_data_cleaned.etl_days_async([(job.station, date) for date in dates], get_executor(),
+                                                on_day=lambda station, date, status, cost, error:
+                                                _record_day(job, date, status, cost, error))
+    except Exception as e:
+        await run_blocking(_fail_remaining, job, dates, e)
+    finally:
+        await run_blocking(_finish_job, job)
+
+
+def _begin_job(job: _ETLJob) -> List[str]:
+    with _lock:
+        job.status = RUNNING
+        job.start_time = time.time()
+        _save_job(job)
+        return list(job.dates)
+
+
+def _fail_remaining(job: _ETLJob, dates: List[str], e: Exception) -> None:
+    """
+    读取Redis等整体失败时，将尚未完成的日期记为失败
+    """
+    with _lock:
+        for date in dates:
+            if date not in job.days:
+                job.days[date] = (FAILED, None, f"{type(e).__name__}: {e}")
+        _save_job(job)
+
+
+def _finish_job(job: _ETLJob) -> None:
+    with _lock:
+        job.status = FAILED if any(day[0] == FAILED for day in job.days.values()) else SUCCESS
+        job.finish_time = time.time()
+        _save_job(job)
+        _running_stations.discard(job.station)
+        _start_next(job.station)
+
+
+def _record_day(job: _ETLJob, date: str, status: str, cost: float, error: Optional[str]) -> None:
+    with _lock:
+        job.days[date] = (status, round(cost, 3), error)
+        _save_job(job)
+
+
+def _save_job(job: _ETLJob) -> None:
+    """
+    以临时文件替换的方式写入任务状态，供其他worker进程查询，需在持有_lock时调用
+    """
+    os.makedirs(ETL_JOB_PATH, exist_ok=True)
+    path = f"{ETL_JOB_PATH}{job.job_id}.json"
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(job.to_dict(), file, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def _trim_history() -> None:
+    """
+    仅保留最近ETL_JOB_HISTORY_SIZE个已结束的任务，需在持有_lock时调用；
+    状态文件目录由各worker进程共享，仅保留最近更新的ETL_JOB_HISTORY_SIZE个状态文件，执行中的任务持续更新不会被删除
+    """
+    finished = [job_id for job_id, job in _jobs.items() if job.status in (SUCCESS, FAILED)]
+    for job_id in finished[:max(0, len(finished) - ETL_JOB_HISTORY_SIZE)]:
+        del _jobs[job_id]
+    files = sorted((entry for entry in os.scandir(ETL_JOB_PATH) if entry.name.endswith('.json')),
+                   key=lambda entry: entry.stat().st_mtime)
+    for entry in files[:max(0, len(files) - ETL_JOB_HISTORY_SIZE)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def _format_time(timestamp: Optional[float]) -> Optional[str]:
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) if timestamp is not None else None
@@ -1,30 +1,40 @@
+import numpy as np
 import pandas as pd
-from config import FILE_PATH
-import redis
-from server_code.application import REDIS_CONFIG
-import csv
+from config import FILE_PATH, ETL_MAX_WORKERS, ETL_PIPELINE_DAYS
+from server_code.application import get_redis_client
+from server_code.async_application import get_async_redis_client
+from server_code.cleaned import reading_codec
+from server_code.utils import metrics
+from storage import column_store, aggregate_store, station_date_index, etl_watermark, date_manifest
+from storage.file_lock import FileLock
+import asyncio
+import multiprocessing
 import os
+import threading
+import time
+from contextlib import ExitStack
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+_FEATURE_COLUMNS = ['Temperature', 'Humidity', 'Speed', 'Direction', 'Rain', 'Sunlight', 'PM2.5', 'PM10']
+_CSV_COLUMNS = ['Time'] + _FEATURE_COLUMNS
 
-def get_latest_date(station: str):
-    folder_path = FILE_PATH + station
-    if not os.path.exists(folder_path) or not os.path.isdir(folder_path):
-        return ""  # 返回空字符串，路径或文件夹不存在
+DAY_SUCCESS = 'success'
+DAY_FAILED = 'failed'
+DAY_SKIPPED = 'skipped'
+
+# 异步清洗等待其他进程释放气象站清洗锁时的重试间隔（秒）
+_LOCK_POLL_INTERVAL = 0.2
 
-    files = os.listdir(folder_path)
-    if not files:
-        return ""  # 返回空字符串，文件夹为空
+# 进程数 -> 当前进程的转换进程池，由全部清洗任务共享
+_process_pools = {}  # type: Dict[int, ProcessPoolExecutor]
+_process_pools_pid = None
+_process_pools_lock = threading.Lock()
 
-    latest_date = ""
-    for file_name in files:
-        file_path = os.path.join(folder_path, file_name)
-        if os.path.isfile(file_path) and file_name.endswith(".csv"):
-            date_str = file_name.split("_")[2].split(".")[0]
-            if date_str > latest_date:
-                latest_date = date_str
 
-    return latest_date
+def get_latest_date(station: str):
+    return date_manifest.get_latest_date(station)
 
 
 def etl_data(station: str, start_date: str, end_date: str):
@@ -38,108 +48,439 @@ def etl_data(station: str, start_date: str, end_date: str):
 
     by organwalk 2023-10-14
     """
-    r = redis.Redis(**REDIS_CONFIG)
-    # 定义起始日期和结束日期
-    start_date = datetime.strptime(start_date, "%Y-%m-%d")
+    etl_stations([station], start_date, end_date)
+
+
+def etl_stations(stations: List[str], start_date: str, end_date: str, max_workers: int = ETL_MAX_WORKERS,
+                 force: bool = False) -> Tuple[int, int]:
+    """
+    对多个气象站的日期范围进行数据清洗：按Redis管道成批读取各日数据，转换交由进程池并行处理，
+    加载仍在当前进程中按气象站、日期的顺序依次写入，结果与逐日处理一致
+    :param stations: 气象站编号列表
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :param max_workers: 并行转换的进程数，为0时在当前进程中依次转换
+    :param force: 是否忽略水位线，重新清洗源数据未变化的日期
+    :return:
+        Tuple[int, int]: 重新清洗的日数据个数，以及因源数据未变化而跳过的日数据个数
+    """
+    tasks = [(station, date_str) for station in stations for date_str in get_date_range(start_date, end_date)]
+    skipped = etl_days(tasks, max_workers, force=force)
+    return len(tasks) - skipped, skipped
+
+
+def etl_days(tasks: List[Tuple[str, str]], max_workers: int = ETL_MAX_WORKERS,
+             on_day: Optional[Callable[[str, str, str, float, Optional[str]], None]] = None,
+             force: bool = False) -> int:
+    """
+    按给定顺序清洗各日数据，Redis有序集合的成员数与最大分值与上次成功清洗时一致且CSV文件仍存在的日期直接跳过
+    :param tasks: (气象站编号, 日期)列表，同一气象站的日期需按升序排列
+    :param max_workers: 并行转换的进程数，为0时在当前进程中依次转换；进程池在首次使用时创建，此后的清洗共享同一进程池
+    :param on_day: 每日处理完成后的回调，参数为气象站编号、日期、处理状态（DAY_SUCCESS、DAY_FAILED或DAY_SKIPPED）、
+                   耗时（毫秒）及错误信息（成功时为None）；提供回调时单日失败不会中断其余日期，否则直接抛出异常
+    :param force: 是否忽略水位线，重新清洗源数据未变化的日期
+    :return:
+        int: 因源数据未变化而跳过的日数据个数
+    """
+    chunks = [tasks[i:i + ETL_PIPELINE_DAYS] for i in range(0, len(tasks), ETL_PIPELINE_DAYS)]
+    client = get_redis_client()
+    executor = get_process_pool(max_workers) if max_workers > 0 else None
+    skipped = 0
+    # 其他worker进程正在清洗同一气象站时等待其完成，之后由水位线跳过其已清洗的日期
+    with _lock_stations(tasks):
+        pending = None
+        for chunk in chunks:
+            changed, chunk_skipped = _split_changed(chunk, _fetch_watermarks(client, chunk), force, on_day)
+            skipped += chunk_skipped
+            if not changed:
+                continue
+            # 提交本批数据的转换后再加载上一批的结果，使读取Redis、转换与写入文件相互重叠
+            members_list = _fetch_members(client, [(station, date_str) for station, date_str, _ in changed])
+            futures = [_submit_transform(executor, members) for members in members_list]
+            if pending is not None:
+                _load_chunk(*pending, on_day)
+            pending = (changed, futures)
+        if pending is not None:
+            _load_chunk(*pending, on_day)
+    return skipped
+
+
+async def etl_days_async(tasks: List[Tuple[str, str]], executor: Executor,
+                         on_day: Optional[Callable[[str, str, str, float, Optional[str]], None]] = None,
+                         force: bool = False) -> int:
+    """
+    etl_days的异步版本：通过异步Redis客户端读取水位线与各日数据，转换与加载交由executor执行，
+    等待Redis响应期间不占用线程，同一事件循环中可同时进行多个气象站的清洗
+    :param tasks: (气象站编号, 日期)列表，同一气象站的日期需按升序排列
+    :param executor: 执行转换与加载的线程池或进程池
+    :param on_day: 每日处理完成后的回调，参数与etl_days一致，在executor的线程中调用
+    :param force: 是否忽略水位线，重新清洗源数据未变化的日期
+    :return:
+        int: 因源数据未变化而跳过的日数据个数
+    """
+    loop = asyncio.get_event_loop()
+    chunks = [tasks[i:i + ETL_PIPELINE_DAYS] for i in range(0, len(tasks), ETL_PIPELINE_DAYS)]
+    client = get_async_redis_client()
+    skipped = 0
+    # 与etl_days相同，持有各气象站的跨进程清洗锁，等待锁期间不占用事件循环
+    locks = await _acquire_station_locks_async(tasks)
+    try:
+        pending = None
+        for chunk in chunks:
+            marks = _to_watermarks(await _queue_watermarks(client.pipeline(transaction=False), chunk).execute())
+            # 读取水位线文件及回调写入任务状态均为阻塞操作，交由executor执行
+            changed, chunk_skipped = await loop.run_in_executor(executor, _split_changed, chunk, marks, force, on_day)
+            skipped += chunk_skipped
+            if not changed:
+                continue
+            pipe = _queue_members(client.pipeline(transaction=False),
+                                  [(station, date_str) for station, date_str, _ in changed])
+            futures = [executor.submit(transform_day, members) for members in await pipe.execute()]
+            # 与etl_days相同，本批数据转换期间加载上一批的结果
+            if pending is not None:
+                await _load_chunk_async(loop, executor, *pending, on_day)
+            pending = (changed, futures)
+        if pending is not None:
+            await _load_chunk_async(loop, executor, *pending, on_day)
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+    return skipped
+
+
+def get_process_pool(max_workers: int = ETL_MAX_WORKERS) -> ProcessPoolExecutor:
+    """
+    获取当前进程中并行转换使用的进程池，首次使用时创建，此后的清洗任务共享同一进程池，不再每次清洗时创建与销毁子进程；
+    子进程以forkserver方式启动（不支持时为spawn），不复制服务进程中的模型、连接池及线程；
+    fork出的worker进程中重新创建，子进程异常退出导致进程池不可用时也重新创建
+    :param max_workers: 进程数
+    :return:
+        ProcessPoolExecutor: 进程池
+    """
+    global _process_pools_pid
+    with _process_pools_lock:
+        if _process_pools_pid != os.getpid():
+            _process_pools.clear()
+            _process_pools_pid = os.getpid()
+        pool = _process_pools.get(max_workers)
+        # _broken在子进程异常退出后被置位，此后提交的任务均会失败
+        if pool is None or getattr(pool, '_broken', False):
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method))
+            _process_pools[max_workers] = pool
+        return pool
+
+
+def get_date_range(start_date: str, end_date: str) -> List[str]:
+    """
+    获取起始日期至结束日期（含）之间的全部日期
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :return:
+        List[str]: 升序排列的日期列表
+    """
+    current_date = datetime.strptime(start_date, "%Y-%m-%d")
     end_date = datetime.strptime(end_date, "%Y-%m-%d")
-    # 遍历日期范围
-    current_date = start_date
+    dates = []
     while current_date <= end_date:
-        # 根据日期生成文件名和 Redis 键名
-        date_str = current_date.strftime("%Y-%m-%d")
-        file_name = f"{FILE_PATH}{station}/{station}_data_{date_str}.csv"
-        redis_key = f"{station}_data_{date_str}"
-        # 从 Redis 中获取数据
-        data = r.zrange(redis_key, 0, -1)
-        # 创建 CSV 文件并写入数据
-        with open(file_name, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            # 写入 CSV 文件的列标题
-            writer.writerow(
-                ['Time', 'Temperature', 'Humidity', 'Speed', 'Direction', 'Rain', 'Sunlight', 'PM2.5', 'PM10'])
-            # 将每行数据写入 CSV 文件
-            for item in data:
-                values = eval(item)
-                writer.writerow(values)
-        # 清洗处理此文件
-        _cleaned_data(station, current_date.strftime("%Y-%m-%d"))
-        # 检查是否需要前向填充
-        _missing_data_fill(station, current_date.strftime("%Y-%m-%d"))
-        # 增加一天
+        dates.append(current_date.strftime("%Y-%m-%d"))
         current_date += timedelta(days=1)
+    return dates
 
 
-def _cleaned_data(station: str, date: str):
+def _fetch_members(client: Any, chunk: List[Tuple[str, str]]) -> List[List[Union[bytes, str]]]:
     """
-    数据清洗核心方法
+    在一个Redis管道中读取一批日数据的有序集合成员
+    :param client: Redis客户端
+    :param chunk: (气象站编号, 日期)列表
+    :return:
+        List[List[Union[bytes, str]]]: 与chunk一一对应的有序集合成员
+    """
+    return _queue_members(client.pipeline(transaction=False), chunk).execute()
+
+
+def _queue_members(pipe: Any, chunk: List[Tuple[str, str]]) -> Any:
+    for station, date_str in chunk:
+        pipe.zrange(f"{station}_data_{date_str}", 0, -1)
+    return pipe
+
+
+def _submit_transform(executor: Optional[ProcessPoolExecutor], members: List[Union[bytes, str]]) -> Future:
+    if executor is not None:
+        return executor.submit(transform_day, members)
+    future = Future()
+    try:
+        future.set_result(transform_day(members))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _fetch_watermarks(client: Any, chunk: List[Tuple[str, str]]) -> List[List[float]]:
+    """
+    在一个Redis管道中读取一批日数据有序集合的成员数与最大分值
+    :param client: Redis客户端
+    :param chunk: (气象站编号, 日期)列表
+    :return:
+        List[List[float]]: 与chunk一一对应的[成员数, 最大分值]，有序集合为空时最大分值为None
+    """
+    return _to_watermarks(_queue_watermarks(client.pipeline(transaction=False), chunk).execute())
+
+
+def _queue_watermarks(pipe: Any, chunk: List[Tuple[str, str]]) -> Any:
+    for station, date_str in chunk:
+        redis_key = f"{station}_data_{date_str}"
+        pipe.zcard(redis_key)
+        pipe.zrange(redis_key, -1, -1, withscores=True)
+    return pipe
+
+
+def _to_watermarks(replies: List[Any]) -> List[List[float]]:
+    return [[card, last[0][1] if last else None] for card, last in zip(replies[::2], replies[1::2])]
+
+
+def _load_chunk(changed: List[Tuple[str, str, List[float]]], futures: List[Future],
+                on_day: Optional[Callable[[str, str, str, float, Optional[str]], None]]) -> None:
+    """
+    按顺序写入一批日数据，并记录写入成功日期的水位线及已清洗日期清单
+    """
+    marks = {}
+    manifest_entries = {}
+    try:
+        for (station, date_str, mark), future in zip(changed, futures):
+            start_time = time.perf_counter()
+            error = None
+            try:
+                manifest_entries.setdefault(station, {})[date_str] = _load_day(station, date_str, future.result())
+                marks.setdefault(station, {})[date_str] = mark
+            except Exception as e:
+                if on_day is None:
+                    raise
+                error = f"{type(e).__name__}: {e}"
+            _report_day(on_day, station, date_str, DAY_FAILED if error else DAY_SUCCESS,
+                        (time.perf_counter() - start_time) * 1000, error)
+    finally:
+        for station, station_entries in manifest_entries.items():
+            date_manifest.update(station, station_entries)
+        for station, station_marks in marks.items():
+            etl_watermark.update(station, station_marks)
+
+
+def _split_changed(chunk: List[Tuple[str, str]], marks: List[List[float]], force: bool,
+                   on_day: Optional[Callable[[str, str, str, float, Optional[str]], None]]
+                   ) -> Tuple[List[Tuple[str, str, List[float]]], int]:
+    """
+    按水位线挑出需要重新清洗的日期，跳过的日期通过on_day报告
+    :return:
+        Tuple[List[Tuple[str, str, List[float]]], int]: 需要重新清洗的(气象站编号, 日期, 水位线)列表，以及跳过的日期数
+    """
+    changed = []
+    for (station, date_str), mark in zip(chunk, marks):
+        if force or not _is_unchanged(station, date_str, mark):
+            changed.append((station, date_str, mark))
+        else:
+            _report_day(on_day, station, date_str, DAY_SKIPPED, 0.0, None)
+    return changed, len(chunk) - len(changed)
+
+
+def _is_unchanged(station: str, date_str: str, mark: List[float]) -> bool:
+    """
+    判断一日的源数据自上次成功清洗后是否未变化且清洗结果仍存在，CSV文件被删除时即使水位线一致也重新清洗
+    """
+    return etl_watermark.get(station, date_str) == mark and os.path.exists(_get_csv_path(station, date_str))
+
+
+def _get_csv_path(station: str, date_str: str) -> str:
+    return f"{FILE_PATH}{station}/{station}_data_{date_str}.csv"
+
+
+def _lock_stations(tasks: List[Tuple[str, str]]) -> ExitStack:
+    """
+    按气象站编号的顺序依次持有各气象站的跨进程清洗锁，返回的ExitStack退出时释放全部锁
+    """
+    stack = ExitStack()
+    try:
+        for station in sorted({station for station, _ in tasks}):
+            stack.enter_context(etl_watermark.station_lock(station))
+    except BaseException:
+        stack.close()
+        raise
+    return stack
+
+
+async def _acquire_station_locks_async(tasks: List[Tuple[str, str]]) -> List[FileLock]:
+    """
+    _lock_stations的异步版本，锁被其他进程持有时每隔_LOCK_POLL_INTERVAL秒重试
+    """
+    locks = []
+    try:
+        for station in sorted({station for station, _ in tasks}):
+            lock = etl_watermark.station_lock(station)
+            while not lock.acquire(blocking=False):
+                await asyncio.sleep(_LOCK_POLL_INTERVAL)
+            locks.append(lock)
+    except BaseException:
+        for lock in reversed(locks):
+            lock.release()
+        raise
+    return locks
+
+
+def _report_day(on_day: Optional[Callable[[str, str, str, float, Optional[str]], None]], station: str, date_str: str,
+                status: str, cost: float, error: Optional[str]) -> None:
+    """
+    记录一日的处理状态与耗时（毫秒）至运行指标，并调用on_day回调
+    """
+    metrics.inc(metrics.ETL_DAYS, (('status', status),))
+    if status != DAY_SKIPPED:
+        metrics.observe(metrics.ETL_DAY_DURATION, cost / 1000, (('status', status),))
+    if on_day is not None:
+        on_day(station, date_str, status, cost, error)
+
+
+async def _load_chunk_async(loop: asyncio.AbstractEventLoop, executor: Executor,
+                           changed: List[Tuple[str, str, List[float]]], futures: List[Future],
+                           on_day: Optional[Callable[[str, str, str, float, Optional[str]], None]]) -> None:
+    """
+    等待一批日数据转换完成后，在executor中按顺序写入
+    """
+    await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+    await loop.run_in_executor(executor, _load_chunk, changed, futures, on_day)
+
+
+def _load_day(station: str, date_str: str, cleaned_data: pd.DataFrame) -> List[int]:
+    """
+    写入一日清洗后的数据
     :param station: 气象站编号
-    :param date: 日期
+    :param date_str: 日期
+    :param cleaned_data: 清洗并前向填充后的数据窗
     :return:
-        None: 直到清洗完成为止
+        List[int]: 写入的行数与CSV文件大小，用于更新已清洗日期清单
+    """
+    path = _get_csv_path(station, date_str)
+    write_day_csv(path, cleaned_data)
+    # 将清洗后的数据同步写入列式存储，并预先计算每小时及每日平均值
+    column_store.write_day(station, date_str, cleaned_data)
+    aggregate_store.write_day(station, date_str, cleaned_data)
+    station_date_index.add(station, date_str)
+    return [len(cleaned_data), os.path.getsize(path)]
+
+
+def transform_day(members: List[Union[bytes, str]]) -> pd.DataFrame:
+    """
+    将一日的Redis有序集合成员转换为清洗并前向填充后的数据窗
+    :param members: zrange返回的成员，每个成员为一条记录列表的字符串形式
+    :return:
+        DataFrame: 包含Time列及八个特征列的数据窗
+    """
+    data = _decode_members(members)
+    data = _cleaned_data(data)
+    return _missing_data_fill(data)
+
+
+def write_day_csv(path: str, data: pd.DataFrame) -> None:
+    """
+    将一日的数据写入临时文件后原子地替换CSV文件，读取方不会读到写入中的文件
+    :param path: CSV文件路径
+    :param data: 包含Time列及八个特征列的数据窗
+    :return:
+        None: 直到写入完成为止
+    """
+    temp_path = path + '.tmp'
+    data.to_csv(temp_path, index=False)
+    os.replace(temp_path, path)
+
+
+def _decode_members(members: List[Union[bytes, str]]) -> pd.DataFrame:
+    """
+    将Redis有序集合成员解析为数据窗，兼容原有的字符串成员与新的二进制成员
+    :param members: zrange返回的成员
+    :return:
+        DataFrame: 包含Time列及八个特征列的数据窗，无法解析的值为NaN
+    """
+    times, values = reading_codec.decode_day(members)
+    data = pd.DataFrame(values, columns=_FEATURE_COLUMNS)
+    data.insert(0, 'Time', times.astype(object))
+    return data
+
+
+def _cleaned_data(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    数据清洗核心方法
+    :param data: 解析后的一日数据
+    :return:
+        DataFrame: 清洗后的数据
 
     by organwalk 2023-10-14
     """
-    # 读取原始csv文件
-    path = f'{FILE_PATH}{station}/{station}_data_{date}.csv'
-    data = pd.read_csv(path)
     # 缺失值处理：直接丢弃含有缺失值的行
     data = data.dropna()
     # 噪音数据处理：基于标准方差进行过滤
-    cols = ['Temperature', 'Humidity', 'Speed', 'Direction', 'Rain', 'Sunlight', 'PM2.5', 'PM10']
-    for col in cols:
+    for col in _FEATURE_COLUMNS:
         mean = data[col].mean()
         std = data[col].std()
         threshold = mean + 3 * std
         data = data[data[col] <= threshold]
-    # 清空原始数据集文件内容
-    with open(path, 'w') as file:
-        file.write('')
-    # 将内容重写为清洗转换后的数据
-    with open(path, 'a') as file:
-        file.write(','.join(data.columns) + '\n')
-        for index, row in data.iterrows():
-            if index != 0:
-                file.write('\n')  # 写入换行符
-            file.write(','.join(map(str, row)))
+    return data.reset_index(drop=True)
 
 
-def _missing_data_fill(station: str, date: str):
+def _missing_data_fill(data: pd.DataFrame) -> pd.DataFrame:
     """
     检查数据集在24小时内每小时是否都具有记录，若连续时间段内存在小时数据缺失，则前向填充一条记录
-    :param station: 气象站编号
-    :param date: 日期
+    缺失小时的记录取自前一个存在记录的小时的最后一行，时间改为该小时的59分；
+    0时起连续缺失的小时之前没有可填充的记录，取当日第一行
+    :param data: 清洗后的一日数据
     :return:
-        None: 直到填充完成为止
+        DataFrame: 填充后的数据，按小时排列且Time列统一为hh:MM:SS格式，无需填充时原样返回
 
     by organwalk
     """
-    path = f'{FILE_PATH}{station}/{station}_data_{date}.csv'
-    df = pd.read_csv(path, index_col='Time')
-    # 将索引转换为datetime格式，方便后续处理
-    df.index = pd.to_datetime(df.index)
-    # 检查是否有24个不同的小时值
-    if len(df.index.hour.unique()) != 24:
-        # 创建一个空的DataFrame，用于存储补全后的数据
-        new_df = pd.DataFrame()
-        # 遍历24个小时，每个小时为一个循环
-        for hour in range(24):
-            # 获取当前小时的数据
-            hour_df = df[df.index.hour == hour]
-            # 如果当前小时没有数据
-            if hour_df.empty:
-                # 获取前一个小时的最后一行数据
-                last_row = new_df.iloc[-1]
-                # 将最后一行数据的时间索引修改为当前小时的最后一分钟
-                last_row.name = last_row.name.replace(hour=hour, minute=59)
-                # 将修改后的数据添加到新的DataFrame中
-                new_df = new_df.append(last_row)
-            # 如果当前小时有数据
-            else:
-                # 将当前小时的数据添加到新的DataFrame中
-                new_df = new_df.append(hour_df)
-        # 重置索引，将Time列恢复为普通列
-        new_df = new_df.reset_index()
-        # 将Time列的格式转换为hh:MM:SS
-        new_df['Time'] = new_df['Time'].dt.strftime('%H:%M:%S')
-        # 输出新的csv文件，包含Time列
-        new_df.to_csv(path, index=False)
+    if data.empty:
+        return data
+    day_seconds = _to_day_seconds(data['Time'])
+    hours = day_seconds // 3600
+    # 统计每小时的记录数，记录数为0的小时即为缺失的小时
+    counts = np.bincount(hours, minlength=24)
+    present = counts > 0
+    if present.all():
+        return data
+    # 按小时稳定排序后，每小时最后一行的位置为记录数的累加和减一
+    order = np.argsort(hours, kind='stable')
+    last_positions = np.cumsum(counts) - 1
+    # 每个小时之前（含该小时）最近一个存在记录的小时，不存在时为-1
+    previous_hours = np.maximum.accumulate(np.where(present, np.arange(24), -1))
+    missing_hours = np.flatnonzero(~present)
+    source_hours = previous_hours[missing_hours]
+    fill_sources = np.where(source_hours >= 0, order[last_positions[np.maximum(source_hours, 0)]], order[0])
+    # 合并原有记录与填充记录，再按小时稳定排序，一次取出全部行
+    rows = np.concatenate([order, fill_sources])
+    row_hours = np.concatenate([hours[order], missing_hours])
+    is_fill = np.concatenate([np.zeros(len(order), dtype=bool), np.ones(len(missing_hours), dtype=bool)])
+    arrange = np.argsort(row_hours, kind='stable')
+    rows, is_fill = rows[arrange], is_fill[arrange]
+    new_df = data.iloc[rows].reset_index(drop=True)
+    # 填充记录保留来源记录的秒数，小时与分钟改为该小时的59分
+    time_values = new_df['Time'].astype(str).values
+    for position, source, hour in zip(np.flatnonzero(is_fill), fill_sources, missing_hours):
+        time_values[position] = f"{hour:02d}:59:{day_seconds[source] % 60:02d}"
+    new_df['Time'] = time_values
+    return new_df
+
+
+def _to_day_seconds(times: pd.Series) -> np.ndarray:
+    """
+    将hh:mm:ss格式的Time列转换为当日秒数；全部为8个字符且格式一致时直接按字符编码计算，否则逐个解析
+    :param times: Time列
+    :return:
+        np.ndarray: int64当日秒数
+    """
+    values = np.asarray(times.astype(str).values, dtype=str)
+    # 仅当全部时间均恰为8个字符时按定长字符编码计算，更长或更短的时间不能截断或补齐，逐个解析
+    if values.dtype == np.dtype('U8') and (np.char.str_len(values) == 8).all():
+        codes = values.view(np.uint32).reshape(-1, 8).astype(np.int64) - ord('0')
+        digits = codes[:, [0, 1, 3, 4, 6, 7]]
+        colon = ord(':') - ord('0')
+        if (codes[:, 2] == colon).all() and (codes[:, 5] == colon).all() and ((digits >= 0) & (digits <= 9)).all():
+            return (digits[:, 0] * 10 + digits[:, 1]) * 3600 + (digits[:, 2] * 10 + digits[:, 3]) * 60 + \
+                digits[:, 4] * 10 + digits[:, 5]
+    return pd.to_timedelta(times.astype(str)).values.astype('timedelta64[s]').astype(np.int64)
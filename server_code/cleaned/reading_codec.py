@@ -0,0 +1,119 @@
+"""
+    定义Redis中气象读数有序集合成员的编解码
+    原有成员为一条记录列表（或元组）的字符串形式，如 "['00:00:00', 12.3, 45.0, ...]"，按一日整体去除括号与引号后切分并转换为数组，
+    不再逐条调用eval；新的写入方可使用紧凑的二进制编码：3字节头部后依次为当日秒数（uint32）及八个特征（float32），均为小端序。
+    同一日中两种编码的成员可以混合存在，解码结果保持成员原有的顺序
+"""
+import ast
+import struct
+import numpy as np
+from typing import List, Sequence, Tuple, Union
+
+N_FEATURES = 8
+BINARY_MAGIC = b'\x00M1'
+_BINARY_ROW = struct.Struct('<I8f')
+_BINARY_DTYPE = np.dtype([('time', '<u4'), ('values', '<f4', (N_FEATURES,))])
+_TEXT_STRIP = b"[]()'\" "
+_NAN_TOKENS = (b'None', b'nan', b'')
+
+
+def encode_reading(time: str, values: Sequence[float]) -> bytes:
+    """
+    将一条记录编码为二进制成员
+    :param time: hh:mm:ss格式的时间
+    :param values: 八个特征的值
+    :return:
+        bytes: 二进制成员
+    """
+    hour, minute, second = (int(part) for part in time.split(':'))
+    return BINARY_MAGIC + _BINARY_ROW.pack(hour * 3600 + minute * 60 + second, *values)
+
+
+def decode_day(members: List[Union[bytes, str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    解码一日的全部成员
+    :param members: zrange返回的成员
+    :return:
+        Tuple[np.ndarray, np.ndarray]: object类型的时间数组（文本成员保留原有的完整时间字符串，二进制成员为hh:mm:ss格式），
+                                       以及形如(n, 8)的float64特征数组，无法解析的值为NaN
+    """
+    members = [member.encode() if isinstance(member, str) else member for member in members]
+    times = np.empty(len(members), dtype=object)
+    values = np.empty((len(members), N_FEATURES), dtype=np.float64)
+    is_binary = np.fromiter((member.startswith(BINARY_MAGIC) for member in members), dtype=bool, count=len(members))
+    if is_binary.any():
+        positions = np.flatnonzero(is_binary)
+        times[positions], values[positions] = _decode_binary([members[i] for i in positions])
+    if not is_binary.all():
+        positions = np.flatnonzero(~is_binary)
+        times[positions], values[positions] = _decode_text([members[i] for i in positions])
+    return times, values
+
+
+def _decode_binary(members: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    offset = len(BINARY_MAGIC)
+    rows = np.frombuffer(b''.join(member[offset:] for member in members), dtype=_BINARY_DTYPE)
+    seconds = rows['time'].astype(np.int64)
+    return _format_seconds(seconds), rows['values'].astype(np.float64)
+
+
+def _decode_text(members: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    去除全部成员的括号、引号与空格后一次切分，字段数与成员数不符时逐条解析
+    """
+    blob = b','.join(member.translate(None, _TEXT_STRIP) for member in members)
+    tokens = np.array(blob.split(b','))
+    if len(tokens) != len(members) * (N_FEATURES + 1):
+        return _decode_text_rows(members)
+    tokens = tokens.reshape(len(members), N_FEATURES + 1)
+    # 按实际长度解码，不能截断为定长，带小数秒或日期的时间原样保留
+    times = np.char.decode(tokens[:, 0], 'utf-8')
+    features = tokens[:, 1:]
+    try:
+        return times, features.astype(np.float64)
+    except ValueError:
+        return times, _to_float_tokens(features)
+
+
+def _decode_text_rows(members: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    逐条以ast.literal_eval解析成员，仅在成员格式不一致时使用
+    """
+    times = np.empty(len(members), dtype=object)
+    values = np.full((len(members), N_FEATURES), np.nan)
+    for i, member in enumerate(members):
+        try:
+            row = ast.literal_eval(member.decode())
+        except (ValueError, SyntaxError):
+            continue
+        features = row[1:N_FEATURES + 1]
+        times[i] = str(row[0])
+        values[i, :len(features)] = _to_float_tokens(np.array([str(value).encode() for value in features]))
+    return times, values
+
+
+def _to_float_tokens(tokens: np.ndarray) -> np.ndarray:
+    """
+    逐个转换无法整体转换的字段，无法解析的值为NaN
+    """
+    result = np.full(tokens.shape, np.nan)
+    for index, token in np.ndenumerate(tokens):
+        if token not in _NAN_TOKENS:
+            try:
+                result[index] = float(token)
+            except ValueError:
+                pass
+    return result
+
+
+def _format_seconds(seconds: np.ndarray) -> np.ndarray:
+    """
+    将当日秒数转换为hh:mm:ss格式，直接按字符编码生成定长字符串数组
+    """
+    hours, rest = np.divmod(seconds, 3600)
+    minutes, secs = np.divmod(rest, 60)
+    codes = np.full((len(seconds), 8), ord(':'), dtype=np.uint32)
+    for column, part in ((0, hours), (3, minutes), (6, secs)):
+        codes[:, column] = part // 10 + ord('0')
+        codes[:, column + 1] = part % 10 + ord('0')
+    return codes.view('U8').reshape(-1)
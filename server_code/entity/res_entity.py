@@ -50,3 +50,22 @@ def set_model_report(date: str, rmse: str, mae: str, r2: str, train_loss: str, v
         ('val_loss', val_loss)
     ])
 
+
+def set_batch_prediction_item(station: str, start_date: str, model_type: str, data: any, msg: str) -> OrderedDict:
+    """
+    封装/anapredict/model/prediction/batch接口中单个预测项的响应数据
+    :param station: 气象站编号
+    :param start_date: 日期
+    :param model_type: 模型类型
+    :param data: 预测结果，预测失败时为None
+    :param msg: 预测失败的错误消息，预测成功时为None
+    :return:
+        OrderedDict: 预测项结果的有序字典
+    """
+    return OrderedDict([
+        ('station', station),
+        ('start_date', start_date),
+        ('model_type', model_type),
+        ('data', data),
+        ('msg', msg)
+    ])
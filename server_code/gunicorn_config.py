@@ -0,0 +1,33 @@
+"""
+    生产模式的gunicorn配置：gunicorn -c server_code/gunicorn_config.py wsgi:app
+    worker数与线程数默认取config.py中的SERVER_WORKERS、SERVER_THREADS，可通过命令行参数 -w、--threads 覆盖；
+    设置环境变量METEO_NACOS_REGISTER=0时不注册到nacos（如压测时）
+"""
+import os
+import sys
+
+_SERVER_PATH = os.path.dirname(os.path.abspath(__file__))
+_ROOT_PATH = os.path.dirname(_SERVER_PATH)
+sys.path[:0] = [_ROOT_PATH, _SERVER_PATH]
+
+from config import SERVER_BIND, SERVER_WORKERS, SERVER_THREADS  # noqa: E402
+
+pythonpath = f"{_ROOT_PATH},{_SERVER_PATH}"
+bind = SERVER_BIND
+workers = SERVER_WORKERS
+threads = SERVER_THREADS
+worker_class = 'gthread'
+# 在主进程中导入应用并预加载模型，fork出的worker共享同一份只读数据
+preload_app = True
+
+
+def when_ready(server):
+    # 由主进程注册并发送心跳，每台主机只注册一次，不随worker数量重复注册
+    if os.environ.get('METEO_NACOS_REGISTER', '1') != '0':
+        from server_code.application import register_to_nacos
+        register_to_nacos()
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.init_worker()
@@ -0,0 +1,195 @@
+"""
+    定义微批推理引擎，将并发的预测请求合并为一次模型推理
+"""
+import os
+import queue
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict
+from server_code.prediction import model_registry
+from server_code.utils import metrics
+from config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+
+
+class _PendingRequest:
+    """
+    等待合并推理的单个请求
+    """
+    __slots__ = ('x_input', 'enqueue_time', 'done', 'output', 'error')
+
+    def __init__(self, x_input: np.ndarray):
+        self.x_input = x_input
+        self.enqueue_time = time.perf_counter()
+        self.done = threading.Event()
+        self.output = None
+        self.error = None
+
+
+class BatchPredictor:
+    """
+    单个模型的微批推理器：在等待窗口内收集请求，堆叠后执行一次predict，再按请求切分结果
+    """
+
+    def __init__(self, model_type: str, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.model_type = model_type
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._worker_pid = None
+        self._metrics_lock = threading.Lock()
+        self._batch_count = 0
+        self._sample_count = 0
+        self._batch_size_count = {}
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    def predict(self, x_input: np.ndarray) -> np.ndarray:
+        """
+        提交输入序列并等待合并推理结果
+        :param x_input: 形如(n, time_step, n_features)的输入序列
+        :return:
+            np.ndarray: 与x_input样本数一致的模型输出
+        """
+        self._ensure_worker()
+        pending = _PendingRequest(x_input)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.output
+
+    def get_metrics(self) -> OrderedDict:
+        """
+        获取批次大小与排队等待时间的统计
+        :return:
+            OrderedDict: 批次统计结果
+        """
+        with self._metrics_lock:
+            return OrderedDict([
+                ('batch_count', self._batch_count),
+                ('sample_count', self._sample_count),
+                ('avg_batch_size', round(self._sample_count / self._batch_count, 2) if self._batch_count else 0),
+                ('batch_size_count', OrderedDict(sorted(self._batch_size_count.items()))),
+                ('avg_queue_wait_ms', round(self._queue_wait_total / self._sample_count * 1000, 3)
+                    if self._sample_count else 0),
+                ('max_queue_wait_ms', round(self._queue_wait_max * 1000, 3))
+            ])
+
+    def _ensure_worker(self):
+        """
+        按需开启推理线程；在fork出的子进程中会重新开启
+        """
+        if self._worker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            worker_thread = threading.Thread(target=self._run, daemon=True)
+            worker_thread.start()
+            self._worker_pid = os.getpid()
+
+    def _run(self):
+        """
+        推理线程主循环
+        """
+        while True:
+            batch = self._collect_batch()
+            self._predict_batch(batch)
+
+    def _collect_batch(self) -> list:
+        """
+        阻塞等待第一个请求，随后在等待窗口内继续收集，直到样本数达到上限
+        """
+        first = self._queue.get()
+        batch = [first]
+        size = len(first.x_input)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.x_input)
+        return batch
+
+    def _predict_batch(self, batch: list):
+        """
+        对合并后的输入执行一次predict，并将结果按请求切分返回
+        """
+        start_time = time.perf_counter()
+        try:
+            x_batch = np.concatenate([pending.x_input for pending in batch], axis=0)
+            model = model_registry.get_model(self.model_type)
+            output = model.predict(x_batch, verbose=0)
+            offset = 0
+            for pending in batch:
+                n = len(pending.x_input)
+                pending.output = output[offset:offset + n]
+                offset += n
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        self._record(batch, start_time)
+        for pending in batch:
+            pending.done.set()
+
+    def _record(self, batch: list, start_time: float):
+        """
+        记录批次大小及各请求的排队等待时间
+        """
+        size = sum(len(pending.x_input) for pending in batch)
+        waits = [start_time - pending.enqueue_time for pending in batch]
+        with self._metrics_lock:
+            self._batch_count += 1
+            self._sample_count += size
+            self._batch_size_count[size] = self._batch_size_count.get(size, 0) + 1
+            self._queue_wait_total += sum(wait * len(pending.x_input) for wait, pending in zip(waits, batch))
+            self._queue_wait_max = max(self._queue_wait_max, max(waits))
+
+
+_predictors = {}  # type: Dict[str, BatchPredictor]
+_predictors_lock = threading.Lock()
+
+
+def get_predictor(model_type: str) -> BatchPredictor:
+    """
+    获取模型类型对应的微批推理器
+    :param model_type: 模型类型
+    :return:
+        BatchPredictor: 微批推理器
+    """
+    predictor = _predictors.get(model_type)
+    if predictor is None:
+        with _predictors_lock:
+            predictor = _predictors.setdefault(model_type, BatchPredictor(model_type))
+    return predictor
+
+
+def predict(model_type: str, x_input: np.ndarray) -> np.ndarray:
+    """
+    通过微批推理器获取模型输出
+    :param model_type: 模型类型
+    :param x_input: 形如(n, time_step, n_features)的输入序列
+    :return:
+        np.ndarray: 归一化状态下的模型输出，由调用方自行解归一化
+    """
+    # 包含等待与其他请求合并的时间，即调用方实际等待推理结果的耗时
+    with metrics.stage('model_predict'):
+        return get_predictor(model_type).predict(x_input)
+
+
+def get_batch_metrics() -> OrderedDict:
+    """
+    获取所有微批推理器的统计信息
+    :return:
+        OrderedDict: 以模型类型为键的统计信息
+    """
+    return OrderedDict((model_type, predictor.get_metrics()) for model_type, predictor in sorted(_predictors.items()))
@@ -3,54 +3,181 @@
     by organwalk 2023-09-18
 """
 import repository
-from tensorflow.keras.models import load_model
-from config import MODEL_PATH
+import data_utils as dtools
+from server_code.prediction import batch_predictor, result_cache
+from server_code.utils import metrics
+from datetime import datetime, timedelta
 import numpy as np
-from typing import List
+from typing import List, Optional, Tuple
 
+# 批量预测时每个样本输入数据的形状：短期模型为24小时 x 8个特征，长期模型为连续七日各一行 x 8个特征
+_SHORT_TERM_SHAPE = (24, 8)
+_LONG_TERM_SHAPE = (7, 1, 8)
 
-def get_short_term_predict(station: str, date: str) -> List[List[int]]:
+
+def get_short_term_predict(station: str, date: str) -> np.ndarray:
     """
     获取LSTM短期模型的预测结果
     :param station: 气象站编号
     :param date: 日期
     :return:
-        List[List[float]] or None: 返回值为二维数组的预测结果，无结果时返回None
+        np.ndarray: 形如(24, 8)的预测结果，由响应编码器直接写出
 
     by organwalk 2023-09-17
     """
     time_step = 24
     feature = 8
+    # 数据集与模型均未变化时直接返回缓存的预测结果
+    cache_key = result_cache.make_key('SHORTTERM_LSTM', station, date, [repository.get_csv_path(station, date)])
+    cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
     # 0. 获取归一化后的数据，及解归一化使用的scaler对象
     df_data, scaler = repository.get_one_csv_data(station, date)
-    # 1. 加载模型
-    model = load_model(f'{MODEL_PATH}/short_lstm.h5')
-    # 2. 获取预测数据
-    # 2.1 将输入数据窗转为numpy数组
+    # 1. 获取预测数据
+    # 1.1 将输入数据窗转为numpy数组
     input_data = np.array([df_data])
-    # 2.2 根据时间步长、特征值划分numpy数组为输入序列
+    # 1.2 根据时间步长、特征值划分numpy数组为输入序列
     x_input = input_data.reshape((1, time_step, feature))
-    # 2.3 使用模型获取预测结果
-    output_data = model.predict(x_input, verbose=0)[0]
-    # 2.4 将预测结果解归一化
+    # 1.3 经微批推理器与其他并发请求合并后获取预测结果
+    output_data = batch_predictor.predict('SHORTTERM_LSTM', x_input)[0]
+    # 1.4 将预测结果解归一化
     non_scaler_output = scaler.inverse_transform(output_data).reshape((time_step, feature))
-    # 2.5 保留预测结果小数点后两位，二维数组化的预测结果
-    predict_result = np.round(non_scaler_output).round(2).tolist()
+    # 1.5 保留预测结果小数点后两位，二维数组化的预测结果
+    predict_result = np.round(non_scaler_output).round(2)
+    result_cache.put(cache_key, predict_result)
     return predict_result
 
 
-def get_long_term_predict(station: str, date: str) -> List[List[int]]:
-    model = load_model(f'{MODEL_PATH}/long_lstm.h5')
+def get_long_term_predict(station: str, date: str) -> np.ndarray:
+    cache_key = result_cache.make_key('LONGTERM_LSTM', station, date,
+                                      [repository.get_csv_path(station, csv_date)
+                                       for csv_date in _get_seven_csv_dates(station, date)])
+    cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
     data_list, scaler = repository.get_seven_csv_data(station=station, date=date)
     # 0. 根据时间步长、特征值划分numpy数组为输入序列
     time_step = 7
     n_features = 8
     x_input = np.reshape([np.array(a[0]) for a in data_list], (1, time_step, n_features))
-    # 1. 使用模型获取预测结果
-    output_data = model.predict(x_input, verbose=1)[0]
+    # 1. 经微批推理器与其他并发请求合并后获取预测结果
+    output_data = batch_predictor.predict('LONGTERM_LSTM', x_input)[0]
     # 2. 获得解归一化的预测结果
     non_scaler_output = scaler.inverse_transform(output_data).reshape((time_step, n_features))
     # 3. 保留预测结果小数点后两位，二维数组化的预测结果
-    predict_result = np.round(non_scaler_output).round(2).tolist()
+    predict_result = np.round(non_scaler_output).round(2)
+    result_cache.put(cache_key, predict_result)
 
     return predict_result
+
+
+def _get_seven_csv_dates(station: str, date: str) -> List[str]:
+    """
+    获取长期模型预测所使用的连续七日数据集日期
+    :param station: 气象站编号
+    :param date: 截止日期
+    :return:
+        List[str]: 数据集日期列表，无法前向填充时返回空列表
+    """
+    start_date = (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=-6)).strftime('%Y-%m-%d')
+    existing_dates = repository.get_csv_dates(station, start_date, date)
+    return existing_dates if not isinstance(existing_dates, str) else []
+
+
+def get_short_term_predict_batch(station_dates: List[Tuple[str, str]]) -> List[Optional[np.ndarray]]:
+    """
+    批量获取LSTM短期模型的预测结果，所有样本合并为一个输入张量进行一次推理
+    :param station_dates: (气象站编号, 日期)列表
+    :return:
+        List[Optional[np.ndarray]]: 与station_dates一一对应的预测结果，数据读取失败或形状不符的样本为None
+    """
+    results = [None] * len(station_dates)
+    # 0. 读取未命中缓存的每个样本24小时内每小时的平均值
+    avg_data_list, indexes, cache_keys = [], [], []
+    for i, (station, date) in enumerate(station_dates):
+        cache_key = result_cache.make_key('SHORTTERM_LSTM', station, date, [repository.get_csv_path(station, date)])
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            results[i] = cached_result
+            continue
+        try:
+            avg_data_list.append(_check_shape(repository.get_hour_avg_data(station, date).values, _SHORT_TERM_SHAPE))
+        except (OSError, ValueError, KeyError):
+            continue
+        indexes.append(i)
+        cache_keys.append(cache_key)
+    _predict_batch('SHORTTERM_LSTM', avg_data_list, indexes, cache_keys, results)
+    return results
+
+
+def get_long_term_predict_batch(station_dates: List[Tuple[str, str]]) -> List[Optional[np.ndarray]]:
+    """
+    批量获取LSTM长期模型的预测结果，所有样本合并为一个输入张量进行一次推理
+    :param station_dates: (气象站编号, 截止日期)列表
+    :return:
+        List[Optional[np.ndarray]]: 与station_dates一一对应的预测结果，数据读取失败或形状不符的样本为None
+    """
+    results = [None] * len(station_dates)
+    # 0. 读取未命中缓存的每个样本连续七日各自的日平均值，每一日作为一个(1, n_features)的数据窗
+    avg_data_list, indexes, cache_keys = [], [], []
+    for i, (station, date) in enumerate(station_dates):
+        existing_dates = _get_seven_csv_dates(station, date)
+        if not existing_dates:
+            continue
+        cache_key = result_cache.make_key('LONGTERM_LSTM', station, date,
+                                          [repository.get_csv_path(station, csv_date) for csv_date in existing_dates])
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            results[i] = cached_result
+            continue
+        try:
+            avg_data_list.append(_check_shape(np.stack([repository.get_day_avg_data(station, csv_date).values
+                                                        for csv_date in existing_dates]), _LONG_TERM_SHAPE))
+        except (OSError, ValueError, KeyError):
+            continue
+        indexes.append(i)
+        cache_keys.append(cache_key)
+    _predict_batch('LONGTERM_LSTM', avg_data_list, indexes, cache_keys, results)
+    return results
+
+
+def _check_shape(avg_data: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    校验单个样本的平均值数据形状，数据集缺少小时或特征列时抛出ValueError，使该样本记为失败而不影响其余样本的堆叠
+    """
+    if avg_data.shape != shape:
+        raise ValueError(f"样本数据形状为{avg_data.shape}，需要{shape}")
+    return avg_data
+
+
+def _predict_batch(model_type: str, avg_data_list: List[np.ndarray], indexes: List[int],
+                   cache_keys: List[Optional[Tuple]], results: List[Optional[np.ndarray]]) -> None:
+    """
+    将多个样本的平均值数据堆叠后归一化、推理并解归一化，结果写入results并缓存
+    :param model_type: 模型类型
+    :param avg_data_list: 每个样本的平均值数据
+    :param indexes: 每个样本在结果中的位置
+    :param cache_keys: 每个样本的缓存键
+    :param results: 预测结果列表
+    :return:
+        None: 直到所有样本的预测结果写入完成为止
+    """
+    if not avg_data_list:
+        return
+    # 0. 按样本分别归一化，与单次预测时逐个拟合MinMaxScaler的结果一致
+    with metrics.stage('scaler_fit'):
+        scaled_data, data_min, data_range = dtools.get_batch_scaler_result(np.stack(avg_data_list).astype(float))
+    n_samples, time_step, n_features = len(avg_data_list), scaled_data.shape[1], scaled_data.shape[-1]
+    # 长期模型逐日归一化，解归一化使用最后一日的缩放器，与get_seven_csv_data一致
+    data_min, data_range = data_min.reshape((n_samples, -1, n_features))[:, -1:], \
+        data_range.reshape((n_samples, -1, n_features))[:, -1:]
+    x_input = scaled_data.reshape((n_samples, time_step, n_features))
+    # 1. 合并为一个输入张量进行推理
+    output_data = batch_predictor.predict(model_type, x_input)
+    # 2. 解归一化并保留小数点后两位
+    non_scaler_output = dtools.inverse_batch_scaler(output_data, data_min, data_range)
+    predict_results = np.round(non_scaler_output).round(2)
+    for i, cache_key, predict_result in zip(indexes, cache_keys, predict_results):
+        result_cache.put(cache_key, predict_result.copy())
+        results[i] = predict_result
@@ -0,0 +1,136 @@
+"""
+    定义进程内的模型注册表，启动时预加载模型，并在模型文件更新时原子地热替换
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple
+from config import MODEL_PATH, MODEL_FILE_DICT, MODEL_RELOAD_INTERVAL, SHORT_TERM_MODEL_LIST, LONG_TERM_MODEL_LIST, \
+    INFERENCE_BACKEND
+
+# 模型类型 -> (模型对象, 模型文件修改时间)，替换整个条目即完成一次原子切换
+_models = {}  # type: Dict[str, Tuple[Any, float]]
+_load_lock = threading.Lock()
+_watcher_pid = None
+
+
+def get_model_file(model_type: str) -> str:
+    """
+    获取模型类型对应的模型文件路径
+    :param model_type: 模型类型
+    :return:
+        str: 模型文件路径
+    """
+    return os.path.join(MODEL_PATH, MODEL_FILE_DICT[model_type])
+
+
+def get_model(model_type: str) -> Any:
+    """
+    获取已加载的模型对象，尚未加载时同步加载一次
+    :param model_type: 模型类型
+    :return:
+        Any: 模型对象，调用方在本次请求中应始终使用同一个引用
+    """
+    entry = _models.get(model_type)
+    if entry is None:
+        entry = _load(model_type)
+    return entry[0]
+
+
+def get_model_version(model_type: str) -> float:
+    """
+    获取当前使用中的模型版本，即加载时模型文件的修改时间
+    :param model_type: 模型类型
+    :return:
+        float: 模型文件修改时间
+    """
+    entry = _models.get(model_type)
+    if entry is None:
+        entry = _load(model_type)
+    return entry[1]
+
+
+def preload_models(watch: bool = True) -> None:
+    """
+    预加载SHORT_TERM_MODEL_LIST与LONG_TERM_MODEL_LIST中的全部模型，并开启模型文件监听线程
+    :param watch: 是否开启模型文件监听线程，在fork前预加载时应为False，由fork出的各进程自行开启
+    :return:
+        None: 直到所有模型加载完成为止
+    """
+    for model_type in SHORT_TERM_MODEL_LIST + LONG_TERM_MODEL_LIST:
+        _load(model_type)
+    if watch:
+        start_watcher()
+
+
+def start_watcher() -> None:
+    """
+    开启一个守护线程，周期性检查模型文件是否更新
+    :return:
+        None: 同一进程中重复调用时不会开启多个线程，fork出的子进程中会重新开启
+    """
+    global _watcher_pid
+    with _load_lock:
+        if _watcher_pid == os.getpid():
+            return
+        _watcher_pid = os.getpid()
+    watcher_thread = threading.Thread(target=__reload_periodically, daemon=True)
+    watcher_thread.start()
+
+
+def reload_if_changed() -> None:
+    """
+    重新加载模型文件已更新的模型，加载完成前调用方仍使用旧模型
+    :return:
+        None: 直到检查及重新加载完成为止
+    """
+    for model_type, (_, version) in list(_models.items()):
+        try:
+            mtime = os.path.getmtime(get_model_file(model_type))
+        except OSError:
+            # 模型文件正在被替换或已被删除时，继续使用旧模型
+            continue
+        if mtime != version:
+            try:
+                _load(model_type, force=True)
+            except Exception as e:
+                print(f"重新加载模型{model_type}失败，继续使用旧模型：{e}")
+
+
+def _load(model_type: str, force: bool = False) -> Tuple[Any, float]:
+    """
+    加载模型文件并写入注册表
+    :param model_type: 模型类型
+    :param force: 是否忽略已加载的模型强制重新加载
+    :return:
+        Tuple[Any, float]: 模型对象及模型文件修改时间
+    """
+    with _load_lock:
+        entry = _models.get(model_type)
+        if entry is not None and not force:
+            return entry
+        path = get_model_file(model_type)
+        # 先读取修改时间再加载，若加载期间文件再次变化，下一轮检查会再次重新加载
+        mtime = os.path.getmtime(path)
+        if INFERENCE_BACKEND == 'numpy':
+            from server_code.prediction import numpy_lstm
+            model = numpy_lstm.load_model(path)
+        else:
+            from tensorflow.keras.models import load_model
+            # 仅用于推理，无需恢复优化器等训练配置
+            model = load_model(path, compile=False)
+        entry = (model, mtime)
+        _models[model_type] = entry
+        return entry
+
+
+def __reload_periodically():
+    """
+    每隔MODEL_RELOAD_INTERVAL秒检查一次模型文件
+
+    :return:
+        None: 每隔MODEL_RELOAD_INTERVAL秒检查一次模型文件
+    """
+    while True:
+        time.sleep(MODEL_RELOAD_INTERVAL)
+        reload_if_changed()
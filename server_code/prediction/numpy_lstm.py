@@ -0,0 +1,180 @@
+"""
+    定义纯NumPy实现的LSTM推理后端
+    从Keras保存的h5模型文件中一次性读取权重，按train_lstm中构建的
+    LSTM -> (Dropout) -> RepeatVector -> LSTM -> TimeDistributed(Dense) 结构进行向量化前向计算，支持批量输入
+"""
+import json
+import h5py
+import numpy as np
+from typing import Callable, Dict, List
+
+
+def _hard_sigmoid_keras2(x: np.ndarray) -> np.ndarray:
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+
+def _hard_sigmoid_keras3(x: np.ndarray) -> np.ndarray:
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid_keras2,
+}  # type: Dict[str, Callable[[np.ndarray], np.ndarray]]
+
+
+class _LSTMLayer:
+    """
+    LSTM层，门的排列顺序与Keras一致：输入门、遗忘门、候选记忆、输出门
+    """
+
+    def __init__(self, config: dict, weights: List[np.ndarray], activations: Dict[str, Callable]):
+        if config.get('go_backwards') or config.get('stateful'):
+            raise ValueError(f"不支持的LSTM配置：{config.get('name')}")
+        self.units = config['units']
+        self.activation = activations[config.get('activation', 'tanh')]
+        self.recurrent_activation = activations[config.get('recurrent_activation', 'sigmoid')]
+        self.return_sequences = config.get('return_sequences', False)
+        self.kernel, self.recurrent_kernel = weights[0], weights[1]
+        self.bias = weights[2] if config.get('use_bias', True) else np.zeros(4 * self.units, dtype=np.float32)
+        self.repeated_input = False
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        n_samples, time_step = x.shape[0], x.shape[1]
+        units = self.units
+        if self.repeated_input:
+            # 上一层为RepeatVector时每个时间步的输入相同，输入投影只需计算一次
+            x_proj = np.broadcast_to((x[:, 0] @ self.kernel + self.bias)[:, None],
+                                     (n_samples, time_step, 4 * units))
+        else:
+            x_proj = x @ self.kernel + self.bias
+        h = np.zeros((n_samples, units), dtype=np.float32)
+        c = np.zeros((n_samples, units), dtype=np.float32)
+        outputs = np.empty((n_samples, time_step, units), dtype=np.float32) if self.return_sequences else None
+        for t in range(time_step):
+            z = x_proj[:, t] + h @ self.recurrent_kernel
+            i = self.recurrent_activation(z[:, :units])
+            f = self.recurrent_activation(z[:, units:2 * units])
+            c = f * c + i * self.activation(z[:, 2 * units:3 * units])
+            o = self.recurrent_activation(z[:, 3 * units:])
+            h = o * self.activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+
+class _DenseLayer:
+    """
+    全连接层，作用于输入的最后一个维度，因此同时适用于TimeDistributed(Dense)
+    """
+
+    def __init__(self, config: dict, weights: List[np.ndarray], activations: Dict[str, Callable]):
+        self.activation = activations[config.get('activation', 'linear')]
+        self.kernel = weights[0]
+        self.bias = weights[1] if config.get('use_bias', True) else None
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        y = x @ self.kernel
+        if self.bias is not None:
+            y = y + self.bias
+        return self.activation(y)
+
+
+class _RepeatVectorLayer:
+    """
+    将(n_samples, units)重复为(n_samples, n, units)，以广播视图实现而不复制数据
+    """
+
+    def __init__(self, config: dict):
+        self.n = config['n']
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        return np.broadcast_to(x[:, None, :], (x.shape[0], self.n, x.shape[1]))
+
+
+class NumpyLSTMModel:
+    """
+    与Keras模型predict接口一致的NumPy推理模型
+    """
+
+    def __init__(self, layers: list):
+        self.layers = layers
+
+    def predict(self, x: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """
+        对批量输入进行前向计算
+        :param x: 形如(n_samples, time_step, n_features)的输入序列
+        :param verbose: 为与Keras接口保持一致而保留，不做处理
+        :return:
+            np.ndarray: 模型输出
+        """
+        output = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            output = layer(output)
+        return np.ascontiguousarray(output)
+
+
+def load_model(path: str) -> NumpyLSTMModel:
+    """
+    读取Keras保存的h5模型文件，构建NumPy推理模型
+    :param path: 模型文件路径
+    :return:
+        NumpyLSTMModel: NumPy推理模型
+    """
+    with h5py.File(path, 'r') as file:
+        model_config = json.loads(_to_str(file.attrs['model_config']))
+        keras_version = _to_str(file.attrs.get('keras_version', '2'))
+        weights_group = file['model_weights'] if 'model_weights' in file else file
+        layer_weights = {}
+        for layer_name in weights_group.attrs['layer_names']:
+            layer_group = weights_group[_to_str(layer_name)]
+            layer_weights[_to_str(layer_name)] = [np.asarray(layer_group[_to_str(weight_name)], dtype=np.float32)
+                                                  for weight_name in layer_group.attrs['weight_names']]
+    activations = dict(_ACTIVATIONS)
+    if keras_version.startswith('3'):
+        activations['hard_sigmoid'] = _hard_sigmoid_keras3
+    return NumpyLSTMModel(_build_layers(model_config, layer_weights, activations))
+
+
+def _build_layers(model_config: dict, layer_weights: Dict[str, List[np.ndarray]],
+                  activations: Dict[str, Callable]) -> list:
+    """
+    根据模型结构配置与权重构建各层的前向计算对象
+    :param model_config: h5文件中的model_config
+    :param layer_weights: 层名称与权重列表的对应关系
+    :param activations: 激活函数名称与实现的对应关系
+    :return:
+        list: 按顺序排列的前向计算对象
+    """
+    config = model_config['config']
+    layer_configs = config['layers'] if isinstance(config, dict) else config
+    layers = []
+    for layer_config in layer_configs:
+        class_name, config = layer_config['class_name'], layer_config['config']
+        if class_name in ('InputLayer', 'Dropout'):
+            # Dropout在推理时不生效
+            continue
+        if class_name == 'LSTM':
+            layer = _LSTMLayer(config, layer_weights[config['name']], activations)
+            layer.repeated_input = bool(layers) and isinstance(layers[-1], _RepeatVectorLayer)
+        elif class_name == 'RepeatVector':
+            layer = _RepeatVectorLayer(config)
+        elif class_name == 'Dense':
+            layer = _DenseLayer(config, layer_weights[config['name']], activations)
+        elif class_name == 'TimeDistributed' and config['layer']['class_name'] == 'Dense':
+            layer = _DenseLayer(config['layer']['config'], layer_weights[config['name']], activations)
+        else:
+            raise ValueError(f"NumPy推理后端不支持{class_name}层")
+        layers.append(layer)
+    return layers
+
+
+def _to_str(value) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
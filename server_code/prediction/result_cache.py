@@ -0,0 +1,101 @@
+"""
+    定义进程内的预测结果缓存，按字节数限制容量并以LRU策略淘汰
+    缓存键包含模型版本与数据集文件的修改时间及大小，模型替换或数据重新清洗后旧缓存自然失效
+"""
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from server_code.prediction import model_registry
+from server_code.utils import metrics
+from config import PREDICTION_CACHE_MAX_BYTES
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_bytes = 0
+_hits = 0
+_misses = 0
+metrics.register_cache('prediction', lambda: (_hits, _misses))
+
+
+def make_key(model_type: str, station: str, date: str, source_files: List[str]) -> Optional[Tuple]:
+    """
+    生成预测结果的缓存键
+    :param model_type: 模型类型
+    :param station: 气象站编号
+    :param date: 日期
+    :param source_files: 预测输入所依赖的数据集文件路径
+    :return:
+        Tuple or None: 缓存键，数据集文件为空或不存在时返回None
+    """
+    if not source_files:
+        return None
+    try:
+        file_versions = tuple((path, stat.st_mtime_ns, stat.st_size)
+                              for path, stat in ((path, os.stat(path)) for path in source_files))
+    except OSError:
+        return None
+    return model_type, station, date, model_registry.get_model_version(model_type), file_versions
+
+
+def get(key: Optional[Tuple]) -> Optional[np.ndarray]:
+    """
+    获取缓存的预测结果
+    :param key: 缓存键
+    :return:
+        np.ndarray or None: 预测结果，未命中时返回None
+    """
+    global _hits, _misses
+    if key is None:
+        return None
+    with _cache_lock:
+        value = _cache.get(key)
+        if value is None:
+            _misses += 1
+            return None
+        _cache.move_to_end(key)
+        _hits += 1
+        return value
+
+
+def put(key: Optional[Tuple], value: np.ndarray) -> None:
+    """
+    写入预测结果，超出容量时淘汰最久未使用的结果
+    :param key: 缓存键
+    :param value: 预测结果
+    :return:
+        None: 直到写入完成为止
+    """
+    global _cache_bytes
+    if key is None or value.nbytes > PREDICTION_CACHE_MAX_BYTES:
+        return
+    # 缓存中的结果为所有请求共享，禁止修改
+    value.setflags(write=False)
+    with _cache_lock:
+        old_value = _cache.pop(key, None)
+        if old_value is not None:
+            _cache_bytes -= old_value.nbytes
+        _cache[key] = value
+        _cache_bytes += value.nbytes
+        while _cache_bytes > PREDICTION_CACHE_MAX_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= evicted.nbytes
+
+
+def get_cache_stats() -> OrderedDict:
+    """
+    获取缓存命中统计
+    :return:
+        OrderedDict: 命中次数、未命中次数、命中率及占用情况
+    """
+    with _cache_lock:
+        total = _hits + _misses
+        return OrderedDict([
+            ('hits', _hits),
+            ('misses', _misses),
+            ('hit_ratio', round(_hits / total, 4) if total else 0),
+            ('entries', len(_cache)),
+            ('bytes', _cache_bytes),
+            ('max_bytes', PREDICTION_CACHE_MAX_BYTES)
+        ])
@@ -3,12 +3,13 @@
     by organwalk 2023-08-15
 """
 from server_code.analyze import meteo_data_analyze
+import numpy as np
 import repository
-from typing import List, Optional
+from typing import Optional
 
 
 def get_correlation_list(station: str, start_date: str, end_date: str, correlation: str)\
-        -> Optional[List[List[float]]]:
+        -> Optional[np.ndarray]:
     """
     获取计算后的协相关矩阵
     :param station: 气象站编号
@@ -16,11 +17,12 @@ def get_correlation_list(station: str, start_date: str, end_date: str, correlati
     :param end_date: 结束日期
     :param correlation: 需要进行相关系数矩阵计算的气象要素
     :return:
-        [List[List[float]]] or None: 返回计算结果二维数组，如果计算失败则返回None
+        np.ndarray or None: 返回计算结果二维数组，如果计算失败则返回None
 
     by organwalk 2023-08-20
     """
-    merged_data = repository.get_merged_csv_data(station, start_date, end_date)
-    if merged_data is None:
+    # 由每日充分统计量合并计算，计算量只与天数有关，不再合并分钟级原始数据
+    merged_stats = repository.get_merged_stats(station, start_date, end_date)
+    if merged_stats is None:
         return None
-    return meteo_data_analyze.calculate_correlation_matrix(correlation, merged_data)
+    return meteo_data_analyze.calculate_correlation_matrix_by_stats(correlation, merged_stats)
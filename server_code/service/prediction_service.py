@@ -2,19 +2,22 @@
     定义模型预测业务
     by organwalk 2023-08-20
 """
-from typing import List
+import numpy as np
+from typing import List, Optional
+from collections import OrderedDict
 from server_code.prediction import model_lstm
+from server_code.entity import res_entity
 
 
 def predict_by_model(station: str, start_date: str, model_type: str) \
-        -> List[List[int]]:
+        -> np.ndarray:
     """
     根据model_type使用指定的模型进行预测
     :param station: 气象站编号
     :param start_date: 日期
     :param model_type: 模型类型
     :return:
-        List[List[int]]: 返回值为二维数组的预测结果
+        np.ndarray: 返回值为二维数组的预测结果
 
     by organwalk 2023-08-20
     """
@@ -22,3 +25,31 @@ def predict_by_model(station: str, start_date: str, model_type: str) \
         return model_lstm.get_short_term_predict(station, start_date)
     elif model_type == 'LONGTERM_LSTM':
         return model_lstm.get_long_term_predict(station, start_date)
+
+
+def predict_batch_by_model(items: List[dict], item_errors: List[Optional[str]]) -> List[OrderedDict]:
+    """
+    批量预测，同一模型类型的预测项合并为一次推理，单个预测项的错误不影响其他预测项
+    :param items: 预测项列表，每一项包含station、start_date、model_type
+    :param item_errors: 与items一一对应的校验错误消息，校验通过的预测项为None
+    :return:
+        List[OrderedDict]: 与items一一对应的预测结果
+    """
+    batch_predict_dict = {
+        'SHORTTERM_LSTM': model_lstm.get_short_term_predict_batch,
+        'LONGTERM_LSTM': model_lstm.get_long_term_predict_batch
+    }
+    results = [None] * len(items)
+    for model_type, batch_predict in batch_predict_dict.items():
+        indexes = [i for i, (item, error) in enumerate(zip(items, item_errors))
+                   if error is None and item['model_type'] == model_type]
+        if not indexes:
+            continue
+        predict_results = batch_predict([(items[i]['station'], items[i]['start_date']) for i in indexes])
+        for i, predict_result in zip(indexes, predict_results):
+            results[i] = predict_result
+    return [res_entity.set_batch_prediction_item(item.get('station'), item.get('start_date'), item.get('model_type'),
+                                                 predict_result,
+                                                 error if error is not None
+                                                 else ('读取该日期数据时发生错误' if predict_result is None else None))
+            for item, error, predict_result in zip(items, item_errors, results)]
@@ -6,7 +6,7 @@ import re
 import repository
 from config import SHORT_TERM_MODEL_LIST, LONG_TERM_MODEL_LIST
 from datetime import datetime, timedelta
-from typing import Union, Dict
+from typing import Union, Dict, Optional, Set
 
 
 def validate_station(station: str) -> Union[str, Dict[str, str]]:
@@ -21,18 +21,21 @@ def validate_station(station: str) -> Union[str, Dict[str, str]]:
     return station if isinstance(station, str) else _get_error_msg("station字段需要字符串类型的气象站编号")
 
 
-def validate_date(station: str, date: str) -> Union[str, Dict[str, str]]:
+def validate_date(station: str, date: str, available_dates: Optional[Set[str]] = None) -> Union[str, Dict[str, str]]:
     """
     校验起始日期和截止日期的有效性
     :param station: 气象站编号
     :param date: 日期
+    :param available_dates: 已查询得到的该气象站存在记录的日期集合，为None时单独查询该日期
     :return:
         str or dict: date的值，如果校验不通过则返回错误消息
 
     by organwalk 2023-08-15
     """
-    if isinstance(date, str) and re.match(r"^\d{4}-\d{2}-\d{2}$", date):
-        if repository.validate_station_date(station, date) > 0:
+    if validate_date_format(date):
+        exists = date in available_dates if available_dates is not None \
+            else repository.validate_station_date(station, date) > 0
+        if exists:
             return date
         else:
             return _get_error_msg(f"值为{date}的date相关字段，其日期下不存在有效数据，请重新指定")
@@ -40,6 +43,16 @@ def validate_date(station: str, date: str) -> Union[str, Dict[str, str]]:
         return _get_error_msg("date相关字段需要YYYY-MM-DD格式字符串")
 
 
+def validate_date_format(date: str) -> bool:
+    """
+    校验日期是否为YYYY-MM-DD格式字符串
+    :param date: 日期
+    :return:
+        bool: 格式正确时返回True，否则False
+    """
+    return isinstance(date, str) and re.match(r"^\d{4}-\d{2}-\d{2}$", date) is not None
+
+
 def validate_which_or_correlation(elements: str) -> Union[str, Dict[str, str]]:
     """
     校验气象要素的正确性
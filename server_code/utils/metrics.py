@@ -0,0 +1,205 @@
+"""
+    定义服务运行指标：各接口的请求数与延迟直方图、预测及分析各阶段的耗时直方图、缓存命中率及数据清洗逐日耗时，
+    由render输出Prometheus文本格式。每次记录仅为一次有序查找与一次加锁累加，不依赖prometheus_client；
+    以gunicorn多进程运行时每个worker进程各自统计，采集端按实例分别抓取
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+REQUEST_DURATION = 'meteo_request_duration_seconds'
+STAGE_DURATION = 'meteo_stage_duration_seconds'
+ETL_DAY_DURATION = 'meteo_etl_day_duration_seconds'
+ETL_DAYS = 'meteo_etl_days_total'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# 指标名 -> (指标类型, 说明)
+_descriptions = {
+    REQUEST_DURATION: ('histogram', '各接口的请求处理耗时'),
+    STAGE_DURATION: ('histogram', '各处理阶段的耗时：mysql_validation、csv_read、aggregate_read、resample、scaler_fit、'
+                                  'model_predict及各响应格式的编码'),
+    ETL_DAY_DURATION: ('histogram', '数据清洗中每日数据的写入耗时'),
+    ETL_DAYS: ('counter', '按处理状态统计的数据清洗日数'),
+}  # type: Dict[str, Tuple[str, str]]
+
+
+class Histogram:
+    """
+    累积直方图，桶上界升序排列，另记录观测值的总和与个数
+    """
+    __slots__ = ('buckets', 'counts', 'total', 'count', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        获取各桶的累积计数、观测值总和与个数
+        """
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+_lock = threading.Lock()
+_histograms = {}  # type: Dict[Tuple[str, Labels], Histogram]
+_counters = {}  # type: Dict[Tuple[str, Labels], float]
+# 缓存名称 -> 返回(命中数, 未命中数)的方法
+_caches = {}  # type: Dict[str, Callable[[], Tuple[int, int]]]
+
+
+def observe(name: str, value: float, labels: Labels = ()) -> None:
+    """
+    向直方图记录一个观测值，首次记录时创建该标签组合的直方图
+    :param name: 指标名
+    :param value: 观测值（秒）
+    :param labels: (标签名, 标签值)元组
+    :return:
+        None: 直到记录完成为止
+    """
+    histogram = _histograms.get((name, labels))
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault((name, labels), Histogram())
+    histogram.observe(value)
+
+
+def inc(name: str, labels: Labels = (), amount: float = 1) -> None:
+    """
+    累加计数器
+    :param name: 指标名
+    :param labels: (标签名, 标签值)元组
+    :param amount: 累加值
+    :return:
+        None: 直到累加完成为止
+    """
+    with _lock:
+        _counters[(name, labels)] = _counters.get((name, labels), 0) + amount
+
+
+def observe_request(endpoint: str, method: str, seconds: float) -> None:
+    """
+    记录一次请求的处理耗时
+    :param endpoint: 接口路径模板，如/anapredict/cleaned/job/<job_id>，未匹配任何接口时为unmatched
+    :param method: 请求方法
+    :param seconds: 处理耗时（秒）
+    :return:
+        None: 直到记录完成为止
+    """
+    observe(REQUEST_DURATION, seconds, (('endpoint', endpoint), ('method', method)))
+
+
+class _StageTimer:
+    __slots__ = ('_labels', '_start_time')
+
+    def __init__(self, name: str):
+        self._labels = (('stage', name),)
+        self._start_time = 0.0
+
+    def __enter__(self) -> '_StageTimer':
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        observe(STAGE_DURATION, time.perf_counter() - self._start_time, self._labels)
+
+
+def stage(name: str) -> _StageTimer:
+    """
+    记录一个处理阶段的耗时，以 with metrics.stage('csv_read'): 的方式使用，异常退出时同样记录
+    :param name: 阶段名称
+    :return:
+        _StageTimer: 上下文管理器
+    """
+    return _StageTimer(name)
+
+
+def register_cache(name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    """
+    注册缓存，输出指标时读取其命中数与未命中数
+    :param name: 缓存名称
+    :param stats: 返回(命中数, 未命中数)的方法
+    :return:
+        None: 直到注册完成为止
+    """
+    _caches[name] = stats
+
+
+def render() -> str:
+    """
+    以Prometheus文本格式输出全部指标
+    :return:
+        str: 指标文本
+    """
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+    lines = []
+    described = set()
+    for (name, labels), histogram in histograms:
+        _describe(lines, described, name)
+        cumulative, total, count = histogram.snapshot()
+        for bound, value in zip(histogram.buckets + (float('inf'),), cumulative):
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_bound(bound)),))} {value}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    for (name, labels), value in counters:
+        _describe(lines, described, name)
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    cache_stats = [(name, stats()) for name, stats in sorted(_caches.items())]
+    for name, metric_type, help_text, value_of in (
+            ('meteo_cache_hits_total', 'counter', '缓存命中数', lambda hits, misses: hits),
+            ('meteo_cache_misses_total', 'counter', '缓存未命中数', lambda hits, misses: misses),
+            ('meteo_cache_hit_ratio', 'gauge', '缓存命中率',
+             lambda hits, misses: round(hits / (hits + misses), 4) if hits + misses else 0)):
+        if cache_stats:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+        for cache, (hits, misses) in cache_stats:
+            lines.append(f"{name}{_format_labels((('cache', cache),))} {_format_value(value_of(hits, misses))}")
+    return '\n'.join(lines) + '\n'
+
+
+def _describe(lines: List[str], described: set, name: str) -> None:
+    if name in described:
+        return
+    described.add(name)
+    metric_type, help_text = _descriptions.get(name, ('untyped', name))
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
@@ -0,0 +1,161 @@
+"""
+    定义按请求开启的性能剖析：config.py中PROFILE_ENABLED为True时，install将各接口的处理函数替换为带剖析的版本，
+    请求头X-Profile存在或按PROFILE_SAMPLE_RATE随机抽中时剖析该请求，否则直接调用原处理函数；PROFILE_ENABLED为False时不安装，不产生任何开销
+    剖析结果按接口与请求参数命名写入PROFILE_PATH，文件名通过X-Profile-File响应头返回，另写入同名.json记录接口、参数与耗时：
+    pstats：cProfile的统计结果，可通过 python -m pstats 或snakeviz查看；
+    collapsed：每隔PROFILE_SAMPLE_INTERVAL_MS毫秒采样处理线程的调用栈，输出折叠栈格式，可直接由flamegraph.pl或speedscope生成火焰图
+    X-Profile的值为pstats或collapsed时使用该格式，否则使用PROFILE_FORMAT
+"""
+import cProfile
+import functools
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Optional
+from flask import Flask, Response, request
+from config import PROFILE_PATH, PROFILE_SAMPLE_RATE, PROFILE_FORMAT, PROFILE_MAX_FILES, PROFILE_SAMPLE_INTERVAL_MS
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_FILE_HEADER = 'X-Profile-File'
+PSTATS = 'pstats'
+COLLAPSED = 'collapsed'
+# 文件名中使用的请求参数，按顺序拼接
+_TAG_FIELDS = ('station', 'start_date', 'end_date', 'model_type', 'correlation')
+_UNSAFE_CHARS = re.compile(r'[^0-9A-Za-z_.-]+')
+_write_lock = threading.Lock()
+_sequence = itertools.count()
+
+
+class _StackSampler:
+    """
+    在后台线程中周期性采样目标线程的调用栈，仅记录剖析入口以内的栈帧，结果为 折叠栈 -> 采样次数
+    """
+
+    def __init__(self, thread_id: int, root_frame: Any, interval: float):
+        self.stacks = Counter()  # type: Counter
+        self._thread_id = thread_id
+        self._root_frame = root_frame
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> '_StackSampler':
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            names = []
+            root_code = None
+            while frame is not None and frame is not self._root_frame:
+                root_code = frame.f_code
+                names.append(f"{root_code.co_name} ({os.path.basename(root_code.co_filename)}:"
+                             f"{root_code.co_firstlineno})")
+                frame = frame.f_back
+            # 不记录处理结束后等待采样线程退出的栈
+            if names and root_code is not _StackSampler.__exit__.__code__:
+                self.stacks[';'.join(reversed(names))] += 1
+
+
+def install(app: Flask) -> None:
+    """
+    将应用中各接口的处理函数替换为带剖析的版本，需在全部接口注册后调用
+    :param app: Flask应用
+    :return:
+        None: 直到替换完成为止
+    """
+    for endpoint, view_func in list(app.view_functions.items()):
+        if endpoint != 'static':
+            app.view_functions[endpoint] = _wrap(view_func)
+
+
+def _wrap(view_func: Callable) -> Callable:
+    @functools.wraps(view_func)
+    def profiled_view(*args, **kwargs):
+        profile_format = _get_profile_format()
+        if profile_format is None:
+            return view_func(*args, **kwargs)
+        start_time = time.perf_counter()
+        if profile_format == PSTATS:
+            profile = cProfile.Profile()
+            response = profile.runcall(view_func, *args, **kwargs)
+            content = profile
+        else:
+            with _StackSampler(threading.get_ident(), sys._getframe(), PROFILE_SAMPLE_INTERVAL_MS / 1000) as sampler:
+                response = view_func(*args, **kwargs)
+            content = sampler.stacks
+        cost = time.perf_counter() - start_time
+        file_name = _save(profile_format, content, cost, kwargs)
+        if isinstance(response, Response):
+            response.headers[PROFILE_FILE_HEADER] = file_name
+        return response
+
+    return profiled_view
+
+
+def _get_profile_format() -> Optional[str]:
+    """
+    获取当前请求的剖析格式，不剖析时返回None
+    """
+    header = request.headers.get(PROFILE_HEADER)
+    if header is None and not (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+        return None
+    return header.lower() if header and header.lower() in (PSTATS, COLLAPSED) else PROFILE_FORMAT
+
+
+def _save(profile_format: str, content: Any, cost: float, view_args: dict) -> str:
+    """
+    写入剖析结果及其说明，超过PROFILE_MAX_FILES个时删除最早的结果
+    :return:
+        str: 剖析结果的文件名
+    """
+    params = OrderedDict(view_args)
+    user_req_json = request.get_json(silent=True)
+    if isinstance(user_req_json, dict):
+        params.update(user_req_json)
+    tags = [str(params[field]) for field in _TAG_FIELDS if isinstance(params.get(field), (str, int))]
+    endpoint = request.url_rule.rule if request.url_rule is not None else request.path
+    # 文件名使用实际请求路径，包含路径中的参数；加上进程号与序号避免同一秒内的请求互相覆盖
+    base_name = _UNSAFE_CHARS.sub('_', '_'.join([time.strftime('%Y%m%d%H%M%S'), request.path.strip('/')] + tags))
+    base_name = f"{base_name[:180]}_{os.getpid()}_{next(_sequence)}"
+    file_name = base_name + ('.prof' if profile_format == PSTATS else '.folded')
+    with _write_lock:
+        os.makedirs(PROFILE_PATH, exist_ok=True)
+        path = os.path.join(PROFILE_PATH, file_name)
+        if profile_format == PSTATS:
+            content.dump_stats(path)
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.writelines(f"{stack} {count}\n" for stack, count in content.most_common())
+        with open(os.path.join(PROFILE_PATH, base_name + '.json'), 'w', encoding='utf-8') as file:
+            json.dump(OrderedDict([('file', file_name), ('endpoint', endpoint), ('method', request.method),
+                                   ('params', params), ('format', profile_format), ('cost_ms', round(cost * 1000, 3)),
+                                   ('time', time.strftime('%Y-%m-%d %H:%M:%S'))]),
+                      file, ensure_ascii=False, default=str)
+        _prune()
+    return file_name
+
+
+def _prune() -> None:
+    """
+    仅保留最近PROFILE_MAX_FILES个剖析结果，需在持有_write_lock时调用
+    """
+    profiles = sorted((entry for entry in os.scandir(PROFILE_PATH) if entry.name.endswith(('.prof', '.folded'))),
+                      key=lambda entry: entry.stat().st_mtime)
+    for entry in profiles[:max(0, len(profiles) - PROFILE_MAX_FILES)]:
+        for path in (entry.path, os.path.splitext(entry.path)[0] + '.json'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
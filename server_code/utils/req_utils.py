@@ -3,8 +3,10 @@
     by organwalk 2023-08-15
 """
 from server_code.utils import fields_utils
-from typing import Optional
+from server_code.entity import req_entity as server_req
+from typing import Optional, List, Set, Tuple
 from datetime import datetime, timedelta
+from config import LONG_TERM_MODEL_LIST, BATCH_PREDICTION_MAX_ITEMS
 import repository as repository
 
 
@@ -19,21 +21,44 @@ def validate_json_user_req(api: str, user_req_json: dict, server_req_fields: lis
 
     by organwalk 2023-08-15
     """
-    # 0.检验调用方请求是否存在JSON格式数据
+    # 0.检验调用方请求是否存在JSON格式数据，以及JSON格式数据是否存在空缺值
+    error_msg = _validate_json_presence(user_req_json, server_req_fields)
+    if error_msg is not None:
+        return error_msg
+    # 1.检验对应接口的JSON格式数据其值类型与格式是否正确
+    return _format_value_error(_validate_json_value(user_req_json, api))
+
+
+async def validate_json_user_req_async(api: str, user_req_json: dict, server_req_fields: list) -> Optional[str]:
+    """
+    validate_json_user_req的异步版本，校验所需的日期记录通过异步MySQL连接池一次查询，其余校验与同步版本一致
+    :param api: API 接口路径
+    :param user_req_json: 调用方请求中的 JSON 数据
+    :param server_req_fields: 服务器端要求的 JSON 数据字段
+    :return:
+        str or None: 错误消息，如果校验通过则返回 None
+    """
+    error_msg = _validate_json_presence(user_req_json, server_req_fields)
+    if error_msg is not None:
+        return error_msg
+    lookup = _get_lookup_dates(user_req_json, api)
+    available_dates = await get_available_dates_async(*lookup) if lookup is not None else None
+    return _format_value_error(_validate_json_value(user_req_json, api, available_dates))
+
+
+def _validate_json_presence(user_req_json: dict, server_req_fields: list) -> Optional[str]:
     if not user_req_json:
         return '调用方未能正确传递JSON格式数据'
-    # 1.检验JSON格式数据是否存在空缺值
     missing_check = _validate_json_missing(user_req_json, server_req_fields)
     if missing_check:
         return f'调用方传递JSON格式数据存在空缺值，提示消息如下：{missing_check}'
-    # 2.检验对应接口的JSON格式数据其值类型与格式是否正确
-    error_msg = _validate_json_value(user_req_json, api)
-    if error_msg is not None:
-        return f'调用方传递JSON格式数据存在错误，提示消息如下：{error_msg}'
-
     return None
 
 
+def _format_value_error(error_msg: Optional[str]) -> Optional[str]:
+    return f'调用方传递JSON格式数据存在错误，提示消息如下：{error_msg}' if error_msg is not None else None
+
+
 def _validate_json_missing(user_req_json: dict, server_req_fields: list) -> Optional[str]:
     """
     校验调用方请求中的 JSON 数据是否含有空缺值
@@ -51,11 +76,12 @@ def _validate_json_missing(user_req_json: dict, server_req_fields: list) -> Opti
     return None
 
 
-def _validate_json_value(user_req_json: dict, api: str) -> Optional[str]:
+def _validate_json_value(user_req_json: dict, api: str, available_dates: Optional[Set[str]] = None) -> Optional[str]:
     """
     校验调用方JSON数据的类型与格式是否正确
     :param user_req_json: (dict)调用方传递的JSON数据
     :param api(str): API接口路径
+    :param available_dates: 已查询的存在记录的日期集合，为None时由各接口的校验方法查询
     :return:
         str or None: 错误消息，如果校验通过则返回None
 
@@ -64,11 +90,13 @@ def _validate_json_value(user_req_json: dict, api: str) -> Optional[str]:
     if api == '/anapredict/model/report':
         return _validate_api_report(user_req_json)
     if api == '/anapredict/cleaned':
-        return _validate_api_cleaned(user_req_json)
+        return _validate_api_cleaned(user_req_json, available_dates)
     if api == '/anapredict/analyze/correlation':
-        return _validate_api_correlation(user_req_json)
+        return _validate_api_correlation(user_req_json, available_dates)
     if api == '/anapredict/model/prediction':
-        return _validate_api_prediction(user_req_json)
+        return _validate_api_prediction(user_req_json, available_dates)
+    if api == '/anapredict/model/prediction/batch':
+        return _validate_api_prediction_batch(user_req_json)
     else:
         return None
 
@@ -88,26 +116,33 @@ def _validate_api_report(user_req_json: dict) -> Optional[str]:
     return '；'.join(set(msg_list)) if msg_list else None
 
 
-def _validate_api_cleaned(user_req_json: dict) -> Optional[str]:
+def _validate_api_cleaned(user_req_json: dict, available_dates: Optional[Set[str]] = None) -> Optional[str]:
     """
     校验/anapredict/cleaned接口的json数据
     :param user_req_json: 调用方传递的JSON数据：
         station: (str) 气象站编号
         start_date: (str) 起始日期
         end_date: (str) 结束日期
+    :param available_dates: 已查询的存在记录的日期集合，为None时在此查询
     :return:
         str or None: 错误消息，如果校验通过则返回None
 
     by organwalk 2023-10-14
     """
+    if available_dates is None:
+        available_dates = get_available_dates(*_get_lookup_dates(user_req_json, '/anapredict/cleaned'))
     error_msg_list = [fields_utils.validate_station(user_req_json['station']),
-                      fields_utils.validate_date(user_req_json['station'], user_req_json['start_date']),
-                      fields_utils.validate_date(user_req_json['station'], user_req_json['end_date'])]
+                      fields_utils.validate_date(user_req_json['station'], user_req_json['start_date'],
+                                                 available_dates),
+                      fields_utils.validate_date(user_req_json['station'], user_req_json['end_date'], available_dates)]
     msg_list = [msg['msg'] for msg in error_msg_list if isinstance(msg, dict)]
+    if all(fields_utils.validate_date_format(user_req_json[field]) for field in ('start_date', 'end_date')) \
+            and user_req_json['start_date'] > user_req_json['end_date']:
+        msg_list.append("start_date不能晚于end_date")
     return '；'.join(set(msg_list)) if msg_list else None
 
 
-def _validate_api_correlation(user_req_json: dict) -> Optional[str]:
+def _validate_api_correlation(user_req_json: dict, available_dates: Optional[Set[str]] = None) -> Optional[str]:
     """
     校验/anapredict/analyze/correlation接口的JSON数据
     :param:
@@ -116,20 +151,24 @@ def _validate_api_correlation(user_req_json: dict) -> Optional[str]:
             start_date: (str) 起始日期
             end_date: (str) 结束日期
             correlation: (str) 需要计算相关系数矩阵的气象要素
+        available_dates: 已查询的存在记录的日期集合，为None时在此查询
     :return:
         str or None: 错误消息，如果校验通过则返回None
 
     by organwalk 2023-08-15
     """
+    if available_dates is None:
+        available_dates = get_available_dates(*_get_lookup_dates(user_req_json, '/anapredict/analyze/correlation'))
     error_msg_list = [fields_utils.validate_station(user_req_json['station']),
-                      fields_utils.validate_date(user_req_json['station'], user_req_json['start_date']),
-                      fields_utils.validate_date(user_req_json['station'], user_req_json['end_date']),
+                      fields_utils.validate_date(user_req_json['station'], user_req_json['start_date'],
+                                                 available_dates),
+                      fields_utils.validate_date(user_req_json['station'], user_req_json['end_date'], available_dates),
                       fields_utils.validate_which_or_correlation(user_req_json['correlation'])]
     msg_list = [msg['msg'] for msg in error_msg_list if isinstance(msg, dict)]
     return '；'.join(set(msg_list)) if msg_list else None
 
 
-def _validate_api_prediction(user_req_json: dict) -> Optional[str]:
+def _validate_api_prediction(user_req_json: dict, available_dates: Optional[Set[str]] = None) -> Optional[str]:
     """
     校验/anapredict/model/prediction接口的JSON数据
     :param:
@@ -138,22 +177,169 @@ def _validate_api_prediction(user_req_json: dict) -> Optional[str]:
             start_date: (str) 起始日期
             end_date: (str) 结束日期
             model_type: (str) 模型类型
+        available_dates: 已查询的存在记录的日期集合，为None时在此查询
     :return:
         str or None: 错误消息，如果校验通过则返回None
 
     by organwalk 2023-08-15
     """
+    # 长期模型所需的连续七日与起始日期在同一次查询中校验
+    required_dates = _get_required_dates(user_req_json['start_date'], user_req_json['model_type']) or []
+    if available_dates is None:
+        available_dates = get_available_dates(user_req_json['station'], required_dates)
     error_msg_list = [fields_utils.validate_station(user_req_json['station']),
-                      fields_utils.validate_date(user_req_json['station'], user_req_json['start_date']),
+                      fields_utils.validate_date(user_req_json['station'], user_req_json['start_date'],
+                                                 available_dates),
                       fields_utils.validate_model_type(user_req_json['model_type'])]
     msg_list = [msg['msg'] for msg in error_msg_list if isinstance(msg, dict)]
     # error_msg_list的子元素错误消息为字典形式，若为str类型，则表示没有错误消息
-    if user_req_json.get("model_type") == "LONGTERM_LSTM":
-        date = (datetime.strptime(user_req_json.get("start_date"), '%Y-%m-%d')
-                + timedelta(days=-6)).strftime('%Y-%m-%d')
-        check = repository.validate_station_date_range(station=user_req_json.get('station'),
-                                                       start_date=date,
-                                                       end_date=user_req_json.get('start_date'))
-        if check < 7:
+    if user_req_json.get("model_type") == "LONGTERM_LSTM" and required_dates:
+        if not all(date in available_dates for date in required_dates):
             msg_list.append(f"该日期{user_req_json.get('start_date')}不可作为起始日期，原因：气象站缺失连续时间段内数据")
     return '；'.join(set(msg_list)) if msg_list else None
+
+
+def _validate_api_prediction_batch(user_req_json: dict) -> Optional[str]:
+    """
+    校验/anapredict/model/prediction/batch接口的JSON数据，仅校验整体结构，预测项由validate_prediction_items逐项校验
+    :param:
+        user_req_json: 调用方传递的JSON数据:
+            items: (list) 预测项列表，每一项包含station、start_date、model_type
+    :return:
+        str or None: 错误消息，如果校验通过则返回None
+    """
+    items = user_req_json['items']
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return "items字段需要由预测项对象组成的数组"
+    if len(items) > BATCH_PREDICTION_MAX_ITEMS:
+        return f"items字段最多包含{BATCH_PREDICTION_MAX_ITEMS}个预测项"
+    return None
+
+
+def validate_prediction_items(items: List[dict]) -> List[Optional[str]]:
+    """
+    逐项校验批量预测的预测项，所有预测项所需的日期仅通过一次查询进行校验
+    :param items: 预测项列表，每一项包含station、start_date、model_type
+    :return:
+        List[Optional[str]]: 与items一一对应的错误消息，校验通过的预测项为None
+    """
+    error_list, required_list = _check_prediction_items(items)
+    station_dates = _get_items_lookup(items, required_list)
+    existing = repository.get_station_date_set(station_dates) if station_dates else set()
+    return _apply_existing_dates(items, error_list, required_list, existing)
+
+
+async def validate_prediction_items_async(items: List[dict]) -> List[Optional[str]]:
+    """
+    validate_prediction_items的异步版本，所有预测项所需的日期通过异步MySQL连接池一次查询
+    :param items: 预测项列表，每一项包含station、start_date、model_type
+    :return:
+        List[Optional[str]]: 与items一一对应的错误消息，校验通过的预测项为None
+    """
+    error_list, required_list = _check_prediction_items(items)
+    station_dates = _get_items_lookup(items, required_list)
+    existing = await repository.get_station_date_set_async(station_dates) if station_dates else set()
+    return _apply_existing_dates(items, error_list, required_list, existing)
+
+
+def _check_prediction_items(items: List[dict]) -> Tuple[List[Optional[str]], List[List[str]]]:
+    """
+    校验各预测项字段的类型与格式，并计算每个预测项需要存在记录的日期
+    """
+    error_list, required_list = [], []
+    for item in items:
+        missing_check = _validate_json_missing(item, server_req.PREDICTION)
+        if missing_check:
+            error_list.append(missing_check)
+            required_list.append([])
+            continue
+        error_msg_list = [fields_utils.validate_station(item['station']),
+                          fields_utils.validate_model_type(item['model_type'])]
+        msg_list = [msg['msg'] for msg in error_msg_list if isinstance(msg, dict)]
+        required_dates = _get_required_dates(item['start_date'], item['model_type'])
+        if required_dates is None:
+            msg_list.append("date相关字段需要YYYY-MM-DD格式字符串")
+        error_list.append('；'.join(msg_list) if msg_list else None)
+        required_list.append(required_dates if not msg_list else [])
+    return error_list, required_list
+
+
+def _get_items_lookup(items: List[dict], required_list: List[List[str]]) -> List[Tuple[str, str]]:
+    """
+    获取一次查询所有预测项所需的(气象站编号, 日期)组合，无需查询时为空列表
+    """
+    return sorted({(item['station'], date) for item, dates in zip(items, required_list) for date in dates})
+
+
+def _apply_existing_dates(items: List[dict], error_list: List[Optional[str]], required_list: List[List[str]],
+                          existing: Set[Tuple[str, str]]) -> List[Optional[str]]:
+    """
+    校验每个预测项所需日期是否都存在记录
+    """
+    for i, (item, dates) in enumerate(zip(items, required_list)):
+        missing_dates = [date for date in dates if (item['station'], date) not in existing]
+        if not missing_dates:
+            continue
+        if item['model_type'] in LONG_TERM_MODEL_LIST:
+            error_list[i] = f"该日期{item['start_date']}不可作为起始日期，原因：气象站缺失连续时间段内数据"
+        else:
+            error_list[i] = f"值为{item['start_date']}的date相关字段，其日期下不存在有效数据，请重新指定"
+    return error_list
+
+
+def get_available_dates(station: str, dates: List[str]) -> Set[str]:
+    """
+    一次查询获取气象站在给定日期中存在记录的日期，格式不正确的日期不参与查询
+    :param station: 气象站编号
+    :param dates: 请求所需校验的全部日期
+    :return:
+        Set[str]: 存在记录的日期集合
+    """
+    dates = [date for date in dates if fields_utils.validate_date_format(date)]
+    if not isinstance(station, str) or not dates:
+        return set()
+    return repository.get_existing_dates(station, dates)
+
+
+async def get_available_dates_async(station: str, dates: List[str]) -> Set[str]:
+    """
+    get_available_dates的异步版本
+    :param station: 气象站编号
+    :param dates: 请求所需校验的全部日期
+    :return:
+        Set[str]: 存在记录的日期集合
+    """
+    dates = [date for date in dates if fields_utils.validate_date_format(date)]
+    if not isinstance(station, str) or not dates:
+        return set()
+    return await repository.get_existing_dates_async(station, dates)
+
+
+def _get_lookup_dates(user_req_json: dict, api: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    获取接口校验时需要查询记录的气象站与日期，无需查询时返回None
+    """
+    if api in ('/anapredict/cleaned', '/anapredict/analyze/correlation'):
+        return user_req_json['station'], [user_req_json['start_date'], user_req_json['end_date']]
+    if api == '/anapredict/model/prediction':
+        return user_req_json['station'], _get_required_dates(user_req_json['start_date'],
+                                                              user_req_json['model_type']) or []
+    return None
+
+
+def _get_required_dates(start_date: str, model_type: str) -> Optional[List[str]]:
+    """
+    获取预测项需要存在记录的日期，长期模型需要截止日期在内的连续七日
+    :param start_date: 日期
+    :param model_type: 模型类型
+    :return:
+        List[str] or None: 日期列表，日期格式不正确时返回None
+    """
+    if not fields_utils.validate_date_format(start_date):
+        return None
+    try:
+        date = datetime.strptime(start_date, '%Y-%m-%d')
+    except ValueError:
+        return None
+    days = 7 if model_type in LONG_TERM_MODEL_LIST else 1
+    return [(date + timedelta(days=-i)).strftime('%Y-%m-%d') for i in range(days - 1, -1, -1)]
@@ -0,0 +1,154 @@
+"""
+    定义响应体的编码器，按请求的Accept头选择编码格式：
+    application/json：默认格式，安装orjson时使用orjson编码，NumPy数组直接写出而不先转换为Python列表；
+    application/msgpack：安装msgpack时可用，NumPy数组编码为扩展类型1，内容为维数（uint8）、各维长度（uint32）及float32数据，均为小端序；
+    application/x-float32：仅编码data字段，内容为维数（uint32）、各维长度（uint32）及float32数据，均为小端序，
+    code与msg通过X-Result-Code、X-Result-Msg（URL编码）响应头返回；data无法转换为规则数值数组时仍使用JSON。
+    不在Flask请求上下文中时（如异步服务模式），使用set_accept_header为当前上下文设置的Accept头
+"""
+import json
+import struct
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+import numpy as np
+from flask import Response, has_request_context, request
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from server_code.utils import metrics
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+FLOAT32_MIMETYPE = 'application/x-float32'
+MSGPACK_NDARRAY_EXT = 1
+
+# 编码格式 -> 编码方法，方法返回编码后的响应，无法以该格式编码时返回None；顺序即客户端未指定偏好时的优先顺序
+_encoders = OrderedDict()  # type: OrderedDict
+# 编码格式 -> 记录编码耗时的阶段名称，如application/json对应json_encode
+_encode_stages = {}  # type: Dict[str, str]
+_accept_header = ContextVar('accept_header', default=None)  # type: ContextVar
+
+
+def register_encoder(mimetype: str, encoder: Callable[[OrderedDict], Optional[Response]]) -> None:
+    """
+    注册响应编码器
+    :param mimetype: 编码格式
+    :param encoder: 接收响应体、返回Response的方法，无法以该格式编码时返回None
+    :return:
+        None: 直到注册完成为止
+    """
+    _encoders[mimetype] = encoder
+    _encode_stages[mimetype] = mimetype.split('/')[-1].replace('x-', '') + '_encode'
+
+
+def get_mimetypes() -> List[str]:
+    """
+    获取已注册的编码格式
+    :return:
+        List[str]: 编码格式列表
+    """
+    return list(_encoders)
+
+
+def set_accept_header(accept_header: Optional[str]) -> None:
+    """
+    为当前上下文（异步服务模式下即当前请求的协程）设置Accept头
+    :param accept_header: 请求的Accept头，为None时使用JSON
+    :return:
+        None: 直到设置完成为止
+    """
+    _accept_header.set(accept_header)
+
+
+def to_response(payload: OrderedDict) -> Response:
+    """
+    按请求的Accept头编码响应体，没有Accept头或没有可用格式时使用JSON
+    :param payload: 包含code、msg及data（可选）的响应体
+    :return:
+        Response: 编码后的响应
+    """
+    if has_request_context():
+        accept = request.accept_mimetypes
+    else:
+        accept_header = _accept_header.get()
+        accept = parse_accept_header(accept_header, MIMEAccept) if accept_header else None
+    if accept is not None:
+        mimetype = accept.best_match(list(_encoders), default=JSON_MIMETYPE)
+        if mimetype != JSON_MIMETYPE:
+            with metrics.stage(_encode_stages[mimetype]):
+                response = _encoders[mimetype](payload)
+            if response is not None:
+                return response
+    with metrics.stage(_encode_stages[JSON_MIMETYPE]):
+        return _encoders[JSON_MIMETYPE](payload)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_json_stdlib(payload: OrderedDict) -> Response:
+    return Response(json.dumps(payload, default=_json_default), mimetype=JSON_MIMETYPE)
+
+
+def _encode_float32(payload: OrderedDict) -> Optional[Response]:
+    data = payload.get('data')
+    if data is None:
+        return None
+    try:
+        array = np.asarray(data, dtype='<f4')
+    except (TypeError, ValueError):
+        return None
+    header = struct.pack(f'<I{array.ndim}I', array.ndim, *array.shape)
+    response = Response(header + array.tobytes(), mimetype=FLOAT32_MIMETYPE)
+    response.headers['X-Result-Code'] = str(payload['code'])
+    response.headers['X-Result-Msg'] = quote(payload['msg'])
+    return response
+
+
+def _register_json() -> None:
+    try:
+        import orjson
+    except ImportError:
+        register_encoder(JSON_MIMETYPE, _encode_json_stdlib)
+        return
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def encode_json(payload: OrderedDict) -> Response:
+        try:
+            body = orjson.dumps(payload, default=_json_default, option=option)
+        except TypeError:
+            # 非C连续或非原生字节序的数组等orjson无法直接写出的值
+            return _encode_json_stdlib(payload)
+        return Response(body, mimetype=JSON_MIMETYPE)
+
+    register_encoder(JSON_MIMETYPE, encode_json)
+
+
+def _register_msgpack() -> None:
+    try:
+        import msgpack
+    except ImportError:
+        return
+
+    def default(value: Any) -> Any:
+        if isinstance(value, np.ndarray):
+            array = value.astype('<f4', copy=False)
+            header = struct.pack(f'<B{array.ndim}I', array.ndim, *array.shape)
+            return msgpack.ExtType(MSGPACK_NDARRAY_EXT, header + np.ascontiguousarray(array).tobytes())
+        return _json_default(value)
+
+    def encode_msgpack(payload: OrderedDict) -> Response:
+        return Response(msgpack.packb(payload, default=default, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+
+    register_encoder(MSGPACK_MIMETYPE, encode_msgpack)
+
+
+_register_json()
+_register_msgpack()
+register_encoder(FLOAT32_MIMETYPE, _encode_float32)
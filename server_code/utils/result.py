@@ -4,7 +4,7 @@
 """
 from collections import OrderedDict
 from flask import Response
-import json
+from server_code.utils.response_encoder import to_response
 
 _SUCCESS_CODE = 200
 _NOT_FOUND_CODE = 404
@@ -14,61 +14,46 @@ _FAIL_METHOD_CODE = 405
 
 
 def success(msg: str, data: any) -> Response:
-    return Response(
-        json.dumps(
-            OrderedDict([
-                ('code', _SUCCESS_CODE),
-                ('msg', msg),
-                ('data', data)
-            ])
-        ),
-        mimetype='application/json'
+    return to_response(
+        OrderedDict([
+            ('code', _SUCCESS_CODE),
+            ('msg', msg),
+            ('data', data)
+        ])
     )
 
 
 def not_found(msg: str) -> Response:
-    return Response(
-        json.dumps(
-            OrderedDict([
-                ('code', _NOT_FOUND_CODE),
-                ('msg', msg)
-            ])
-        ),
-        mimetype='application/json'
+    return to_response(
+        OrderedDict([
+            ('code', _NOT_FOUND_CODE),
+            ('msg', msg)
+        ])
     )
 
 
 def error(msg: str) -> Response:
-    return Response(
-        json.dumps(
-            OrderedDict([
-                ('code', _ERROR_CODE),
-                ('msg', msg)
-            ])
-        ),
-        mimetype='application/json'
+    return to_response(
+        OrderedDict([
+            ('code', _ERROR_CODE),
+            ('msg', msg)
+        ])
     )
 
 
 def fail_entity(msg: str) -> Response:
-    return Response(
-        json.dumps(
-            OrderedDict([
-                ('code', _FAIL_ENTITY_CODE),
-                ('msg', msg)
-            ])
-        ),
-        mimetype='application/json'
+    return to_response(
+        OrderedDict([
+            ('code', _FAIL_ENTITY_CODE),
+            ('msg', msg)
+        ])
     )
 
 
 def fail_method(msg: str) -> Response:
-    return Response(
-        json.dumps(
-            OrderedDict([
-                ('code', _FAIL_METHOD_CODE),
-                ('msg', msg)
-            ])
-        ),
-        mimetype='application/json'
+    return to_response(
+        OrderedDict([
+            ('code', _FAIL_METHOD_CODE),
+            ('msg', msg)
+        ])
     )
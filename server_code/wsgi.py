@@ -0,0 +1,48 @@
+"""
+    生产环境的WSGI入口，由gunicorn以预先fork多个worker进程的方式运行：
+    gunicorn -c server_code/gunicorn_config.py wsgi:app
+    主进程导入本模块时预加载模型、模型信息及气象站日期索引，fork后各worker以写时复制的方式共享这些只读数据
+"""
+import gc
+import repository
+from config import INFERENCE_BACKEND
+from server_code.prediction import model_registry
+from api_server import app  # noqa: F401
+
+
+def preload() -> None:
+    """
+    fork前在主进程中预加载只读数据，此时不开启任何后台线程
+    NumPy推理后端的模型仅由数组权重组成，可在fork前加载；TensorFlow运行时在fork后无法继续使用，由各worker自行加载
+    :return:
+        None: 直到预加载完成为止
+    """
+    if INFERENCE_BACKEND == 'numpy':
+        try:
+            model_registry.preload_models(watch=False)
+        except Exception as e:
+            print(f"模型预加载失败，将在首次预测时加载：{e}")
+    try:
+        repository.get_model_info()
+    except Exception as e:
+        print(f"模型信息预加载失败：{e}")
+    repository.init_station_date_index(resync=False)
+    # 将预加载的对象移出垃圾回收的跟踪范围，避免各worker的垃圾回收改写引用计数以外的对象头而复制内存页
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def init_worker() -> None:
+    """
+    fork后在每个worker进程中开启模型文件监听及气象站日期索引重新同步等后台线程
+    :return:
+        None: 直到后台线程开启为止
+    """
+    try:
+        model_registry.preload_models()
+    except Exception as e:
+        print(f"模型预加载失败，将在首次预测时加载：{e}")
+    repository.start_station_date_resync()
+
+
+preload()
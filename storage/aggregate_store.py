@@ -0,0 +1,201 @@
+"""
+    定义按气象站存放的聚合数据存储
+    ETL清洗完成后计算每一日24小时内每小时的平均值（24x8）、一日平均值（1x8）以及计算相关系数所需的充分统计量，
+    以定长记录写入aggregate.f8，index.json记录每个日期对应的记录序号，写入时持有气象站目录下write.lock的文件锁。
+    预测、训练与相关性分析时直接读取聚合结果，不再解析与重采样分钟级数据
+    由CSV数据集转换：python -m storage.aggregate_store
+"""
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import data_utils as dtools
+from typing import Dict, Optional, Tuple
+from data_utils import SufficientStats
+from config import AGGREGATE_STORE_PATH, FILE_PATH
+from storage.column_store import FEATURE_COLUMNS
+from storage.file_lock import FileLock
+
+_HOURS = 24
+_N_FEATURES = len(FEATURE_COLUMNS)
+_RECORD_DTYPE = np.dtype([
+    ('hour_valid', '<f8'),  # 每小时平均值是否完整（24行）
+    ('hour_avg', '<f8', (_HOURS, _N_FEATURES)),
+    ('day_avg', '<f8', (1, _N_FEATURES)),
+    ('count', '<f8'),
+    ('mean', '<f8', (_N_FEATURES,)),
+    ('m2', '<f8', (_N_FEATURES, _N_FEATURES)),
+    ('min', '<f8', (_N_FEATURES,)),
+    ('max', '<f8', (_N_FEATURES,)),
+])
+_RECORD_SIZE = _RECORD_DTYPE.itemsize
+_RECORD_FILE = 'aggregate.f8'
+_INDEX_FILE = 'index.json'
+_LOCK_FILE = 'write.lock'
+
+_write_lock = threading.Lock()
+_cache_lock = threading.Lock()
+# 气象站 -> (index.json修改时间, 日期索引, 记录的内存映射)
+_station_cache = {}  # type: Dict[str, Tuple[int, dict, np.ndarray]]
+
+
+def _get_station_path(station: str) -> str:
+    return f"{AGGREGATE_STORE_PATH}{station}/"
+
+
+def read_hour_avg(station: str, date: str) -> Optional[np.ndarray]:
+    """
+    读取一日24小时内每小时的平均值
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        np.ndarray or None: 形如(24, 8)的只读数组，不存在或不完整时返回None
+    """
+    record = _read_record(station, date)
+    return record['hour_avg'] if record is not None and record['hour_valid'] else None
+
+
+def read_day_avg(station: str, date: str) -> Optional[np.ndarray]:
+    """
+    读取一日的平均值
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        np.ndarray or None: 形如(1, 8)的只读数组，不存在时返回None
+    """
+    record = _read_record(station, date)
+    return record['day_avg'] if record is not None else None
+
+
+def read_stats(station: str, date: str) -> Optional[SufficientStats]:
+    """
+    读取一日八个特征的充分统计量
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        SufficientStats or None: 充分统计量，不存在时返回None
+    """
+    record = _read_record(station, date)
+    if record is None:
+        return None
+    return SufficientStats(float(record['count']), record['mean'], record['m2'], record['min'], record['max'])
+
+
+def write_day(station: str, date: str, df: pd.DataFrame) -> bool:
+    """
+    计算并写入一日的聚合结果，日期已存在时原地覆盖
+    :param station: 气象站编号
+    :param date: 日期
+    :param df: 包含Time列及八个特征列的清洗后数据窗
+    :return:
+        bool: 写入成功返回True，数据为空时不写入并返回False，该日期已有的聚合结果从索引中移除，此后读取均返回None
+    """
+    station_path = _get_station_path(station)
+    if df.empty:
+        # 重新清洗后数据为空时不能保留旧的聚合结果，否则预测与分析仍会读到已被替换的数据
+        with _write_lock, FileLock(station_path + _LOCK_FILE):
+            index = _read_index(station)
+            if index is not None and index['dates'].pop(date, None) is not None:
+                _write_index(station, index)
+        return False
+    record = np.zeros(1, dtype=_RECORD_DTYPE)[0]
+    # calculate_hour_avg会修改Time列，使用副本计算
+    hour_avg = dtools.calculate_hour_avg(df.copy())[FEATURE_COLUMNS].values
+    if hour_avg.shape[0] == _HOURS:
+        record['hour_valid'] = 1.0
+        record['hour_avg'] = hour_avg
+    record['day_avg'] = dtools.calculate_day_avg(df.copy())[FEATURE_COLUMNS].values[:1]
+    stats = dtools.calculate_sufficient_stats(df[FEATURE_COLUMNS].values)
+    record['count'], record['mean'], record['m2'], record['min'], record['max'] = stats
+    with _write_lock, FileLock(station_path + _LOCK_FILE):
+        index = _read_index(station) or {'records': 0, 'dates': {}}
+        slot = index['dates'].get(date)
+        if slot is None:
+            slot = index['records']
+        with open(station_path + _RECORD_FILE, 'r+b' if os.path.exists(station_path + _RECORD_FILE) else 'wb') \
+                as file:
+            file.seek(slot * _RECORD_SIZE)
+            file.write(record.tobytes())
+        if date not in index['dates']:
+            index['dates'][date] = slot
+            index['records'] = slot + 1
+            _write_index(station, index)
+    return True
+
+
+def convert_station(station: str, file_path: str = FILE_PATH) -> int:
+    """
+    由气象站的全部CSV数据集计算并写入聚合结果
+    :param station: 气象站编号
+    :param file_path: CSV数据集根路径
+    :return:
+        int: 成功写入的日期数
+    """
+    folder_path = f"{file_path}{station}/"
+    prefix = f"{station}_data_"
+    dates = sorted(file_name[len(prefix):-len('.csv')] for file_name in os.listdir(folder_path)
+                   if file_name.startswith(prefix) and file_name.endswith('.csv'))
+    return sum(write_day(station, date, pd.read_csv(f"{folder_path}{prefix}{date}.csv")) for date in dates)
+
+
+def convert_all(file_path: str = FILE_PATH) -> Dict[str, int]:
+    """
+    由CSV数据集根路径下所有气象站的数据计算并写入聚合结果
+    :param file_path: CSV数据集根路径
+    :return:
+        Dict[str, int]: 气象站编号 -> 成功写入的日期数
+    """
+    return {station: convert_station(station, file_path) for station in sorted(os.listdir(file_path))
+            if os.path.isdir(os.path.join(file_path, station))}
+
+
+def _read_record(station: str, date: str) -> Optional[np.ndarray]:
+    entry = _get_station_entry(station)
+    if entry is None:
+        return None
+    _, index, records = entry
+    slot = index['dates'].get(date)
+    return records[slot] if slot is not None else None
+
+
+def _read_index(station: str) -> Optional[dict]:
+    try:
+        with open(_get_station_path(station) + _INDEX_FILE, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_index(station: str, index: dict) -> None:
+    path = _get_station_path(station) + _INDEX_FILE
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(index, file)
+    os.replace(path + '.tmp', path)
+
+
+def _get_station_entry(station: str) -> Optional[Tuple[int, dict, np.ndarray]]:
+    """
+    获取气象站的索引及记录内存映射，index.json更新后重新映射；已有日期原地覆盖时映射内容同步可见
+    """
+    try:
+        mtime = os.stat(_get_station_path(station) + _INDEX_FILE).st_mtime_ns
+    except OSError:
+        return None
+    entry = _station_cache.get(station)
+    if entry is not None and entry[0] == mtime:
+        return entry
+    with _cache_lock:
+        index = _read_index(station)
+        if index is None or index['records'] == 0:
+            return None
+        records = np.memmap(_get_station_path(station) + _RECORD_FILE, dtype=_RECORD_DTYPE, mode='r',
+                            shape=(index['records'],))
+        entry = (mtime, index, records)
+        _station_cache[station] = entry
+        return entry
+
+
+if __name__ == '__main__':
+    for converted_station, date_count in convert_all().items():
+        print(f"气象站{converted_station}：已写入{date_count}日聚合结果")
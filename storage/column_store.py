@@ -0,0 +1,339 @@
+"""
+    定义按气象站存放的列式数据存储
+    每个气象站一个目录，八个特征各自为一个定长float32列文件，Time为int64时间戳（秒）列文件，
+    index.json记录每个日期在列文件中的行偏移与行数。读取时以内存映射方式获取切片，不再逐日解析CSV文本
+    重新写入已有日期时，行数不变则原地覆盖；行数变化则追加并将旧数据计入dead_rows，超过COLUMN_STORE_COMPACT_RATIO后重写列文件
+    重写列文件（压缩及由CSV转换）时写入下一代文件名的列文件，index.json记录所用的代数，发布新索引后再删除旧一代的列文件，
+    读取方（不加锁）所映射的索引与列文件始终对应
+    写入时持有气象站目录下write.lock的文件锁，多个worker进程依次写入
+    由CSV数据集转换：python -m storage.column_store
+"""
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from config import COLUMN_STORE_PATH, FILE_PATH, COLUMN_STORE_COMPACT_RATIO
+from storage.file_lock import FileLock
+
+FEATURE_COLUMNS = ['Temperature', 'Humidity', 'Speed', 'Direction', 'Rain', 'Sunlight', 'PM2.5', 'PM10']
+_TIME_COLUMN = 'Time'
+_COLUMN_DTYPES = dict([(_TIME_COLUMN, np.dtype('<i8'))] + [(column, np.dtype('<f4')) for column in FEATURE_COLUMNS])
+_INDEX_FILE = 'index.json'
+_LOCK_FILE = 'write.lock'
+_MAP_ATTEMPTS = 3  # 映射列文件时旧一代文件已被删除，重新读取索引的次数
+
+_write_lock = threading.Lock()
+_cache_lock = threading.Lock()
+# 气象站 -> (index.json修改时间, 日期索引, 各列的内存映射)
+_station_cache = {}  # type: Dict[str, Tuple[int, dict, Dict[str, np.ndarray]]]
+
+
+def _get_station_path(station: str) -> str:
+    return f"{COLUMN_STORE_PATH}{station}/"
+
+
+def _get_column_file(station: str, column: str, generation: int = 0) -> str:
+    # 第0代沿用不含代数的文件名，兼容此前写入的列式存储
+    suffix = 'i8' if column == _TIME_COLUMN else 'f4'
+    if generation == 0:
+        return f"{_get_station_path(station)}{column}.{suffix}"
+    return f"{_get_station_path(station)}{column}.{generation}.{suffix}"
+
+
+def get_day_index(station: str) -> Dict[str, List[int]]:
+    """
+    获取气象站的日期索引
+    :param station: 气象站编号
+    :return:
+        Dict[str, List[int]]: 日期 -> [行偏移, 行数]，气象站不存在列式数据时返回空字典
+    """
+    entry = _get_station_entry(station)
+    return entry[1]['dates'] if entry is not None else {}
+
+
+def has_date(station: str, date: str) -> bool:
+    """
+    判断列式存储中是否存在指定日期的数据
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        bool: 存在时返回True，否则False
+    """
+    return date in get_day_index(station)
+
+
+def read_dates(station: str, dates: List[str]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    按顺序读取多个日期的数据，日期可以重复（用于前向填充）
+    日期在列文件中连续存放时直接返回内存映射的只读切片，不复制数据
+    :param station: 气象站编号
+    :param dates: 日期列表
+    :return:
+        Dict[str, np.ndarray] or None: 列名 -> 数据，Time列为datetime64[s]，任一日期不存在时返回None
+    """
+    entry = _get_station_entry(station)
+    if entry is None:
+        return None
+    _, index, columns = entry
+    day_index = index['dates']
+    if not all(date in day_index for date in dates):
+        return None
+    # 合并相邻的行区间，连续存放的日期只需一次切片
+    spans = []
+    for date in dates:
+        offset, count = day_index[date]
+        if spans and spans[-1][1] == offset:
+            spans[-1][1] = offset + count
+        else:
+            spans.append([offset, offset + count])
+    data = {}
+    for column, values in columns.items():
+        parts = [values[start:end] for start, end in spans]
+        data[column] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    data[_TIME_COLUMN] = data[_TIME_COLUMN].view('datetime64[s]')
+    return data
+
+
+def to_dataframe(data: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    将read_dates读取的列数据转换为与CSV数据集列顺序一致的数据窗
+    :param data: 列名 -> 数据
+    :return:
+        DataFrame: 包含Time列及八个特征列的数据窗，特征列为float64
+    """
+    df = pd.DataFrame({column: data[column].astype(np.float64) for column in FEATURE_COLUMNS},
+                      columns=FEATURE_COLUMNS)
+    df.insert(0, _TIME_COLUMN, data[_TIME_COLUMN])
+    return df
+
+
+def write_day(station: str, date: str, df: pd.DataFrame) -> None:
+    """
+    写入一日的数据；日期已存在且行数不变时原地覆盖，行数变化时追加新数据并更新索引，
+    被替换的旧数据行数超过总行数的COLUMN_STORE_COMPACT_RATIO时按日期顺序重写列文件以清理旧数据
+    :param station: 气象站编号
+    :param date: 日期
+    :param df: 包含Time列（hh:mm:ss）及八个特征列的数据窗
+    :return:
+        None: 直到写入完成为止
+    """
+    station_path = _get_station_path(station)
+    with _write_lock, FileLock(station_path + _LOCK_FILE):
+        index = _read_index(station) or {'rows': 0, 'dates': {}}
+        generation = index.get('generation', 0)
+        columns = _to_columns(date, df)
+        previous = index['dates'].get(date)
+        if previous is not None and previous[1] == len(df):
+            # 行数不变时原地覆盖，索引无需更新，已有的内存映射同步可见
+            for column, values in columns.items():
+                with open(_get_column_file(station, column, generation), 'r+b') as file:
+                    file.seek(previous[0] * _COLUMN_DTYPES[column].itemsize)
+                    file.write(values.tobytes())
+            return
+        offset, count = index['rows'], len(df)
+        for column, values in columns.items():
+            with open(_get_column_file(station, column, generation), 'ab') as file:
+                # 截断上一次未完成写入遗留的数据，保证各列文件的行数与索引一致
+                file.truncate(offset * _COLUMN_DTYPES[column].itemsize)
+                file.write(values.tobytes())
+        index['rows'] = offset + count
+        index['dates'][date] = [offset, count]
+        if previous is not None:
+            index['dead_rows'] = index.get('dead_rows', 0) + previous[1]
+        if index.get('dead_rows', 0) > index['rows'] * COLUMN_STORE_COMPACT_RATIO:
+            _compact(station, index)
+        else:
+            _write_index(station, index)
+
+
+def convert_station(station: str, file_path: str = FILE_PATH) -> int:
+    """
+    将气象站的全部CSV数据集按日期顺序重新写入列式存储
+    :param station: 气象站编号
+    :param file_path: CSV数据集根路径
+    :return:
+        int: 转换的日期数
+    """
+    folder_path = f"{file_path}{station}/"
+    prefix = f"{station}_data_"
+    dates = sorted(file_name[len(prefix):-len('.csv')] for file_name in os.listdir(folder_path)
+                   if file_name.startswith(prefix) and file_name.endswith('.csv'))
+    station_path = _get_station_path(station)
+    with _write_lock, FileLock(station_path + _LOCK_FILE):
+        generation = _get_next_generation(station)
+        files = {column: open(_get_column_file(station, column, generation), 'wb') for column in _COLUMN_DTYPES}
+        index = {'rows': 0, 'dates': {}, 'generation': generation}
+        try:
+            for date in dates:
+                df = pd.read_csv(f"{folder_path}{prefix}{date}.csv")
+                for column, values in _to_columns(date, df).items():
+                    files[column].write(values.tobytes())
+                index['dates'][date] = [index['rows'], len(df)]
+                index['rows'] += len(df)
+        finally:
+            for file in files.values():
+                file.close()
+        _write_index(station, index)
+        _remove_other_generations(station, generation)
+    return len(dates)
+
+
+def convert_all(file_path: str = FILE_PATH) -> Dict[str, int]:
+    """
+    将CSV数据集根路径下所有气象站的数据转换为列式存储
+    :param file_path: CSV数据集根路径
+    :return:
+        Dict[str, int]: 气象站编号 -> 转换的日期数
+    """
+    return {station: convert_station(station, file_path) for station in sorted(os.listdir(file_path))
+            if os.path.isdir(os.path.join(file_path, station))}
+
+
+def _compact(station: str, index: dict) -> None:
+    """
+    按日期顺序将索引中各日期的数据写入下一代列文件，发布新索引后删除旧一代的列文件，需在持有写锁时调用
+    :param station: 气象站编号
+    :param index: 尚未写入的当前索引，其中的行均位于当前一代的列文件中
+    :return:
+        None: 直到新索引发布、旧文件删除为止
+    """
+    dates = sorted(index['dates'])
+    generation = _get_next_generation(station)
+    for column, dtype in _COLUMN_DTYPES.items():
+        values = np.fromfile(_get_column_file(station, column, index.get('generation', 0)), dtype=dtype,
+                             count=index['rows'])
+        with open(_get_column_file(station, column, generation), 'wb') as file:
+            for date in dates:
+                offset, count = index['dates'][date]
+                file.write(values[offset:offset + count].tobytes())
+    compacted = {'rows': 0, 'dates': {}, 'generation': generation}
+    for date in dates:
+        count = index['dates'][date][1]
+        compacted['dates'][date] = [compacted['rows'], count]
+        compacted['rows'] += count
+    _write_index(station, compacted)
+    _remove_other_generations(station, generation)
+
+
+def _get_column_generations(station: str) -> Dict[int, List[str]]:
+    """
+    获取气象站目录下已有的列文件，按代数分组
+    :return:
+        Dict[int, List[str]]: 代数 -> 列文件路径列表
+    """
+    station_path = _get_station_path(station)
+    try:
+        file_names = os.listdir(station_path)
+    except FileNotFoundError:
+        return {}
+    generations = {}
+    for column in _COLUMN_DTYPES:
+        suffix = '.i8' if column == _TIME_COLUMN else '.f4'
+        for file_name in file_names:
+            if not (file_name.startswith(column + '.') and file_name.endswith(suffix)):
+                continue
+            # 特征名PM2.5中含有'.'，按列名与后缀截取中间的代数
+            middle = file_name[len(column) + 1:-len(suffix)]
+            if middle == '' or middle.isdigit():
+                generations.setdefault(int(middle or 0), []).append(station_path + file_name)
+    return generations
+
+
+def _get_next_generation(station: str) -> int:
+    """
+    获取下一代列文件的代数，大于当前索引及目录中遗留文件的代数，需在持有写锁时调用
+    """
+    index = _read_index(station) or {}
+    return max([index.get('generation', 0)] + list(_get_column_generations(station))) + 1
+
+
+def _remove_other_generations(station: str, generation: int) -> None:
+    """
+    删除不属于指定代数的列文件，需在发布该代的索引后调用；已映射旧文件的读取方在POSIX上仍可继续读取
+    """
+    for other_generation, paths in _get_column_generations(station).items():
+        if other_generation == generation:
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                # Windows上仍被映射的文件无法删除，留待下一次重写列文件时删除
+                pass
+
+
+def _to_columns(date: str, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    将一日的数据窗转换为各列的定长数组
+    """
+    seconds = pd.to_timedelta(df[_TIME_COLUMN].astype(str)).values.astype('timedelta64[s]').astype(np.int64)
+    columns = {_TIME_COLUMN: (np.datetime64(date, 's').astype(np.int64) + seconds).astype('<i8')}
+    for column in FEATURE_COLUMNS:
+        columns[column] = df[column].values.astype('<f4')
+    return columns
+
+
+def _read_index(station: str) -> Optional[dict]:
+    try:
+        with open(_get_station_path(station) + _INDEX_FILE, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_index(station: str, index: dict) -> None:
+    path = _get_station_path(station) + _INDEX_FILE
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(index, file)
+    os.replace(path + '.tmp', path)
+
+
+def _get_station_entry(station: str) -> Optional[Tuple[int, dict, Dict[str, np.ndarray]]]:
+    """
+    获取气象站的索引及各列内存映射，index.json更新后按新索引记录的代数重新映射
+    """
+    try:
+        mtime = os.stat(_get_station_path(station) + _INDEX_FILE).st_mtime_ns
+    except OSError:
+        return None
+    entry = _station_cache.get(station)
+    if entry is not None and entry[0] == mtime:
+        return entry
+    with _cache_lock:
+        for attempt in range(_MAP_ATTEMPTS):
+            try:
+                mtime = os.stat(_get_station_path(station) + _INDEX_FILE).st_mtime_ns
+            except OSError:
+                return None
+            index = _read_index(station)
+            if index is None:
+                return None
+            try:
+                columns = _map_columns(station, index)
+            except FileNotFoundError:
+                # 读取索引后写入方已发布新一代的索引并删除了旧文件，重新读取索引
+                if attempt == _MAP_ATTEMPTS - 1:
+                    raise
+                continue
+            entry = (mtime, index, columns)
+            _station_cache[station] = entry
+            return entry
+
+
+def _map_columns(station: str, index: dict) -> Dict[str, np.ndarray]:
+    rows = index['rows']
+    columns = {}
+    for column, dtype in _COLUMN_DTYPES.items():
+        if rows == 0:
+            columns[column] = np.empty(0, dtype=dtype)
+        else:
+            columns[column] = np.memmap(_get_column_file(station, column, index.get('generation', 0)), dtype=dtype,
+                                        mode='r', shape=(rows,))
+    return columns
+
+
+if __name__ == '__main__':
+    for converted_station, date_count in convert_all().items():
+        print(f"气象站{converted_station}：已转换{date_count}日数据")
@@ -0,0 +1,234 @@
+"""
+    定义按气象站记录已清洗日期的清单：每个日期对应的CSV数据集行数与文件大小，由ETL在写入数据后以临时文件替换的方式更新，
+    更新时持有{station}.lock的文件锁并重新读取清单，多个worker进程的更新不会相互覆盖。
+    最近清洗日期及日期范围内的存在性判断均在内存中完成，不再扫描目录；前向填充规划仅对请求范围内清单已记录的日期检查CSV文件是否存在，
+    文件已被删除的日期视为缺失并由discard从清单中移除。
+    气象站尚无清单文件时扫描一次其CSV目录生成清单；也可通过 python -m storage.date_manifest 重新生成全部清单
+"""
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+from config import DATE_MANIFEST_PATH, FILE_PATH
+from storage.file_lock import FileLock
+
+# 清单文件不存在时，读取方会在持有该锁时生成清单，因此需可重入
+_write_lock = threading.RLock()
+_cache_lock = threading.Lock()
+# 气象站 -> (清单文件修改时间, 日期 -> [行数, 文件大小], 升序排列的日期列表)
+_station_cache = {}  # type: Dict[str, Tuple[Optional[int], Dict[str, List[int]], List[str]]]
+
+
+def _get_file(station: str) -> str:
+    return f"{DATE_MANIFEST_PATH}{station}.json"
+
+
+def _get_lock_file(station: str) -> str:
+    return f"{DATE_MANIFEST_PATH}{station}.lock"
+
+
+def _get_csv_file(station: str, date: str) -> str:
+    return f"{FILE_PATH}{station}/{station}_data_{date}.csv"
+
+
+def get_entries(station: str) -> Dict[str, List[int]]:
+    """
+    获取气象站全部已清洗日期的记录
+    :param station: 气象站编号
+    :return:
+        Dict[str, List[int]]: 日期 -> [行数, 文件大小]，调用方不应修改返回结果
+    """
+    return _get_station_entry(station)[1]
+
+
+def has_date(station: str, date: str) -> bool:
+    """
+    判断气象站是否存在指定日期的已清洗数据
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        bool: 存在时返回True，否则False
+    """
+    return date in _get_station_entry(station)[1]
+
+
+def get_latest_date(station: str) -> str:
+    """
+    获取气象站最近的已清洗日期
+    :param station: 气象站编号
+    :return:
+        str: 最近的已清洗日期，不存在任何已清洗数据时返回空字符串
+    """
+    dates = _get_station_entry(station)[2]
+    return dates[-1] if dates else ""
+
+
+def get_dates_in_range(station: str, start_date: str, end_date: str) -> List[str]:
+    """
+    获取日期范围内全部已清洗的日期
+    :param station: 气象站编号
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :return:
+        List[str]: 升序排列的已清洗日期
+    """
+    dates = _get_station_entry(station)[2]
+    return dates[bisect_left(dates, start_date):bisect_right(dates, end_date)]
+
+
+def plan_forward_fill(station: str, dates: List[str], max_missing: Optional[int] = None) -> Optional[List[Optional[str]]]:
+    """
+    规划每一日实际读取的数据日期，缺失的日期使用前一个存在数据的日期进行前向填充
+    :param station: 气象站编号
+    :param dates: 按升序排列的日期列表
+    :param max_missing: 允许连续缺失的最多日数，为None时不限制
+    :return:
+        List[Optional[str]] or None: 与dates一一对应的数据日期，之前没有可填充数据的日期为None；
+                                     连续缺失超过max_missing日时返回None
+    """
+    entries = _get_station_entry(station)[1]
+    # 清单记录的CSV已被删除时视为缺失，与逐日读取文件时的前向填充一致
+    removed_dates = [date for date in dates if date in entries and not os.path.exists(_get_csv_file(station, date))]
+    if removed_dates:
+        discard(station, removed_dates)
+        entries = _get_station_entry(station)[1]
+    plan = []
+    source = None
+    consecutive_missing_count = 0
+    for date in dates:
+        if date in entries:
+            source = date
+            consecutive_missing_count = 0
+        elif max_missing is not None and consecutive_missing_count >= max_missing:
+            return None
+        else:
+            consecutive_missing_count += 1
+        plan.append(source)
+    return plan
+
+
+def update(station: str, entries: Dict[str, List[int]]) -> None:
+    """
+    记录多个日期的已清洗数据并写入清单文件
+    :param station: 气象站编号
+    :param entries: 日期 -> [行数, 文件大小]
+    :return:
+        None: 直到写入完成为止
+    """
+    if not entries:
+        return
+    with _write_lock, FileLock(_get_lock_file(station)):
+        # 其他worker进程可能刚刚写入清单，持有文件锁后重新读取
+        try:
+            with open(_get_file(station), 'r', encoding='utf-8') as file:
+                station_entries = json.load(file)
+        except FileNotFoundError:
+            station_entries = _scan_station(station, FILE_PATH)
+        station_entries.update(entries)
+        _write_file(station, station_entries)
+
+
+def discard(station: str, dates: List[str]) -> None:
+    """
+    从清单中移除CSV文件已不存在的日期，持有文件锁后再次检查，不会移除其他worker进程刚刚重新写入的日期
+    :param station: 气象站编号
+    :param dates: 日期列表
+    :return:
+        None: 直到写入完成为止
+    """
+    with _write_lock, FileLock(_get_lock_file(station)):
+        try:
+            with open(_get_file(station), 'r', encoding='utf-8') as file:
+                station_entries = json.load(file)
+        except FileNotFoundError:
+            station_entries = _scan_station(station, FILE_PATH)
+        removed_dates = [date for date in dates
+                         if date in station_entries and not os.path.exists(_get_csv_file(station, date))]
+        for date in removed_dates:
+            del station_entries[date]
+        if removed_dates:
+            _write_file(station, station_entries)
+
+
+def rebuild_station(station: str, file_path: str = FILE_PATH) -> int:
+    """
+    扫描气象站的CSV目录重新生成清单
+    :param station: 气象站编号
+    :param file_path: CSV数据集根路径
+    :return:
+        int: 清单中的日期数
+    """
+    with _write_lock, FileLock(_get_lock_file(station)):
+        entries = _scan_station(station, file_path)
+        _write_file(station, entries)
+    return len(entries)
+
+
+def rebuild_all(file_path: str = FILE_PATH) -> Dict[str, int]:
+    """
+    扫描全部气象站的CSV目录重新生成清单
+    :param file_path: CSV数据集根路径
+    :return:
+        Dict[str, int]: 气象站 -> 清单中的日期数
+    """
+    return {station: rebuild_station(station, file_path) for station in sorted(os.listdir(file_path))
+            if os.path.isdir(os.path.join(file_path, station))}
+
+
+def _scan_station(station: str, file_path: str) -> Dict[str, List[int]]:
+    """
+    扫描气象站的CSV目录，得到每个日期的行数（不含表头）与文件大小
+    """
+    folder_path = f"{file_path}{station}"
+    entries = {}
+    if not os.path.isdir(folder_path):
+        return entries
+    prefix = f"{station}_data_"
+    for file_name in os.listdir(folder_path):
+        if not (file_name.startswith(prefix) and file_name.endswith('.csv')):
+            continue
+        path = os.path.join(folder_path, file_name)
+        with open(path, 'rb') as file:
+            rows = max(sum(1 for line in file if line.strip()) - 1, 0)
+        entries[file_name[len(prefix):-len('.csv')]] = [rows, os.path.getsize(path)]
+    return entries
+
+
+def _write_file(station: str, entries: Dict[str, List[int]]) -> None:
+    os.makedirs(DATE_MANIFEST_PATH, exist_ok=True)
+    path = _get_file(station)
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(entries, file, sort_keys=True)
+    os.replace(path + '.tmp', path)
+    with _cache_lock:
+        _station_cache[station] = (os.stat(path).st_mtime_ns, entries, sorted(entries))
+
+
+def _get_station_entry(station: str) -> Tuple[Optional[int], Dict[str, List[int]], List[str]]:
+    """
+    获取气象站的清单，清单文件更新后重新读取；清单文件不存在时扫描一次CSV目录生成，目录不存在时视为空清单
+    """
+    try:
+        mtime = os.stat(_get_file(station)).st_mtime_ns
+    except OSError:
+        mtime = None
+    if mtime is None:
+        if not os.path.isdir(f"{FILE_PATH}{station}"):
+            return None, {}, []
+        rebuild_station(station, FILE_PATH)
+        return _station_cache[station]
+    entry = _station_cache.get(station)
+    if entry is not None and entry[0] == mtime:
+        return entry
+    with _cache_lock:
+        with open(_get_file(station), 'r', encoding='utf-8') as file:
+            entries = json.load(file)
+        entry = (mtime, entries, sorted(entries))
+        _station_cache[station] = entry
+        return entry
+
+
+if __name__ == '__main__':
+    for rebuilt_station, date_count in rebuild_all().items():
+        print(f"气象站{rebuilt_station}：清单中共{date_count}日数据")
@@ -0,0 +1,84 @@
+"""
+    定义数据清洗的水位线：记录每个气象站每日在最近一次成功清洗时Redis有序集合的成员数与最大分值，
+    再次清洗时水位线未变化且CSV文件仍存在的日期视为源数据未更新而跳过。每个气象站一个JSON文件，以临时文件替换的方式写入，
+    写入时持有{station}.lock的文件锁；清洗期间另持有{station}.etl.lock，多个worker进程对同一气象站的清洗依次执行
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from config import ETL_WATERMARK_PATH
+from storage.file_lock import FileLock
+
+_lock = threading.Lock()
+# 气象站 -> (水位线文件修改时间, 日期 -> [成员数, 最大分值])
+_watermarks = {}  # type: Dict[str, Tuple[Optional[int], Dict[str, List[float]]]]
+
+
+def _get_file(station: str) -> str:
+    return f"{ETL_WATERMARK_PATH}{station}.json"
+
+
+def get(station: str, date: str) -> Optional[List[float]]:
+    """
+    获取一日的水位线
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        List[float] or None: [成员数, 最大分值]，尚未成功清洗过时返回None
+    """
+    return _get_station(station).get(date)
+
+
+def update(station: str, marks: Dict[str, List[float]]) -> None:
+    """
+    记录多日的水位线并写入文件
+    :param station: 气象站编号
+    :param marks: 日期 -> [成员数, 最大分值]
+    :return:
+        None: 直到写入完成为止
+    """
+    if not marks:
+        return
+    path = _get_file(station)
+    with _lock, FileLock(f"{ETL_WATERMARK_PATH}{station}.lock"):
+        # 其他worker进程可能刚刚写入水位线，持有文件锁后重新读取
+        station_marks = dict(_load(station)[1])
+        station_marks.update(marks)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(station_marks, file, sort_keys=True)
+        os.replace(path + '.tmp', path)
+        _watermarks[station] = (os.stat(path).st_mtime_ns, station_marks)
+
+
+def station_lock(station: str) -> FileLock:
+    """
+    获取清洗气象站期间需持有的跨进程锁，读取水位线、写入数据至更新水位线均在持有该锁时进行
+    :param station: 气象站编号
+    :return:
+        FileLock: 尚未加锁的文件锁
+    """
+    return FileLock(f"{ETL_WATERMARK_PATH}{station}.etl.lock")
+
+
+def _get_station(station: str) -> Dict[str, List[float]]:
+    """
+    获取气象站的水位线，水位线文件被其他进程更新后重新读取
+    """
+    try:
+        mtime = os.stat(_get_file(station)).st_mtime_ns
+    except OSError:
+        mtime = None
+    entry = _watermarks.get(station)
+    if entry is None or entry[0] != mtime:
+        entry = _load(station)
+        _watermarks[station] = entry
+    return entry[1]
+
+
+def _load(station: str) -> Tuple[Optional[int], Dict[str, List[float]]]:
+    try:
+        with open(_get_file(station), 'r', encoding='utf-8') as file:
+            return os.fstat(file.fileno()).st_mtime_ns, json.load(file)
+    except FileNotFoundError:
+        return None, {}
@@ -0,0 +1,56 @@
+"""
+    定义跨进程的文件锁：以flock锁定锁文件，gunicorn的多个worker进程写入同一气象站的存储文件时依次进行。
+    同一进程内的线程每次加锁都单独打开锁文件，flock同样使其互斥；
+    不支持fcntl的平台（Windows）仅以单个进程运行服务，此时只打开锁文件而不加锁，由各存储模块原有的线程锁互斥
+"""
+import os
+from typing import Optional, TextIO
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class FileLock:
+    """
+    锁定path对应的锁文件，锁文件所在目录不存在时自动创建；可作为上下文管理器以阻塞方式加锁
+    """
+    __slots__ = ('path', '_file')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None  # type: Optional[TextIO]
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        加锁
+        :param blocking: 是否等待其他进程释放锁，为False时立即返回
+        :return:
+            bool: 加锁成功返回True，非阻塞且锁已被持有时返回False
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        file = open(self.path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                file.close()
+                return False
+        self._file = file
+        return True
+
+    def release(self) -> None:
+        file, self._file = self._file, None
+        if file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        file.close()
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.release()
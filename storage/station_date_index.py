@@ -0,0 +1,174 @@
+"""
+    定义进程内的气象站日期索引，一次性载入station_date表，每个气象站以有序的日序号数组保存存在记录的日期
+    单日查询与连续日期范围计数均通过二分查找完成，不再访问数据库；
+    ETL完成一日数据后增量加入索引，并由守护线程周期性与数据表重新同步
+"""
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from config import STATION_DATE_INDEX_RESYNC_INTERVAL
+
+# 气象站 -> 升序排列且不重复的日序号数组；更新时替换整个数组，读取无需加锁
+_index = {}  # type: Dict[str, array]
+_loaded = False
+_update_lock = threading.Lock()
+# 重新同步期间增量加入的(气象站, 日序号, 加入时间)，同步完成后重新应用，避免被旧的查询结果覆盖
+_pending_adds = []  # type: List[Tuple[str, int, float]]
+_resync_pid = None
+
+
+def _to_ordinal(date: str) -> int:
+    return datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+
+def is_loaded() -> bool:
+    """
+    判断索引是否已载入
+    :return:
+        bool: 已载入时返回True，否则False
+    """
+    return _loaded
+
+
+def load(loader: Callable[[], Iterable[Tuple[str, str]]]) -> int:
+    """
+    以station_date表的全部记录重建索引
+    :param loader: 返回(气象站编号, YYYY-MM-DD格式日期)记录的方法
+    :return:
+        int: 索引中的日期总数
+    """
+    global _index, _loaded
+    # 在查询之前记录时间，查询期间增量加入的日期不会因查询结果较旧而丢失
+    start_time = time.monotonic()
+    grouped = {}  # type: Dict[str, Set[int]]
+    for station, date in loader():
+        grouped.setdefault(str(station), set()).add(_to_ordinal(date))
+    with _update_lock:
+        # 重新应用载入期间加入的日期，较早的增量记录已包含在本次查询结果中
+        _pending_adds[:] = [entry for entry in _pending_adds if entry[2] >= start_time]
+        for station, ordinal, _ in _pending_adds:
+            grouped.setdefault(station, set()).add(ordinal)
+        # 整体替换字典引用，读取方不会看到重建过程中的空索引
+        _index = {station: array('i', sorted(ordinals)) for station, ordinals in grouped.items()}
+        _loaded = True
+        return sum(len(ordinals) for ordinals in _index.values())
+
+
+def add(station: str, date: str) -> None:
+    """
+    增量加入一个存在记录的日期，索引尚未载入时不做处理
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        None: 直到索引更新为止
+    """
+    if not _loaded:
+        return
+    ordinal = _to_ordinal(date)
+    with _update_lock:
+        _pending_adds.append((station, ordinal, time.monotonic()))
+        ordinals = _index.get(station, array('i'))
+        position = bisect_left(ordinals, ordinal)
+        if position < len(ordinals) and ordinals[position] == ordinal:
+            return
+        updated = array('i', ordinals)
+        updated.insert(position, ordinal)
+        _index[station] = updated
+
+
+def contains(station: str, date: str) -> bool:
+    """
+    判断指定气象站下的日期是否存在记录
+    :param station: 气象站编号
+    :param date: 日期
+    :return:
+        bool: 存在时返回True，否则False
+    """
+    ordinals = _index.get(station)
+    if not ordinals:
+        return False
+    try:
+        ordinal = _to_ordinal(date)
+    except ValueError:
+        # 形如YYYY-MM-DD但并非有效日期，与数据表中查询不到记录的结果一致
+        return False
+    position = bisect_left(ordinals, ordinal)
+    return position < len(ordinals) and ordinals[position] == ordinal
+
+
+def count_range(station: str, start_date: str, end_date: str) -> int:
+    """
+    统计指定气象站下起止日期（含）内存在记录的日期数，等于范围天数即表示连续时间段完整
+    :param station: 气象站编号
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :return:
+        int: 存在记录的日期数
+    """
+    ordinals = _index.get(station)
+    if not ordinals:
+        return 0
+    try:
+        start, end = _to_ordinal(start_date), _to_ordinal(end_date)
+    except ValueError:
+        return 0
+    return max(bisect_right(ordinals, end) - bisect_left(ordinals, start), 0)
+
+
+def get_existing_dates(station: str, dates: List[str]) -> Set[str]:
+    """
+    获取指定气象站下给定日期中存在记录的日期
+    :param station: 气象站编号
+    :param dates: 日期列表
+    :return:
+        Set[str]: 存在记录的日期集合
+    """
+    return {date for date in dates if contains(station, date)}
+
+
+def get_station_date_set(station_dates: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """
+    获取给定(气象站编号, 日期)中存在记录的组合
+    :param station_dates: (气象站编号, 日期)列表
+    :return:
+        Set[Tuple[str, str]]: 存在记录的(气象站编号, 日期)集合
+    """
+    return {(station, date) for station, date in station_dates if contains(station, date)}
+
+
+def start_resync(loader: Callable[[], Iterable[Tuple[str, str]]],
+                 interval: float = STATION_DATE_INDEX_RESYNC_INTERVAL) -> None:
+    """
+    开启一个守护线程，每隔interval秒以loader返回的全部记录重建索引
+    :param loader: 返回station_date表全部(气象站编号, 日期)记录的方法
+    :param interval: 重新同步的时间间隔（秒）
+    :return:
+        None: 同一进程中重复调用时不会开启多个线程，fork出的子进程中会重新开启
+    """
+    global _resync_pid
+    with _update_lock:
+        if _resync_pid == os.getpid():
+            return
+        _resync_pid = os.getpid()
+    resync_thread = threading.Thread(target=__resync_periodically, args=(loader, interval), daemon=True)
+    resync_thread.start()
+
+
+def __resync_periodically(loader: Callable[[], Iterable[Tuple[str, str]]], interval: float):
+    """
+    每隔interval秒重新同步一次索引
+
+    :return:
+        None: 每隔interval秒重新同步一次索引
+    """
+    while True:
+        time.sleep(interval)
+        try:
+            load(loader)
+        except Exception as e:
+            # 数据库暂时不可用时继续使用当前索引
+            print(f"气象站日期索引重新同步失败，继续使用当前索引：{e}")
@@ -0,0 +1,59 @@
+"""
+    测试公共配置：与benchmark中的脚本相同，将项目根目录、server_code及benchmark加入导入路径，
+    以benchmark/stand_ins中的本地替代服务代替MySQL、Redis与模型文件，各存储的根路径均指向每个测试的临时目录
+    运行方式：python -m pytest tests
+    依赖：pip install pytest fakeredis h5py
+"""
+import os
+import sys
+import warnings
+import pytest
+
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [_ROOT_PATH, os.path.join(_ROOT_PATH, 'server_code'), os.path.join(_ROOT_PATH, 'benchmark')]
+
+pytest.importorskip('fakeredis')
+
+import stand_ins  # noqa: E402
+import synthetic_data  # noqa: E402
+
+STATIONS = ['1', '2']
+DATES = synthetic_data.get_dates('2023-01-01', 8)
+
+
+@pytest.fixture(autouse=True)
+def _quiet_pandas():
+    # pandas对逐元素解析时间及'H'频率的警告与被测行为无关
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=UserWarning)
+        warnings.simplefilter('ignore', category=FutureWarning)
+        yield
+
+
+@pytest.fixture
+def file_path(tmp_path) -> str:
+    """
+    各存储的根路径指向临时目录，返回已创建各气象站目录的数据集根路径
+    """
+    return stand_ins.use_folder(str(tmp_path / 'data'), STATIONS)
+
+
+@pytest.fixture
+def redis_client(file_path):
+    """
+    以fakeredis代替Redis，并写入各气象站每日的源数据，每日随机缺失两个小时
+    """
+    client = stand_ins.use_fake_redis()
+    synthetic_data.populate_redis(client, STATIONS, DATES, missing_hours=2)
+    return client
+
+
+@pytest.fixture
+def station_dates(tmp_path) -> list:
+    """
+    以SQLite代替MySQL的station_date表，各气象站缺少第5日的记录
+    """
+    rows = [(station, date) for station, date in synthetic_data.get_station_dates(STATIONS, DATES)
+            if date != DATES[4]]
+    stand_ins.use_sqlite_station_date(str(tmp_path / 'station_date.sqlite'), rows)
+    return rows
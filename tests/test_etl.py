@@ -0,0 +1,165 @@
+import asyncio
+import filecmp
+import functools
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import stand_ins
+from server_code import async_application
+from server_code.cleaned import etl_jobs, reading_codec
+from cleaned import meteo_data_cleaned
+from storage import aggregate_store, column_store, date_manifest
+from conftest import STATIONS, DATES
+
+
+def _run_async(get_awaitable):
+    async def run():
+        try:
+            return await get_awaitable()
+        finally:
+            await async_application.close()
+
+    return asyncio.run(run())
+
+
+def _etl_into(folder: str, max_workers: int) -> str:
+    file_path = stand_ins.use_folder(folder, STATIONS)
+    meteo_data_cleaned.etl_stations(STATIONS, DATES[0], DATES[-1], max_workers=max_workers)
+    return file_path
+
+
+def _assert_same_csv(left: str, right: str) -> None:
+    for station in STATIONS:
+        for date in DATES:
+            name = f"{station}/{station}_data_{date}.csv"
+            assert filecmp.cmp(os.path.join(left, name), os.path.join(right, name), shallow=False), name
+
+
+def test_process_pool_matches_serial(redis_client, tmp_path):
+    serial_path = _etl_into(str(tmp_path / 'serial'), 0)
+    parallel_path = _etl_into(str(tmp_path / 'parallel'), 2)
+    _assert_same_csv(serial_path, parallel_path)
+    # 再次清洗复用同一进程池
+    assert meteo_data_cleaned.get_process_pool(2) is meteo_data_cleaned.get_process_pool(2)
+
+
+def test_async_matches_sync(redis_client, tmp_path):
+    sync_path = _etl_into(str(tmp_path / 'sync'), 0)
+    async_path = stand_ins.use_folder(str(tmp_path / 'async'), STATIONS)
+
+    _run_async(lambda: asyncio.gather(*(meteo_data_cleaned.etl_days_async([(station, date) for date in DATES],
+                                                                           async_application.get_executor())
+                                        for station in STATIONS)))
+    _assert_same_csv(sync_path, async_path)
+
+
+def test_unchanged_days_are_skipped_unless_output_missing(redis_client, file_path):
+    tasks = [('1', date) for date in DATES]
+    assert meteo_data_cleaned.etl_days(tasks, 0) == 0
+    assert meteo_data_cleaned.etl_days(tasks, 0) == len(DATES)
+    os.remove(f"{file_path}1/1_data_{DATES[2]}.csv")
+    assert meteo_data_cleaned.etl_days(tasks, 0) == len(DATES) - 1
+    os.remove(f"{file_path}1/1_data_{DATES[3]}.csv")
+    assert _run_async(lambda: meteo_data_cleaned.etl_days_async(tasks, async_application.get_executor())) == \
+        len(DATES) - 1
+    assert os.path.exists(f"{file_path}1/1_data_{DATES[2]}.csv")
+    assert os.path.exists(f"{file_path}1/1_data_{DATES[3]}.csv")
+
+
+def test_decode_keeps_full_time_strings():
+    members = [str(['00:00:00.5', 1, 2, 3, 4, 5, 6, 7, 8]), str(['01:00:00', 1, 2, 3, 4, 5, 6, 7, 8]),
+               reading_codec.encode_reading('02:03:04', [1] * 8), str(('03:00:00', 1, 2))]
+    times, values = reading_codec.decode_day(members)
+    assert list(times) == ['00:00:00.5', '01:00:00', '02:03:04', '03:00:00']
+    assert np.isnan(values[3, 2:]).all()
+    seconds = meteo_data_cleaned._to_day_seconds(pd.Series(['00:00:00.5', '1:02:03', '23:59:59']))
+    assert seconds.tolist() == [0, 3723, 86399]
+
+
+def _wait_job(job_id: str) -> dict:
+    for _ in range(200):
+        job = etl_jobs.get_job(job_id)
+        if job['status'] in (etl_jobs.SUCCESS, etl_jobs.FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"任务{job_id}未结束")
+
+
+def test_job_status_visible_from_other_processes(redis_client, monkeypatch):
+    monkeypatch.setattr(meteo_data_cleaned, 'etl_days', functools.partial(meteo_data_cleaned.etl_days, max_workers=0))
+    job_id = etl_jobs.submit_job('1', DATES[0], DATES[2])
+    assert len(job_id) == 32
+    job = _wait_job(job_id)
+    assert [day['status'] for day in job['days']] == [etl_jobs.SUCCESS] * 3
+    # 其他worker进程中不存在该任务，由状态文件获取
+    monkeypatch.setattr(etl_jobs, '_jobs', type(etl_jobs._jobs)())
+    assert etl_jobs.get_job(job_id) == job
+    assert etl_jobs.get_job('../' + job_id) is None
+
+
+def test_empty_range_job_finishes_immediately(file_path):
+    job = etl_jobs.get_job(etl_jobs.submit_job('1', DATES[3], DATES[1]))
+    assert job['status'] == etl_jobs.SUCCESS
+    assert job['total'] == 0
+
+
+def test_empty_day_invalidates_aggregates(redis_client, file_path):
+    meteo_data_cleaned.etl_days([('1', DATES[0])], 0)
+    assert aggregate_store.read_day_avg('1', DATES[0]) is not None
+    # 源数据全部为无法解析的记录，清洗后为空
+    redis_client.delete(f"1_data_{DATES[0]}")
+    redis_client.zadd(f"1_data_{DATES[0]}", {str(['00:00:00'] + [None] * 8): 0})
+    meteo_data_cleaned.etl_days([('1', DATES[0])], 0)
+    assert aggregate_store.read_day_avg('1', DATES[0]) is None
+    assert aggregate_store.read_hour_avg('1', DATES[0]) is None
+    assert aggregate_store.read_stats('1', DATES[0]) is None
+    assert date_manifest.get_entries('1')[DATES[0]][0] == 0
+    assert column_store.get_day_index('1')[DATES[0]][1] == 0
+
+
+def test_cleaning_module_loaded_once():
+    # etl_jobs与api_server、async_server以相同的模块名导入，配置或替换的是同一份全局状态
+    assert etl_jobs.meteo_data_cleaned is meteo_data_cleaned
+    assert 'server_code.cleaned.meteo_data_cleaned' not in sys.modules
+
+
+def test_async_jobs_keep_file_io_off_the_event_loop(redis_client, station_dates, monkeypatch):
+    aiohttp_test_utils = pytest.importorskip('aiohttp.test_utils')
+    import async_server
+    loop_threads = []
+    save_job = etl_jobs._save_job
+    is_unchanged = meteo_data_cleaned._is_unchanged
+
+    def on_thread(func):
+        def wrapper(*args):
+            loop_threads.append(threading.current_thread() is threading.main_thread())
+            return func(*args)
+        return wrapper
+
+    monkeypatch.setattr(etl_jobs, '_save_job', on_thread(save_job))
+    monkeypatch.setattr(meteo_data_cleaned, '_is_unchanged', on_thread(is_unchanged))
+
+    async def clean_twice():
+        async with aiohttp_test_utils.TestClient(aiohttp_test_utils.TestServer(async_server.create_app())) as client:
+            jobs = []
+            for _ in range(2):
+                response = await client.post('/anapredict/cleaned',
+                                             json={'station': '1', 'start_date': DATES[0], 'end_date': DATES[2]})
+                job_id = (await response.json())['data']['job_id']
+                for _ in range(200):
+                    job = (await (await client.get(f'/anapredict/cleaned/job/{job_id}')).json())['data']
+                    if job['status'] in (etl_jobs.SUCCESS, etl_jobs.FAILED):
+                        break
+                    await asyncio.sleep(0.05)
+                jobs.append(job)
+            return jobs
+
+    jobs = asyncio.run(clean_twice())
+    assert [[day['status'] for day in job['days']] for job in jobs] == \
+        [[etl_jobs.SUCCESS] * 3, [etl_jobs.SKIPPED] * 3]
+    # 事件循环运行于主线程，任务状态文件及水位线的读写均不在主线程中进行
+    assert loop_threads and not any(loop_threads)
@@ -0,0 +1,74 @@
+import os
+import numpy as np
+import pytest
+import repository
+import stand_ins
+import synthetic_data
+from server_code.prediction import model_lstm, numpy_lstm, result_cache
+from conftest import STATIONS, DATES
+
+_FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture
+def dataset(file_path, monkeypatch):
+    synthetic_data.write_dataset(file_path, STATIONS, DATES)
+    stand_ins.use_tiny_models()
+    monkeypatch.setattr(result_cache, 'PREDICTION_CACHE_MAX_BYTES', 0)
+    return file_path
+
+
+def test_short_term_batch_isolates_malformed_sample(dataset, monkeypatch):
+    get_hour_avg_data = repository.get_hour_avg_data
+    # 气象站2缺少一个小时的平均值
+    monkeypatch.setattr(repository, 'get_hour_avg_data',
+                        lambda station, date: get_hour_avg_data(station, date).iloc[:23] if station == '2'
+                        else get_hour_avg_data(station, date))
+    results = model_lstm.get_short_term_predict_batch([('1', DATES[-1]), ('2', DATES[-1]), ('1', DATES[-2])])
+    assert results[1] is None
+    assert results[0].shape == results[2].shape == (24, 8)
+    assert np.array_equal(results[0], model_lstm.get_short_term_predict_batch([('1', DATES[-1])])[0])
+
+
+def test_long_term_batch_isolates_malformed_sample(dataset, monkeypatch):
+    get_day_avg_data = repository.get_day_avg_data
+    # 气象站2缺少一个特征列
+    monkeypatch.setattr(repository, 'get_day_avg_data',
+                        lambda station, date: get_day_avg_data(station, date).iloc[:, :7] if station == '2'
+                        else get_day_avg_data(station, date))
+    results = model_lstm.get_long_term_predict_batch([('1', DATES[-1]), ('2', DATES[-1])])
+    assert results[0].shape == (7, 8)
+    assert results[1] is None
+
+
+def test_batch_matches_single_prediction(dataset):
+    batch_results = model_lstm.get_short_term_predict_batch([(station, DATES[-1]) for station in STATIONS])
+    for station, batch_result in zip(STATIONS, batch_results):
+        assert np.array_equal(batch_result, model_lstm.get_short_term_predict(station, DATES[-1]))
+
+
+@pytest.mark.parametrize('name', ['short_term', 'long_term'])
+def test_numpy_backend_matches_stored_keras_outputs(name):
+    # 模型文件及Keras推理结果由 python benchmark/numpy_lstm_parity.py --fixture tests/fixtures 生成
+    import numpy_lstm_parity
+    expected = np.load(os.path.join(_FIXTURE_PATH, name + '.npz'))
+    numpy_model = numpy_lstm.load_model(os.path.join(_FIXTURE_PATH, name + '.h5'))
+    numpy_output = numpy_model.predict(expected['x_input'])
+    assert numpy_output.shape == expected['keras_output'].shape
+    assert np.max(np.abs(expected['keras_output'] - numpy_output)) <= numpy_lstm_parity._TOLERANCE
+
+
+@pytest.mark.parametrize('time_step, units, dropout', [(24, (16, 8), True), (7, (12, 12), False)])
+def test_numpy_backend_matches_keras(tmp_path, time_step, units, dropout):
+    pytest.importorskip('tensorflow')
+    keras_models = pytest.importorskip('tensorflow.keras.models')
+    import numpy_lstm_parity
+    path = str(tmp_path / 'model.h5')
+    numpy_lstm_parity._build_random_model(path, time_step, units, dropout)
+    keras_model = keras_models.load_model(path, compile=False)
+    numpy_model = numpy_lstm.load_model(path)
+    x_input = np.random.default_rng(0).random((8, time_step, 8), dtype=np.float32)
+    keras_output = keras_model.predict(x_input, verbose=0)
+    numpy_output = numpy_model.predict(x_input)
+    assert numpy_output.shape == keras_output.shape
+    assert np.max(np.abs(keras_output - numpy_output)) <= numpy_lstm_parity._TOLERANCE
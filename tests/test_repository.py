@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+import data_utils as dtools
+import repository
+import synthetic_data
+from storage import aggregate_store, column_store, date_manifest
+from conftest import DATES
+
+
+def _expected_data(file_path: str, dates: list) -> pd.DataFrame:
+    return pd.concat([pd.read_csv(f"{file_path}1/1_data_{date}.csv") for date in dates])
+
+
+def _assert_same_stats(left: dtools.SufficientStats, right: dtools.SufficientStats) -> None:
+    assert left.count == right.count
+    for field in ('mean', 'm2', 'min', 'max'):
+        assert np.allclose(getattr(left, field), getattr(right, field))
+
+
+def test_deleted_csv_is_forward_filled(file_path):
+    synthetic_data.write_dataset(file_path, ['1'], DATES)
+    column_store.convert_station('1', file_path)
+    aggregate_store.convert_station('1', file_path)
+    assert date_manifest.has_date('1', DATES[3])
+    expected = _expected_data(file_path, [DATES[2], DATES[2], DATES[4]])
+    expected_stats = dtools.calculate_sufficient_stats(expected[column_store.FEATURE_COLUMNS].values)
+    # 清单、列式存储及聚合存储中仍有该日的数据
+    os.remove(f"{file_path}1/1_data_{DATES[3]}.csv")
+    data = repository.get_merged_csv_data('1', DATES[2], DATES[4])
+    assert np.allclose(data[column_store.FEATURE_COLUMNS].values, expected[column_store.FEATURE_COLUMNS].values)
+    assert not date_manifest.has_date('1', DATES[3])
+    _assert_same_stats(repository.get_merged_stats('1', DATES[2], DATES[4]), expected_stats)
+    assert repository.get_csv_dates('1', DATES[2], DATES[4]) == [DATES[2], DATES[2], DATES[4]]
+
+
+def test_csv_deleted_after_planning_is_forward_filled(file_path, monkeypatch):
+    synthetic_data.write_dataset(file_path, ['1'], DATES)
+    plan = date_manifest.plan_forward_fill('1', DATES[2:5])
+    expected = _expected_data(file_path, [DATES[2], DATES[2], DATES[4]])
+    os.remove(f"{file_path}1/1_data_{DATES[3]}.csv")
+    monkeypatch.setattr(date_manifest, 'plan_forward_fill', lambda station, dates, max_missing=None: plan)
+    data = repository.get_merged_csv_data('1', DATES[2], DATES[4])
+    pd.testing.assert_frame_equal(data, expected)
+    assert repository.get_merged_stats('1', DATES[2], DATES[4]).count == len(expected)
+    assert not date_manifest.has_date('1', DATES[3])
@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import warnings
+import numpy as np
+import stand_ins
+import synthetic_data
+from storage import aggregate_store, column_store, date_manifest, etl_watermark
+from conftest import DATES
+
+
+def _day_frames(dates: list, seed: int = 0) -> dict:
+    return {date: synthetic_data.to_dataframe(values) for _, date, values in synthetic_data.iter_days(['1'], dates, seed)}
+
+
+def test_column_store_overwrites_in_place_and_compacts(file_path):
+    frames = _day_frames(DATES)
+    for date, df in frames.items():
+        column_store.write_day('1', date, df)
+    rows = column_store._read_index('1')['rows']
+    # 行数不变时原地覆盖，列文件不增长
+    replaced = _day_frames(DATES[:1], seed=1)[DATES[0]]
+    column_store.write_day('1', DATES[0], replaced)
+    assert column_store._read_index('1')['rows'] == rows
+    data = column_store.read_dates('1', DATES[:1])
+    assert np.allclose(data['Temperature'], replaced['Temperature'].to_numpy(dtype=np.float32))
+    # 行数变化时追加，旧数据超过比例后压缩
+    column_store.write_day('1', DATES[0], frames[DATES[0]].iloc[:-1])
+    assert column_store._read_index('1')['dead_rows'] == len(frames[DATES[0]])
+    column_store.write_day('1', DATES[1], frames[DATES[1]].iloc[:-1])
+    index = column_store._read_index('1')
+    assert index.get('dead_rows', 0) == 0
+    assert index['rows'] == rows - 2
+    assert os.path.getsize(column_store._get_column_file('1', 'Temperature', index['generation'])) == index['rows'] * 4
+    assert not os.path.exists(column_store._get_column_file('1', 'Temperature'))
+    data = column_store.read_dates('1', DATES)
+    assert len(data['Time']) == rows - 2
+    assert np.allclose(data['Temperature'][-len(frames[DATES[-1]]):],
+                       frames[DATES[-1]]['Temperature'].to_numpy(dtype=np.float32))
+
+
+def _read_between_steps(monkeypatch) -> list:
+    """
+    写入方发布新索引之前，以清空缓存的读取方读取全部日期，返回读取到的Temperature列
+    """
+    write_index = column_store._write_index
+    results = []
+
+    def write_index_after_read(station, index):
+        column_store._station_cache.clear()
+        results.append(column_store.read_dates(station, DATES)['Temperature'].copy())
+        write_index(station, index)
+
+    monkeypatch.setattr(column_store, '_write_index', write_index_after_read)
+    return results
+
+
+def _temperature(frames: dict) -> np.ndarray:
+    return np.concatenate([frames[date]['Temperature'].to_numpy(dtype=np.float32) for date in DATES])
+
+
+def test_column_store_readers_see_matching_files_during_rewrite(file_path, monkeypatch):
+    frames = _day_frames(DATES)
+    for date, df in frames.items():
+        column_store.write_day('1', date, df)
+    # 压缩：新一代列文件已写入，索引尚未发布
+    frames[DATES[0]] = frames[DATES[0]].iloc[:-1]
+    column_store.write_day('1', DATES[0], frames[DATES[0]])
+    expected = _temperature(frames)
+    results = _read_between_steps(monkeypatch)
+    frames[DATES[1]] = frames[DATES[1]].iloc[:-1]
+    column_store.write_day('1', DATES[1], frames[DATES[1]])
+    assert np.array_equal(results[0], expected)
+    monkeypatch.undo()
+    compacted = _temperature(frames)
+    assert np.array_equal(column_store.read_dates('1', DATES)['Temperature'], compacted)
+    # 由CSV重新转换
+    synthetic_data.write_dataset(file_path, ['1'], DATES)
+    results = _read_between_steps(monkeypatch)
+    column_store.convert_station('1', file_path)
+    assert np.array_equal(results[0], compacted)
+    monkeypatch.undo()
+    generation = column_store._read_index('1')['generation']
+    assert list(column_store._get_column_generations('1')) == [generation]
+    # 读取方读到的旧索引对应的文件已被删除时重新读取索引
+    stale_index = {'rows': len(compacted), 'dates': {}, 'generation': generation - 1}
+    read_index = column_store._read_index
+    indexes = [stale_index]
+    monkeypatch.setattr(column_store, '_read_index', lambda station: indexes.pop() if indexes else read_index(station))
+    column_store._station_cache.clear()
+    assert np.array_equal(column_store.read_dates('1', DATES)['Temperature'], _temperature(_day_frames(DATES)))
+
+
+def test_aggregate_store_drops_empty_day(file_path):
+    df = _day_frames(DATES[:1])[DATES[0]]
+    assert aggregate_store.write_day('1', DATES[0], df)
+    assert aggregate_store.read_hour_avg('1', DATES[0]) is not None
+    assert not aggregate_store.write_day('1', DATES[0], df.iloc[:0])
+    assert aggregate_store.read_hour_avg('1', DATES[0]) is None
+    assert aggregate_store.read_day_avg('1', DATES[0]) is None
+
+
+def _write_days(folder: str, dates: list) -> None:
+    warnings.simplefilter('ignore')
+    stand_ins.use_folder(folder, ['1'])
+    for date, df in _day_frames(dates).items():
+        column_store.write_day('1', date, df)
+        aggregate_store.write_day('1', date, df)
+        date_manifest.update('1', {date: [len(df), 1]})
+        etl_watermark.update('1', {date: [len(df), 1.0]})
+
+
+def test_concurrent_processes_keep_store_consistent(tmp_path):
+    folder = str(tmp_path / 'data')
+    dates = synthetic_data.get_dates('2023-01-01', 24)
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_write_days, args=(folder, dates[i::3])) for i in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    stand_ins.use_folder(folder, ['1'])
+    assert sorted(column_store.get_day_index('1')) == dates
+    assert sorted(date_manifest.get_entries('1')) == dates
+    assert all(etl_watermark.get('1', date) is not None for date in dates)
+    assert all(aggregate_store.read_day_avg('1', date) is not None for date in dates)
+    rows = sum(len(df) for df in _day_frames(dates).values())
+    assert len(column_store.read_dates('1', dates)['Time']) == rows
+    generation = column_store._read_index('1').get('generation', 0)
+    assert os.path.getsize(column_store._get_column_file('1', 'Temperature', generation)) == rows * 4
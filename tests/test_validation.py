@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+import repository
+import entity.req_entity as server_req
+from server_code.utils import req_utils
+from conftest import DATES
+
+
+def _prediction_items() -> list:
+    return [{'station': '1', 'start_date': DATES[-1], 'model_type': 'SHORTTERM_LSTM'},
+            # 长期模型所需的连续七日中缺少第5日
+            {'station': '1', 'start_date': DATES[-1], 'model_type': 'LONGTERM_LSTM'},
+            {'station': '2', 'start_date': DATES[4], 'model_type': 'SHORTTERM_LSTM'},
+            {'station': '3', 'start_date': DATES[0], 'model_type': 'SHORTTERM_LSTM'},
+            {'station': '2', 'start_date': '2023/01/01', 'model_type': 'SHORTTERM_LSTM'}]
+
+
+def test_prediction_items_validated_against_existing_dates(station_dates):
+    errors = req_utils.validate_prediction_items(_prediction_items())
+    assert errors[0] is None
+    assert '不可作为起始日期' in errors[1]
+    assert '不存在有效数据' in errors[2]
+    assert '不存在有效数据' in errors[3]
+    assert 'YYYY-MM-DD' in errors[4]
+
+
+def test_prediction_items_query_only_required_pairs(station_dates):
+    items = [{'station': '1', 'start_date': DATES[0], 'model_type': 'SHORTTERM_LSTM'},
+             {'station': '1', 'start_date': DATES[-1], 'model_type': 'SHORTTERM_LSTM'}]
+    str_sql, args = repository._get_station_date_set_sql(req_utils._get_items_lookup(items, [[DATES[0]], [DATES[-1]]]))
+    assert args == ('1', DATES[0], DATES[-1])
+    assert '>=' not in str_sql
+    assert repository.get_station_date_set([('1', DATES[0]), ('1', DATES[4]), ('2', DATES[1])]) == \
+        {('1', DATES[0]), ('2', DATES[1])}
+
+
+def test_sync_and_async_validation_agree(station_dates):
+    items = _prediction_items()
+    requests = [dict(item, model_type=model_type) for item in items
+                for model_type in ('SHORTTERM_LSTM', 'LONGTERM_LSTM', 'INVALID')]
+    sync_results = [req_utils.validate_json_user_req('/anapredict/model/prediction', req, server_req.PREDICTION)
+                    for req in requests]
+
+    async def validate_async():
+        return [await req_utils.validate_json_user_req_async('/anapredict/model/prediction', req,
+                                                             server_req.PREDICTION) for req in requests]
+
+    assert asyncio.run(validate_async()) == sync_results
+    assert asyncio.run(req_utils.validate_prediction_items_async(items)) == req_utils.validate_prediction_items(items)
+
+
+@pytest.mark.parametrize('start_date, end_date, rejected', [(DATES[3], DATES[1], True), (DATES[1], DATES[3], False),
+                                                            (DATES[1], DATES[1], False)])
+def test_cleaned_range_must_not_be_reversed(station_dates, start_date, end_date, rejected):
+    error_msg = req_utils.validate_json_user_req('/anapredict/cleaned', {'station': '1', 'start_date': start_date,
+                                                                         'end_date': end_date}, server_req.CLEANED)
+    assert (error_msg is not None and 'start_date不能晚于end_date' in error_msg) == rejected
@@ -2,12 +2,98 @@
     数据预处理模块
     by organwalk 2023.09.19
 """
+import hashlib
+import os
 from numpy import ndarray
 import repository
-import pandas as pd
 import data_utils as dtools
 import numpy as np
-from typing import Tuple, Union, Optional, Any
+import pandas as pd
+from config import TRAIN_CACHE_PATH
+from storage.column_store import FEATURE_COLUMNS
+from typing import List, Tuple, Union, Optional, Any
+
+_HOURS = 24
+
+
+def build_short_term_dataset(station: str, start_date: str, end_date: str, use_cache: bool = True) \
+        -> Union[str, ndarray]:
+    """
+    读取日期范围内每一日24小时的每小时平均值，组成连续的(days, 24, 8)数组，每个数据日期只读取一次，
+    结果按气象站及日期范围缓存于TRAIN_CACHE_PATH，所用数据集文件均未变化时直接读取缓存
+    :param station: 气象站编号
+    :param start_date: 起始日期
+    :param end_date: 结束日期
+    :param use_cache: 是否读取及写入缓存
+    :return:
+        str:错误消息
+        ||
+        np.ndarray:形如(days, 24, 8)、未归一化的每小时平均值，缺失的日期已前向填充
+    """
+    # 0. 获取有效数据日期数组
+    existing_dates = repository.get_csv_dates(station, start_date, end_date)
+    if isinstance(existing_dates, str):
+        return existing_dates
+    if existing_dates and not existing_dates[0]:
+        return "起始日期之前没有可用于前向填充的数据"
+    source_dates = list(dict.fromkeys(existing_dates))
+    # 1. 所用数据集文件均未变化时直接读取缓存
+    cache_path = f"{TRAIN_CACHE_PATH}{station}/short_term_{start_date}_{end_date}.npz"
+    fingerprint = _get_fingerprint(station, source_dates) if use_cache else None
+    if fingerprint is not None:
+        days = _read_cache(cache_path, fingerprint)
+        if days is not None:
+            return days
+    # 2. 每个数据日期只读取一次，优先使用ETL时预先计算的聚合结果，前向填充的日期按位置复制
+    source_days = np.empty((len(source_dates), _HOURS, len(FEATURE_COLUMNS)))
+    for i, date in enumerate(source_dates):
+        source_days[i] = repository.get_hour_avg_data(station, date).values
+    if len(source_dates) == len(existing_dates):
+        days = source_days
+    else:
+        positions = {date: i for i, date in enumerate(source_dates)}
+        days = source_days[[positions[date] for date in existing_dates]]
+    if fingerprint is not None:
+        _write_cache(cache_path, fingerprint, days)
+    return days
+
+
+def _get_fingerprint(station: str, dates: List[str]) -> Optional[str]:
+    """
+    计算所用数据集文件的日期、修改时间及大小的摘要，任一文件不存在时返回None
+    """
+    digest = hashlib.sha1()
+    try:
+        for date in dates:
+            file_stat = os.stat(repository.get_csv_path(station, date))
+            digest.update(f"{date},{file_stat.st_mtime_ns},{file_stat.st_size};".encode())
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _read_cache(path: str, fingerprint: str) -> Optional[ndarray]:
+    """
+    读取缓存的数据集，缓存不存在、已损坏或数据集文件已变化时返回None
+    """
+    try:
+        with np.load(path) as cache:
+            if str(cache['fingerprint']) == fingerprint:
+                return cache['days']
+    except (OSError, KeyError, ValueError):
+        pass
+    return None
+
+
+def _write_cache(path: str, fingerprint: str, days: ndarray) -> None:
+    """
+    将数据集写入临时文件后原子地替换缓存文件
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        np.savez(file, days=days, fingerprint=np.array(fingerprint))
+    os.replace(temp_path, path)
 
 
 def split_short_term_sequences(station: str, start_date: str, end_date: str) \
@@ -26,31 +112,17 @@ def split_short_term_sequences(station: str, start_date: str, end_date: str) \
 
     by organwalk 2023-09-19
     """
-    # 0. 获取有效数据文件路径数组
-    existing_files = repository.get_csv(station, start_date, end_date)
-    if isinstance(existing_files, str):
-        return existing_files
-    # 1. 划分输入和输出序列
-    x, y = list(), list()
-    scaler = None
-    for i in range(len(existing_files) - 1):
-        print(f"正在划分输入序列：{existing_files[i]}-->输出序列{existing_files[i + 1]}")
-        # 1.1 读取当前（输入序列）和下一份数据（输出序列）
-        df_current = pd.read_csv(existing_files[i])
-        df_next = pd.read_csv(existing_files[i + 1])
-
-        # 1.2 获取两份数据各自24小时的每小时平均值
-        avg_df_current = dtools.calculate_hour_avg(df_current)
-        avg_df_next = dtools.calculate_hour_avg(df_next)
-        # 1.3 对小时化的数据进行归一化
-        df_data_current, scaler = dtools.get_scaler_result(avg_df_current)
-        df_data_next, _ = dtools.get_scaler_result(avg_df_next)
-
-        # 1.4 添加到输入和输出序列中
-        x.append(df_data_current)
-        y.append(df_data_next)
-
-    return np.array(x), np.array(y), scaler
+    # 0. 获取日期范围内每一日的每小时平均值
+    days = build_short_term_dataset(station, start_date, end_date)
+    if isinstance(days, str):
+        return days
+    # 1. 按日分别归一化，与逐日拟合MinMaxScaler的结果一致
+    scaled_days, _, _ = dtools.get_batch_scaler_result(days)
+    # 2. 第i日为输入序列、第i+1日为输出序列，两者均为同一数组的视图，不复制数据
+    x, y = scaled_days[:-1], scaled_days[1:]
+    # 3. 与逐日划分时一致，返回最后一个输入日的缩放器
+    scaler = dtools.get_scaler_result(pd.DataFrame(days[-2], columns=FEATURE_COLUMNS))[1] if len(days) > 1 else None
+    return x, y, scaler
 
 
 def split_long_term_sequences(station: str, start_date: str, end_date: str) \
@@ -69,16 +141,15 @@ def split_long_term_sequences(station: str, start_date: str, end_date: str) \
 
     by organwalk 2023-10-11
     """
-    existing_files = repository.get_csv(station, start_date, end_date)
-    if isinstance(existing_files, str):
-        return existing_files
+    existing_dates = repository.get_csv_dates(station, start_date, end_date)
+    if isinstance(existing_dates, str):
+        return existing_dates
     x, y = list(), list()
     scaler = None
     all_data = []
     n_step_in, n_step_out = 7, 7
-    for file in existing_files:
-        df = pd.read_csv(file)
-        avg_df_data = dtools.calculate_day_avg(df)
+    for existing_date in existing_dates:
+        avg_df_data = repository.get_day_avg_data(station, existing_date)
         df_data, scaler = dtools.get_scaler_result(avg_df_data)
         all_data.append(df_data)
     for i in range(len(all_data)):